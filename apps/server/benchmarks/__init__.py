@@ -0,0 +1 @@
+# Benchmark scripts for the server. Run from apps/server, e.g. `python -m benchmarks.bench_keywords`.
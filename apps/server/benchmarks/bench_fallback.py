@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compares the fallback keyword extractor (used when no SpaCy model is available) before and after
+vectorization: the original per-character loop with dict counting versus regex tokenization,
+Counter and heapq.nlargest. Inputs range from 1 KB to 10 MB of generated English-like text.
+
+Also checks that both return the same keywords once stopwords are removed from the original ranking.
+
+Usage (from apps/server):
+    python -m benchmarks.bench_fallback [--sizes 1KB,10KB,100KB,1MB,10MB] [--runs 5] [--k 3]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+from src.utils.keywords import MIN_FALLBACK_WORD_LENGTH, STOP_WORDS, extract_keywords_fallback
+
+VOCABULARY = [
+    "climate", "energy", "health", "finance", "markets", "education", "policy", "security", "software",
+    "research", "medicine", "transport", "agriculture", "water", "housing", "retail", "banking", "privacy",
+    "the", "and", "with", "from", "their", "which", "would", "about", "there", "these", "other", "because",
+    "government", "companies", "patients", "students", "emissions", "networks", "customers", "systems",
+]
+PUNCTUATION = ["", "", "", "", ",", ".", ";", "'s", "!", "?", ")", "2024"]
+
+UNITS = {"KB": 1024, "MB": 1024 * 1024}
+
+
+def legacy_ranking(text: str) -> List[Tuple[str, int]]:
+    # Original implementation, returning the full ranking instead of the top 3.
+    words = text.lower().split()
+    word_counts = {}
+    for word in words:
+        clean_word = ''.join(c for c in word if c.isalpha())
+        if len(clean_word) > 3:
+            word_counts[clean_word] = word_counts.get(clean_word, 0) + 1
+    return sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
+
+
+def legacy_extract(text: str, k: int) -> List[str]:
+    return [word for word, count in legacy_ranking(text)[:k]]
+
+
+def generate_text(size: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    # Skewed word frequencies so the top-k is meaningful
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choices(VOCABULARY, weights)[0]
+        if rng.random() < 0.1:
+            word = word.capitalize()
+        word += rng.choice(PUNCTUATION)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def time_ms(fn: Callable[[], List[str]], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,10KB,100KB,1MB,10MB",
+                        help="Comma-separated input sizes")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for label in args.sizes.split(","):
+        text = generate_text(parse_size(label))
+        # Fewer runs of the slow path on the largest inputs
+        legacy_runs = args.runs if len(text) < UNITS["MB"] else max(1, args.runs // 2)
+        legacy_ms = time_ms(lambda: legacy_extract(text, args.k), legacy_runs)
+        fallback_ms = time_ms(lambda: extract_keywords_fallback(text, args.k), args.runs)
+
+        expected = [word for word, _ in legacy_ranking(text)
+                    if len(word) > MIN_FALLBACK_WORD_LENGTH and word not in STOP_WORDS][:args.k]
+        actual = extract_keywords_fallback(text, args.k)
+        results[label.strip()] = {
+            "legacy_ms": round(legacy_ms, 2),
+            "fallback_ms": round(fallback_ms, 2),
+            "speedup": round(legacy_ms / fallback_ms, 1),
+            "fallback_mb_per_s": round(len(text) / UNITS["MB"] / (fallback_ms / 1000), 1),
+            "matches_legacy_without_stopwords": expected == actual,
+        }
+        print(f"{label.strip():>6}: legacy {legacy_ms:9.2f} ms  fallback {fallback_ms:8.2f} ms  "
+              f"({results[label.strip()]['speedup']}x) -> {actual}")
+
+    print("\n" + json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Compares keyword extraction throughput (docs/sec) of the original per-document implementation
+(full en_core_web_sm pipeline, nlp(text) per document, dict counting) against the current one
+(trimmed pipeline, batched nlp.pipe, numpy counting) on short and long inputs.
+
+Usage (from apps/server):
+    python -m benchmarks.bench_keywords [--short-docs 500] [--long-docs 20] [--batch-size 64]
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+import spacy
+
+from src.utils import keywords
+
+SHORT_TEXT = ("Artificial intelligence is transforming the healthcare industry by enabling faster "
+              "diagnosis and personalized treatment plans for patients in hospitals.")
+
+LONG_PARAGRAPH = ("Climate change represents one of the most significant challenges of our time. "
+                  "Rising global temperatures, melting ice caps, and extreme weather events are clear indicators "
+                  "of environmental disruption. Governments worldwide must implement sustainable policies "
+                  "to reduce carbon emissions and promote renewable energy sources. ")
+
+
+def load_full_pipeline():
+    # The pipeline as it was loaded before trimming: every component enabled.
+    if keywords.MODEL_PATH.exists():
+        return spacy.load(str(keywords.MODEL_PATH))
+    return spacy.load("en_core_web_sm")
+
+
+def legacy_extract_nouns(nlp, text: str) -> List[str]:
+    # Original implementation: one document at a time with per-token dict updates.
+    doc = nlp(text)
+    noun_counts = {}
+    for token in doc:
+        if token.pos_ == "NOUN":
+            noun_text = token.text.lower()
+            noun_counts[noun_text] = noun_counts.get(noun_text, 0) + 1
+    sorted_nouns = sorted(noun_counts.items(),
+                          key=lambda item: item[1], reverse=True)
+    return [noun for noun, count in sorted_nouns[:3]]
+
+
+def docs_per_second(fn: Callable[[List[str]], List[List[str]]], texts: List[str]) -> float:
+    # Warm up once so lazy initialization is not measured.
+    fn(texts[:1])
+    start = time.perf_counter()
+    fn(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--short-docs", type=int, default=500)
+    parser.add_argument("--long-docs", type=int, default=20)
+    parser.add_argument("--long-paragraphs", type=int, default=100,
+                        help="Paragraphs per long document (~300 chars each)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--json", action="store_true",
+                        help="Print results as JSON")
+    args = parser.parse_args()
+
+    if keywords.get_model() is None:
+        print("SpaCy model unavailable, nothing to benchmark.")
+        return 1
+
+    full_nlp = load_full_pipeline()
+    workloads = {
+        "short": [SHORT_TEXT] * args.short_docs,
+        "long": [LONG_PARAGRAPH * args.long_paragraphs] * args.long_docs,
+    }
+    implementations = {
+        "legacy (full pipeline, per doc)": lambda texts: [legacy_extract_nouns(full_nlp, t) for t in texts],
+        "trimmed pipeline, per doc": lambda texts: [keywords.extract_nouns(t) for t in texts],
+        "trimmed pipeline, nlp.pipe batch": lambda texts: keywords.extract_nouns_batch(texts, batch_size=args.batch_size),
+    }
+
+    # Sanity check: every implementation must agree on the output.
+    for name, texts in workloads.items():
+        expected = implementations["legacy (full pipeline, per doc)"](texts[:2])
+        for impl_name, fn in implementations.items():
+            assert fn(texts[:2]) == expected, f"{impl_name} disagrees on {name} input"
+
+    results = {}
+    for workload, texts in workloads.items():
+        for impl_name, fn in implementations.items():
+            results.setdefault(workload, {})[impl_name] = round(
+                docs_per_second(fn, texts), 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    for workload, rows in results.items():
+        baseline = rows["legacy (full pipeline, per doc)"]
+        print(f"\n{workload} documents ({len(workloads[workload])} docs)")
+        for impl_name, rate in rows.items():
+            print(f"  {impl_name:<36} {rate:>10.1f} docs/sec  ({rate / baseline:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
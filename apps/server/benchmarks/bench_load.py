@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Load test harness. Runs the real FastAPI app in-process, without network, Postgres or OpenAI, and
+measures throughput and p50/p95/p99 latency of /analyze, /search and /analyze/batch at several
+concurrency levels.
+
+- LLM: the server's mock backend streams text-dependent JSON as small deltas with per-token logprobs,
+  after a time to first token drawn from --ttft and at --tokens-per-second. --failure-rate and
+  --rate-limit-rate inject 500s and 429s, which go through the client's retry and rate-limit handling.
+- Database: an in-memory Prisma stand-in with per-call latency drawn from --db-latency, seeded with
+  --seed-rows analyses for the search scenario.
+- Keywords: the server's own keyword executor (set KEYWORD_POOL_ENABLED=false for a thread instead of
+  the process pool).
+
+The workload and every simulated delay are seeded, so two runs differ only by the code under test and
+the machine. Results are written as JSON. Compare against a previous run to catch regressions:
+
+Usage (from apps/server):
+    python -m benchmarks.bench_load --output before.json
+    python -m benchmarks.bench_load --output after.json --compare before.json [--threshold 10]
+
+    python -m benchmarks.bench_load --scenarios analyze,search --concurrency 1,16,64 --requests 400 \\
+        --ttft lognormal:400:0.5 --tokens-per-second 80 --db-latency uniform:1:4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Settings the app requires at import time; mock mode needs no real values.
+for name, value in {"DATABASE_URL": "postgresql://benchmark", "LLM_API_KEY": "benchmark", "LLM_MODEL": "benchmark",
+                    "LLM_MAX_TOKENS": "1000", "LLM_TEMPERATURE": "0.3", "LLM_MOCK_ENABLED": "true"}.items():
+    os.environ.setdefault(name, value)
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from src.api.v1.dependencies import get_analysis_service  # noqa: E402
+from src.services.analysis_cache import AnalysisCache  # noqa: E402
+from src.services.analysis_service import AnalysisService  # noqa: E402
+from src.services.keyword_executor import keyword_executor  # noqa: E402
+from src.services.llm_client import LLMClient  # noqa: E402
+from src.services.mock_llm import MockLLMBackend  # noqa: E402
+from src.utils.distributions import Distribution  # noqa: E402
+from src.utils.logging import logger  # noqa: E402
+from testing.fake_prisma import FakePrisma  # noqa: E402
+
+VOCABULARY = [
+    "climate", "energy", "health", "finance", "markets", "education", "policy", "security", "software",
+    "research", "medicine", "transport", "agriculture", "water", "housing", "retail", "banking", "privacy",
+    "government", "companies", "patients", "students", "emissions", "networks", "customers", "systems",
+    "the", "and", "with", "from", "their", "which", "would", "about", "because", "between",
+]
+SCENARIOS = ("analyze", "search", "batch")
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def make_text(index: int, words: int, seed: int) -> str:
+    rng = random.Random(f"{seed}:text:{index}")
+    body = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    # The index keeps every text distinct, so each analysis is a cache miss.
+    return f"Document {index}. {body.capitalize()}."
+
+
+def seed_database(db: FakePrisma, rows: int, seed: int) -> None:
+    rng = random.Random(f"{seed}:rows")
+
+    def row() -> Dict[str, Any]:
+        topics = rng.sample(VOCABULARY[:26], 3)
+        return {
+            "title": " ".join(topics).title(), "topics": topics, "sentiment": "neutral",
+            "keywords": rng.sample(VOCABULARY[:26], 3), "summary": " ".join(rng.choices(VOCABULARY, k=30)),
+            "original_text": " ".join(rng.choices(VOCABULARY, k=200)), "confidence_score": 90.0
+        }
+
+    db.seed_rows(row() for _ in range(rows))
+
+
+def build_requests(args: argparse.Namespace) -> Dict[str, Request]:
+    texts = itertools.count()
+
+    async def analyze(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post("/api/v1/analyze", json={"text": make_text(next(texts), args.text_words, args.seed)})
+
+    async def search(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        topic = VOCABULARY[index % 26]
+        return await client.get("/api/v1/search", params={"topic": topic, "limit": args.search_limit})
+
+    async def batch(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        batch_texts = [make_text(next(texts), args.text_words, args.seed) for _ in range(args.batch_size)]
+        return await client.post("/api/v1/analyze/batch", json={"texts": batch_texts})
+
+    return {"analyze": analyze, "search": search, "batch": batch}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_level(client: httpx.AsyncClient, request: Request, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    indexes = itertools.count()
+
+    async def worker() -> None:
+        nonlocal errors
+        while (index := next(indexes)) < total:
+            start = time.perf_counter()
+            try:
+                response = await request(client, index)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / wall, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    db = FakePrisma(Distribution.parse(args.db_latency), seed=args.seed)
+    seed_database(db, args.seed_rows, args.seed)
+    backend = MockLLMBackend(ttft=Distribution.parse(args.ttft), tokens_per_second=args.tokens_per_second,
+                             tokens_per_chunk=args.tokens_per_chunk, failure_rate=args.failure_rate,
+                             rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, seed=args.seed)
+    llm_client = LLMClient(api_key="", mock_enabled=True, mock_backend=backend)
+    cache = AnalysisCache(prisma=db, max_entries=1024, ttl_seconds=3600) if args.cache else None
+
+    def analysis_service() -> AnalysisService:
+        return AnalysisService(prisma=db, llm_client=llm_client, keyword_extractor=keyword_executor.extract,
+                               cache=cache, batch_keyword_extractor=keyword_executor.extract_many)
+
+    main.app.dependency_overrides[get_analysis_service] = analysis_service
+    await keyword_executor.start()
+    while not keyword_executor.is_ready:
+        await asyncio.sleep(0.05)
+
+    requests = build_requests(args)
+    meta = metadata(args)
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for scenario in args.scenarios:
+                # One untimed pass warms up routing, metric children and the keyword model.
+                await run_level(client, requests[scenario], min(4, args.requests), 1)
+                results[scenario] = {}
+                for concurrency in args.concurrency:
+                    total = max(1, args.requests // args.batch_size) if scenario == "batch" else args.requests
+                    level = await run_level(client, requests[scenario], total, concurrency)
+                    results[scenario][str(concurrency)] = level
+                    print(f"{scenario:>8} c={concurrency:<4} {level['throughput_rps']:>9.1f} req/s  "
+                          f"p50 {level['p50_ms']:>8.1f}  p95 {level['p95_ms']:>8.1f}  p99 {level['p99_ms']:>8.1f} ms"
+                          f"  errors {level['errors']}", file=sys.stderr)
+    finally:
+        main.app.dependency_overrides.pop(get_analysis_service, None)
+        await keyword_executor.shutdown()
+
+    return {"meta": meta, "results": results}
+
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "keyword_model": keyword_executor.model_state,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    # Returns the regressions: p95 latency up, or throughput down, by more than `threshold` percent.
+    regressions = []
+    for scenario, levels in current["results"].items():
+        for concurrency, level in levels.items():
+            before = baseline.get("results", {}).get(scenario, {}).get(concurrency)
+            if before is None:
+                continue
+            p95_change = (level["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            rps_change = (level["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+            print(f"{scenario:>8} c={concurrency:<4} p95 {before['p95_ms']:>8.1f} -> {level['p95_ms']:>8.1f} ms "
+                  f"({p95_change:+.1f}%)  throughput {before['throughput_rps']:>9.1f} -> {level['throughput_rps']:>9.1f} "
+                  f"({rps_change:+.1f}%)", file=sys.stderr)
+            if p95_change > threshold:
+                regressions.append(f"{scenario} c={concurrency}: p95 {p95_change:+.1f}%")
+            if -rps_change > threshold:
+                regressions.append(f"{scenario} c={concurrency}: throughput {rps_change:+.1f}%")
+    return regressions
+
+
+def csv_list(cast: Callable[[str], Any]) -> Callable[[str], List[Any]]:
+    return lambda value: [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=csv_list(str), default=list(SCENARIOS),
+                        help="Comma-separated subset of analyze,search,batch")
+    parser.add_argument("--concurrency", type=csv_list(int), default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--ttft", default="lognormal:250:0.4", help="LLM time to first token (ms distribution)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--tokens-per-chunk", type=int, default=4)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of LLM calls failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of LLM calls failing with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After of injected 429s (seconds)")
+    parser.add_argument("--db-latency", default="uniform:0.5:2", help="Per-query latency (ms distribution)")
+    parser.add_argument("--text-words", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--search-limit", type=int, default=20)
+    parser.add_argument("--seed-rows", type=int, default=2000)
+    parser.add_argument("--cache", action="store_true", help="Enable the analysis cache (every text is unique)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Regression threshold in percent for p95 latency and throughput")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    for spec in (args.ttft, args.db_latency):
+        try:
+            Distribution.parse(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Per-request INFO logs would dominate the measurements.
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+        print("\nNo regressions above the threshold.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
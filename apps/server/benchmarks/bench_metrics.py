@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Measures the cost of the Prometheus instrumentation: the request middleware plus the per-analysis
+updates (stage histograms, time to first token, completion tokens), and compares it with the
+latency of an analysis request.
+
+The requests are sent straight to an in-process ASGI app, with no sockets. Its analysis route mirrors
+the server's: StageTimer stages with the same metric updates. The route does the real CPU work of the fastest path: parsing the LLM
+JSON and fallback keyword extraction. A short sleep stands in for the mock LLM and the database.
+This gives a lower bound on request latency, so the overhead percentage is a worst case.
+A real LLM call adds hundreds of milliseconds.
+
+Usage (from apps/server):
+    python -m benchmarks.bench_metrics [--requests 2000] [--rounds 7] [--io-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+
+from src.utils.keywords import extract_keywords_fallback
+from src.utils.metrics import LLM_COMPLETION_TOKENS, LLM_TIME_TO_FIRST_TOKEN, MetricsMiddleware, observe_stages
+from src.utils.timing import StageTimer
+
+SAMPLE_TEXT = ("Artificial intelligence is transforming the healthcare industry by enabling faster "
+               "diagnosis and personalized treatment plans for patients in hospitals. ") * 8
+LLM_OUTPUT = json.dumps({
+    "summary": "AI is transforming healthcare through faster diagnosis and personalized treatment.",
+    "title": "AI in Healthcare", "topics": ["ai", "healthcare", "diagnosis"], "sentiment": "positive"
+})
+LOGPROBS = [-0.1] * 40
+
+
+def build_app(instrumented: bool, io_seconds: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/v1/analyze")
+    async def analyze() -> Dict[str, Any]:
+        timer = StageTimer()
+        with timer.stage("total"):
+            started = time.perf_counter()
+            with timer.stage("llm"):
+                await asyncio.sleep(io_seconds / 2)
+                if instrumented:
+                    LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+                    LLM_COMPLETION_TOKENS.inc(len(LOGPROBS))
+            with timer.stage("parse"):
+                output = json.loads(LLM_OUTPUT)
+            with timer.stage("keywords"):
+                output["keywords"] = extract_keywords_fallback(SAMPLE_TEXT)
+            with timer.stage("db"):
+                await asyncio.sleep(io_seconds / 2)
+        if instrumented:
+            observe_stages(timer.durations)
+        return output
+
+    @app.get("/")
+    async def index() -> Dict[str, str]:
+        return {"message": "Server is running"}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call(app: FastAPI, method: str, path: str) -> None:
+    # Minimal ASGI client: no sockets, so only the application's own work is timed.
+    scope = {"type": "http", "http_version": "1.1", "method": method, "path": path, "raw_path": path.encode(),
+             "query_string": b"", "headers": [(b"content-type", b"application/json")], "scheme": "http",
+             "server": ("bench", 80), "client": ("bench", 1), "root_path": ""}
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def per_request_us(app: FastAPI, method: str, path: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, method, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def analysis_updates_us(timer: StageTimer, requests: int) -> float:
+    # The per-analysis metric updates, timed in isolation.
+    start = time.perf_counter()
+    for _ in range(requests):
+        LLM_TIME_TO_FIRST_TOKEN.observe(0.2)
+        LLM_COMPLETION_TOKENS.inc(len(LOGPROBS))
+        observe_stages(timer.durations)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    io_seconds = args.io_ms / 1000
+    bare, instrumented = build_app(False, io_seconds), build_app(True, io_seconds)
+    # Warm up routing and the labelled metric children.
+    for app in (bare, instrumented):
+        await per_request_us(app, "GET", "/", 100)
+        await per_request_us(app, "POST", "/api/v1/analyze", 10)
+
+    results: Dict[str, List[float]] = {"index_bare": [], "index_instrumented": [], "analysis_updates": [],
+                                       "analyze_bare": [], "analyze_instrumented": []}
+    timer = StageTimer()
+    timer.durations.update(llm=850.0, parse=0.2, keywords=12.0, db=3.1, total=866.0)
+    # Alternate the variants so drift (CPU frequency, GC) affects both equally, and keep the best
+    # round of each: on a shared machine, slower rounds measure interference, not the code.
+    for _ in range(args.rounds):
+        results["index_bare"].append(await per_request_us(bare, "GET", "/", args.requests))
+        results["index_instrumented"].append(await per_request_us(instrumented, "GET", "/", args.requests))
+        results["analysis_updates"].append(analysis_updates_us(timer, args.requests))
+        results["analyze_bare"].append(await per_request_us(bare, "POST", "/api/v1/analyze", args.requests // 10))
+        results["analyze_instrumented"].append(
+            await per_request_us(instrumented, "POST", "/api/v1/analyze", args.requests // 10))
+
+    best = {name: min(values) for name, values in results.items()}
+    # Measured on the trivial route, where the middleware is the only difference.
+    middleware_cost = max(0.0, best["index_instrumented"] - best["index_bare"])
+    analysis_updates_cost = best["analysis_updates"]
+    instrumentation_cost = middleware_cost + analysis_updates_cost
+    return {
+        "index_bare_us": round(best["index_bare"], 1),
+        "index_instrumented_us": round(best["index_instrumented"], 1),
+        "middleware_cost_us": round(middleware_cost, 1),
+        "analysis_metric_updates_us": round(analysis_updates_cost, 1),
+        "analyze_bare_us": round(best["analyze_bare"], 1),
+        "analyze_instrumented_us": round(best["analyze_instrumented"], 1),
+        "instrumentation_cost_us": round(instrumentation_cost, 1),
+        "overhead_pct_of_analyze": round(instrumentation_cost / best["analyze_bare"] * 100, 3),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--io-ms", type=float, default=2.0,
+                        help="Simulated LLM + database time per analysis")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    within_budget = results["overhead_pct_of_analyze"] < 1.0
+    print(f"\nInstrumentation costs {results['instrumentation_cost_us']} us per analysis request "
+          f"({results['overhead_pct_of_analyze']}% of {results['analyze_bare_us'] / 1000:.2f} ms): "
+          f"{'within' if within_budget else 'OVER'} the 1% budget.")
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
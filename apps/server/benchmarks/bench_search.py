@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Seeds a scratch copy of the "Analysis" table (1M rows by default) and compares /search query plans and
+latencies before and after the search indexes: the original unindexed ILIKE/unnest query versus the
+trigram-indexed substring query and the ranked full-text query.
+
+Runs inside its own schema (dropped afterwards unless --keep), so application data is never touched.
+Requires the search migrations (pg_trgm and the generated search_vector and search_tags columns) to be
+applied to the database.
+
+Usage (from apps/server):
+    python -m benchmarks.bench_search [--rows 1000000] [--runs 5] [--dsn postgresql://...]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import psycopg2
+
+from src.services.analysis_service import SEARCH_SQL, FULLTEXT_SEARCH_SQL
+
+SCHEMA = "bench_search"
+
+# The query as it was before the search indexes existed.
+LEGACY_SEARCH_SQL = """
+SELECT * FROM "Analysis"
+WHERE
+    summary ILIKE $1
+    OR title ILIKE $1
+    OR EXISTS (SELECT 1 FROM unnest(topics) AS t WHERE t ILIKE $1)
+    OR EXISTS (SELECT 1 FROM unnest(keywords) AS k WHERE k ILIKE $1)
+ORDER BY "createdAt" DESC
+LIMIT $2 OFFSET $3
+"""
+
+WORDS = [
+    "climate", "energy", "health", "finance", "markets", "education", "policy", "security", "software",
+    "research", "medicine", "transport", "agriculture", "water", "housing", "retail", "banking", "privacy",
+    "robotics", "genomics", "vaccines", "elections", "satellites", "batteries", "semiconductors", "shipping",
+    "tourism", "insurance", "wildlife", "oceans", "forests", "mining", "aviation", "railways", "startups",
+    "pensions", "taxation", "inflation", "employment", "logistics",
+]
+
+# Copies the table layout (including the generated search_vector and search_tags columns) without any indexes.
+CREATE_TABLE_SQL = f"""
+CREATE TABLE {SCHEMA}."Analysis" (LIKE public."Analysis" INCLUDING DEFAULTS INCLUDING GENERATED);
+CREATE SEQUENCE {SCHEMA}.analysis_id_seq OWNED BY {SCHEMA}."Analysis".id;
+ALTER TABLE {SCHEMA}."Analysis" ALTER COLUMN id SET DEFAULT nextval('{SCHEMA}.analysis_id_seq');
+ALTER TABLE {SCHEMA}."Analysis" ADD PRIMARY KEY (id);
+"""
+
+SEED_SQL = f"""
+INSERT INTO {SCHEMA}."Analysis" (title, topics, sentiment, keywords, summary, "createdAt", original_text)
+SELECT
+    initcap(w[1 + (random() * (n - 1))::int]) || ' report ' || i,
+    ARRAY[w[1 + (random() * (n - 1))::int], w[1 + (random() * (n - 1))::int], w[1 + (random() * (n - 1))::int]],
+    (ARRAY['positive', 'neutral', 'negative'])[1 + i %% 3],
+    ARRAY[w[1 + (random() * (n - 1))::int], w[1 + (random() * (n - 1))::int], w[1 + (random() * (n - 1))::int]],
+    'This document discusses ' || w[1 + (random() * (n - 1))::int] || ' and ' || w[1 + (random() * (n - 1))::int]
+        || ' in detail. Reference ' || md5(i::text) || '.',
+    now() - make_interval(secs => i),
+    repeat('Original text of the document. ', 20)
+FROM generate_series(1, %(rows)s) AS i,
+     (SELECT %(words)s::text[] AS w, %(word_count)s AS n) AS words
+"""
+
+# Same index definitions as the search migrations, on the scratch table.
+CREATE_INDEXES_SQL = f"""
+CREATE INDEX ON {SCHEMA}."Analysis" USING GIN ("summary" gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}."Analysis" USING GIN ("title" gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}."Analysis" USING GIN ("search_tags" gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}."Analysis" USING GIN ("search_vector");
+"""
+
+
+def explain(cur, name: str, sql: str, params: Tuple[Any, ...], runs: int) -> Dict[str, Any]:
+    # Prepares the query with its $n placeholders intact, prints the plan and returns latency stats.
+    cur.execute(f"PREPARE {name}(text, int, int) AS {sql}")
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) EXECUTE {name}(%s, %s, %s)", params)
+    plan = "\n".join(row[0] for row in cur.fetchall())
+
+    timings: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cur.execute(f"EXECUTE {name}(%s, %s, %s)", params)
+        cur.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    cur.execute(f"DEALLOCATE {name}")
+
+    print(f"\n=== {name} {params} ===\n{plan}")
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "max_ms": round(max(timings), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"),
+                        help="Postgres connection string (defaults to DATABASE_URL)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--term", default="energy",
+                        help="Search term used for all queries")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the scratch schema after the run")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(CREATE_TABLE_SQL)
+
+        print(f"Seeding {args.rows} rows...")
+        start = time.perf_counter()
+        cur.execute(SEED_SQL, {"rows": args.rows,
+                    "words": WORDS, "word_count": len(WORDS)})
+        cur.execute(f'ANALYZE {SCHEMA}."Analysis"')
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        cur.execute(f"SET search_path TO {SCHEMA}, public")
+        pattern = (f"%{args.term}%", args.limit, 0)
+        results: Dict[str, Dict[str, Any]] = {}
+        results["before: legacy ILIKE/unnest"] = explain(
+            cur, "legacy_search", LEGACY_SEARCH_SQL, pattern, args.runs)
+
+        print("\nCreating search indexes...")
+        start = time.perf_counter()
+        cur.execute(CREATE_INDEXES_SQL)
+        cur.execute(f'ANALYZE {SCHEMA}."Analysis"')
+        print(f"Indexes built in {time.perf_counter() - start:.1f}s")
+
+        results["after: legacy ILIKE/unnest"] = explain(
+            cur, "legacy_search", LEGACY_SEARCH_SQL, pattern, args.runs)
+        results["after: trigram substring"] = explain(
+            cur, "substring_search", SEARCH_SQL, pattern, args.runs)
+        results["after: ranked full-text"] = explain(
+            cur, "fulltext_search", FULLTEXT_SEARCH_SQL, (args.term, args.limit, 0), args.runs)
+
+        print("\n" + json.dumps(results, indent=2))
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
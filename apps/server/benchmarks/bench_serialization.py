@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Measures the CPU time /search spends turning a page of rows into its JSON body, at 50 and 200 rows per
+page, for the full view and the summary view (no original_text):
+
+- legacy: the previous route. model_validate() per row, then FastAPI validates and serializes the
+  models again through the route's response_model.
+- type_adapter: one TypeAdapter validating the page and dumping it to JSON in a single call.
+- orjson: the current route. The rows are encoded as they are (src.utils.serialization.encode_rows).
+
+The requests are sent straight to an in-process ASGI app, with no sockets or database, so the
+difference between the variants is the serialization work alone. CPU time is process time per request.
+
+Usage (from apps/server):
+    python -m benchmarks.bench_serialization [--requests 500] [--rounds 5] [--text-chars 2000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Union
+
+from fastapi import FastAPI, Response
+from pydantic import TypeAdapter
+
+from benchmarks.bench_metrics import call
+from src.models.analysis import AnalysisProjection, AnalysisResult, SearchResponse
+from src.utils.serialization import encode_rows
+
+PAGE_SIZES = (50, 200)
+VIEWS = ("full", "summary")
+VARIANTS = ("legacy", "type_adapter", "orjson")
+WORDS = ["climate", "energy", "health", "finance", "markets", "education", "policy", "security",
+         "software", "research", "medicine", "transport", "agriculture", "water", "housing", "retail"]
+
+
+def make_rows(count: int, view: str, text_chars: int, rng: random.Random) -> List[Dict[str, Any]]:
+    # Rows as query_raw returns them for the view's columns.
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for index in range(count):
+        row = {
+            "id": index + 1,
+            "title": " ".join(rng.sample(WORDS, 4)).title(),
+            "topics": rng.sample(WORDS, 3),
+            "sentiment": rng.choice(["positive", "neutral", "negative"]),
+            "keywords": rng.sample(WORDS, 3),
+            "summary": " ".join(rng.choices(WORDS, k=40)),
+            "createdAt": created + timedelta(seconds=index, microseconds=rng.randrange(1000000)),
+            "confidence_score": round(rng.random(), 4),
+            "chunk_count": 1,
+        }
+        if view == "full":
+            row["original_text"] = " ".join(rng.choices(WORDS, k=text_chars // 8))[:text_chars]
+        rows.append(row)
+    return rows
+
+
+def build_app(pages: Dict[str, List[Dict[str, Any]]]) -> FastAPI:
+    app = FastAPI()
+    adapters = {
+        AnalysisResult: TypeAdapter(List[AnalysisResult]),
+        AnalysisProjection: TypeAdapter(List[AnalysisProjection]),
+    }
+
+    def model_for(page: str) -> type:
+        return AnalysisResult if page.startswith("full") else AnalysisProjection
+
+    @app.get("/legacy/{page}", response_model=Union[List[Union[AnalysisResult, AnalysisProjection]], SearchResponse],
+             response_model_exclude_unset=True)
+    async def legacy(page: str):
+        result_model = model_for(page)
+        return [result_model.model_validate(res) for res in pages[page]]
+
+    @app.get("/type_adapter/{page}")
+    async def type_adapter(page: str) -> Response:
+        adapter = adapters[model_for(page)]
+        body = adapter.dump_json(adapter.validate_python(pages[page]), exclude_unset=True)
+        return Response(content=body, media_type="application/json")
+
+    @app.get("/orjson/{page}")
+    async def orjson_rows(page: str) -> Response:
+        return Response(content=encode_rows(pages[page]), media_type="application/json")
+
+    return app
+
+
+async def response_json(app: FastAPI, path: str) -> Any:
+    chunks: List[bytes] = []
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "headers": [], "scheme": "http", "server": ("bench", 80),
+             "client": ("bench", 1), "root_path": ""}
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return json.loads(b"".join(chunks))
+
+
+async def cpu_per_request_us(app: FastAPI, path: str, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        await call(app, "GET", path)
+    return (time.process_time() - start) / requests * 1e6
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    pages = {f"{view}-{size}": make_rows(size, view, args.text_chars, rng) for view in VIEWS for size in PAGE_SIZES}
+    app = build_app(pages)
+
+    # All variants must return the same document.
+    for page in pages:
+        bodies = [await response_json(app, f"/{variant}/{page}") for variant in VARIANTS]
+        assert all(body == bodies[0] for body in bodies), f"variants disagree on {page}"
+
+    results: Dict[str, Dict[str, float]] = {}
+    for page in pages:
+        for variant in VARIANTS:
+            await cpu_per_request_us(app, f"/{variant}/{page}", 10)
+        # Alternate the variants and keep the best round of each, as in bench_metrics.
+        rounds: Dict[str, List[float]] = {variant: [] for variant in VARIANTS}
+        for _ in range(args.rounds):
+            for variant in VARIANTS:
+                rounds[variant].append(await cpu_per_request_us(app, f"/{variant}/{page}", args.requests))
+        best = {variant: min(values) for variant, values in rounds.items()}
+        results[page] = {
+            **{f"{variant}_us": round(best[variant], 1) for variant in VARIANTS},
+            "saved_us": round(best["legacy"] - best["orjson"], 1),
+            "speedup": round(best["legacy"] / best["orjson"], 1),
+        }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--text-chars", type=int, default=2000, help="Length of original_text in full rows")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    print()
+    for page, result in results.items():
+        print(f"{page:>12}: {result['legacy_us']:8.1f} us -> {result['orjson_us']:7.1f} us CPU per request "
+              f"({result['saved_us']} us saved, {result['speedup']}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+import gc
+import glob
+import os
+import tempfile
+
+# Production launcher: gunicorn managing uvicorn workers.
+#
+#     gunicorn -c gunicorn.conf.py main:app
+#
+# The app (settings, prompts, routes) and the SpaCy model are loaded once in the master, then the
+# workers are forked and share those pages copy-on-write instead of each loading its own copy. Nothing
+# is connected before the fork: every worker runs the app lifespan itself and so opens its own Prisma
+# connection (and query engine), LLM client and job queue. The Postgres tier of the analysis cache is
+# shared by all workers; the in-memory tier is per worker.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Async workers heartbeat from their event loop, so this only fires when a loop is blocked, not on
+# slow LLM calls.
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Keyword extraction keeps its process pool, sized to one process per worker by default: in a thread,
+# SpaCy holds the GIL while it parses and stalls the worker's event loop, delaying every LLM stream and
+# response it is serving. The pool forks its processes from the worker, so they inherit the model
+# preloaded in the master rather than loading their own; each process only adds the pages it writes
+# while parsing. A spawn start method (KEYWORD_POOL_START_METHOD=spawn) gives every pool process its
+# own model again. KEYWORD_POOL_ENABLED=false runs extraction in a thread against the preloaded model.
+os.environ.setdefault("KEYWORD_POOL_WORKERS", "1")
+os.environ.setdefault("KEYWORD_POOL_START_METHOD", "fork")
+
+# Counters and histograms go to per-process files so /metrics reports all workers. This has to be set
+# before prometheus_client is imported, and files left by a previous run would be counted again.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "llm-knowledge-extractor-metrics"))
+os.makedirs(metrics_dir, exist_ok=True)
+for stale_file in glob.glob(os.path.join(metrics_dir, "*.db")):
+    os.remove(stale_file)
+
+# Keep the collector off while the app and model load, then freeze everything allocated so far (see
+# when_ready). A collection walks and writes to object headers, which would copy the shared pages
+# into every worker.
+gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master once the app is preloaded, right before the workers are forked.
+    from src.utils.keywords import load_model
+    from src.utils.logging import logger
+    from src.utils.memory import format_memory, process_memory
+
+    # Loaded in every mode: the workers use it directly when the pool is disabled and fork their
+    # pool processes from it otherwise.
+    state = load_model()
+    gc.freeze()
+    gc.enable()
+    logger.info(
+        f"Master {os.getpid()} forking {server.num_workers} workers (model: {state}, "
+        f"{format_memory(process_memory())}, {gc.get_freeze_count()} objects frozen).")
+
+
+def post_worker_init(worker):
+    from src.utils.logging import logger
+    from src.utils.memory import format_memory, process_memory
+
+    logger.info(f"Worker {worker.pid} forked ({format_memory(process_memory())}).")
+
+
+def child_exit(server, worker):
+    # Runs in the master when a worker exits; its counters and histograms keep counting in the totals.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Offline backfill: analyzes a JSONL file of documents with the same pipeline as
+POST /api/v1/analyze/ingest, in-process and without a running server. It uses the configured database,
+LLM and keyword settings (.env), reads the file incrementally and writes one NDJSON result per line as
+soon as it is ready: {"line": 3, "status": "success", "analysis": {...}} or
+{"line": 4, "status": "error", "error": "..."}. Logs go to stderr.
+
+Each line is an /analyze request body ({"text": "...", "bypass_cache": false}). For other record
+layouts, --text-field names the field holding the text.
+
+Usage (from apps/server):
+    python ingest.py documents.jsonl [--output results.jsonl] [--concurrency 8] [--text-field body]
+    cat documents.jsonl | python ingest.py -
+
+Exits non-zero when any line failed.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+
+from src.api.v1.dependencies import get_analysis_service, get_llm_client
+from src.config import settings
+from src.db.database import connect_to_db, disconnect_from_db
+from src.services.analysis_service import resolve_fields
+from src.services.keyword_executor import keyword_executor
+from src.services.llm_client import close_llm_client, start_llm_client
+from src.utils.ndjson import iter_lines
+from src.utils.serialization import dumps
+
+READ_BYTES = 64 * 1024
+
+
+async def read_chunks(source: BinaryIO) -> AsyncIterator[bytes]:
+    while chunk := await asyncio.to_thread(source.read, READ_BYTES):
+        yield chunk
+
+
+async def with_text_field(lines: AsyncIterator[Tuple[int, Optional[bytes]]],
+                          text_field: str) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    # Rewrites each record into an /analyze request body. Lines that aren't JSON objects are passed
+    # on unchanged, so they are reported like any other invalid line.
+    async for line_number, line in lines:
+        if line is not None:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                line = dumps({"text": record.get(text_field), "bypass_cache": record.get("bypass_cache", False)})
+        yield line_number, line
+
+
+async def run(args: argparse.Namespace, source: BinaryIO, output: BinaryIO) -> int:
+    selected = resolve_fields(args.view)
+    await connect_to_db()
+    await keyword_executor.start()
+    await start_llm_client()
+    failed = 0
+    try:
+        analysis_service = get_analysis_service(get_llm_client())
+        lines = iter_lines(read_chunks(source), settings.ingest_max_line_bytes)
+        if args.text_field != "text":
+            lines = with_text_field(lines, args.text_field)
+        async for result in analysis_service.ingest_lines(lines, args.concurrency, selected):
+            failed += result["status"] == "error"
+            output.write(dumps(result) + b"\n")
+            output.flush()
+    finally:
+        await close_llm_client()
+        await keyword_executor.shutdown()
+        await disconnect_from_db()
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file to analyze, or - for stdin")
+    parser.add_argument("--output", help="Write the results here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=settings.ingest_max_concurrency,
+                        help="Documents analyzed at once")
+    parser.add_argument("--text-field", default="text", help="Field of each record holding the text")
+    parser.add_argument("--view", choices=("full", "summary"), default="summary",
+                        help="Fields of the returned analyses; 'summary' omits original_text")
+    args = parser.parse_args()
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        return asyncio.run(run(args, source, output))
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,27 @@
+import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Dict
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from src.utils.logging import setup_logging, logger
-from src.db.database import connect_to_db, disconnect_from_db, DatabaseError, prisma
+from src.db.database import connect_to_db, disconnect_from_db, DatabaseError, prisma, query_stats
 from src.api.v1.routes.analysis import analysis_router as analysis_v1_router
-from src.utils.errors import StandardError
+from src.api.v1.routes.jobs import jobs_router as jobs_v1_router
+from src.api.v1.dependencies import get_analysis_service, get_llm_client
+from src.services.keyword_executor import keyword_executor
+from src.services.llm_client import start_llm_client, close_llm_client, connection_stats
+from src.services.llm_scheduler import llm_scheduler
+from src.services.analysis_cache import analysis_cache
+from src.services.search_cache import search_cache
+from src.services.job_queue import analysis_job_queue
+from src.utils.errors import StandardError, counting_http_exception_handler
+from src.utils.memory import format_memory, process_memory
+from src.utils.single_flight import analysis_flights
+from src.utils.metrics import MetricsMiddleware, count_error, generate_metrics, register_stats
 
 # Setup logging configuration
 setup_logging()
@@ -15,8 +30,17 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     try:
+        # Started first: a fork-based pool forks its processes here, before the database client and
+        # the other services start threads of their own.
+        await keyword_executor.start()
         await connect_to_db()
-        logger.info("Server is starting up.")
+        await analysis_cache.start()
+        await start_llm_client()
+        # Job workers build their AnalysisService the same way request handlers do.
+        await analysis_job_queue.start(lambda: get_analysis_service(get_llm_client()))
+        # Under gunicorn every worker logs this, which shows how much memory each additional worker costs.
+        logger.info(
+            f"Server is starting up (pid {os.getpid()}, {format_memory(process_memory())}).")
         yield
     except DatabaseError as e:
         # Handle db specific errors
@@ -30,6 +54,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         raise
     finally:
         logger.info("Shutting down...")
+        await analysis_job_queue.shutdown()
+        await close_llm_client()
+        await analysis_cache.shutdown()
+        await keyword_executor.shutdown()
         await disconnect_from_db()
 
 # Initialize the FastAPI app with lifespan
@@ -43,9 +71,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it wraps everything else and times the full request.
+app.add_middleware(MetricsMiddleware)
+
+# App-wide stats exposed on /metrics, read at scrape time.
+register_stats("analysis_cache", analysis_cache.stats,
+               counters=("memory_hits", "persistent_hits", "misses", "purged"))
+register_stats("llm_connections", connection_stats.snapshot,
+               counters=("requests", "connections_opened", "tls_handshakes", "reused_requests"))
+register_stats("llm_scheduler", llm_scheduler.snapshot,
+               counters=("admitted", "shed", "retries", "rate_limited", "wait_seconds_total"))
+register_stats("keyword_pool", lambda: {
+               "in_flight": keyword_executor.in_flight, "max_pending": keyword_executor.max_pending})
+register_stats("job_queue", analysis_job_queue.stats)
+register_stats("analysis_flights", analysis_flights.stats, counters=("started", "coalesced"))
+register_stats("search_cache", search_cache.stats, counters=("hits", "misses", "invalidations"))
+register_stats("process_memory", process_memory)
+register_stats("db_queries", query_stats.snapshot)
 
 # Include the API router
 app.include_router(analysis_v1_router, prefix="/api/v1")
+app.include_router(jobs_v1_router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -54,10 +100,47 @@ async def index() -> dict[str, str]:
     return {"message": "Server is running"}
 
 
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    # Readiness probe: only report ready once the database is connected and the keyword model is
+    # loaded and warmed up, so load balancers hold traffic until the first request would be fast.
+    checks = {
+        "database": prisma.is_connected(),
+        "keyword_model": keyword_executor.is_ready,
+    }
+    is_ready = all(checks.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if is_ready else "starting",
+            "checks": checks,
+            "keyword_model_state": keyword_executor.model_state,
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    # Prometheus scrape endpoint: application metrics plus the Prisma engine's connection pool
+    # and query metrics.
+    body = generate_metrics()
+    if prisma.is_connected():
+        try:
+            body += (await prisma.get_metrics(format="prometheus")).encode()
+        except Exception as e:
+            logger.warning(f"Failed to collect Prisma metrics: {e}")
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
+
+
+# Errors are counted in the metrics when their response is sent.
+app.add_exception_handler(StarletteHTTPException, counting_http_exception_handler)
+
+
 # Global exception handler for unhandled exceptions
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     logger.error(
         f"Internal Server Error for request {request.url}: {exc}", exc_info=True)
+    count_error("internal_error", status.HTTP_500_INTERNAL_SERVER_ERROR)
     # Use the standardized error approach
     raise StandardError.internal_error("Internal server error")
@@ -1,9 +1,13 @@
 from fastapi import Depends
-from ...db.database import prisma
+from ...db.database import prisma, get_primary_search_client, get_read_client
 
 from ...services.analysis_service import AnalysisService
-from ...services.llm_client import LLMClient
-from ...utils.keywords import extract_nouns
+from ...services.llm_client import LLMClient, get_shared_llm_client
+from ...services.keyword_executor import keyword_executor
+from ...services.analysis_cache import analysis_cache
+from ...services.search_cache import search_cache
+from ...services.job_queue import AnalysisJobQueue, analysis_job_queue
+from ...utils.single_flight import analysis_flights
 from ...utils.logging import logger
 from ...config import settings
 
@@ -11,12 +15,27 @@ from ...config import settings
 # Dependency injection functions for the endpoints
 
 def get_llm_client() -> LLMClient:
-    # initializes a singleton instance of the LLM client
-    return LLMClient(api_key=settings.llm_api_key, mock_enabled=settings.llm_mock_enabled)
+    # Returns the app-scoped LLM client so every request shares one pooled connection set.
+    return get_shared_llm_client()
 
 
 def get_analysis_service(
     llm_client: LLMClient = Depends(get_llm_client)
 ) -> AnalysisService:
     # Provides an instance of AnalysisService with its dependencies injected.
-    return AnalysisService(prisma=prisma, llm_client=llm_client, keyword_extractor=extract_nouns)
+    return AnalysisService(
+        prisma=prisma,
+        llm_client=llm_client,
+        keyword_extractor=keyword_executor.extract,
+        cache=analysis_cache if settings.analysis_cache_enabled else None,
+        batch_keyword_extractor=keyword_executor.extract_many,
+        read_prisma=get_read_client(),
+        flights=analysis_flights if settings.analysis_coalescing_enabled else None,
+        search_cache=search_cache if settings.search_cache_enabled else None,
+        primary_read_prisma=get_primary_search_client()
+    )
+
+
+def get_job_queue() -> AnalysisJobQueue:
+    # Returns the app-scoped analysis job queue.
+    return analysis_job_queue
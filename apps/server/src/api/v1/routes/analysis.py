@@ -1,14 +1,24 @@
+import asyncio
 import json
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import datetime
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from prisma import errors as prisma_errors
+from starlette.requests import ClientDisconnect
 
-from ....models.analysis import AnalysisRequest, AnalysisResult
+from ....models.analysis import AnalysisRequest, AnalysisResult, BatchAnalysisRequest, BatchAnalysisResponse, BatchItemResult, SearchResponse, AnalysisProjection
 from ..dependencies import get_analysis_service
-from ....services.analysis_service import AnalysisService
+from ....services.analysis_service import AnalysisService, resolve_fields
 from ....utils.logging import logger
-from ....utils.errors import empty_text_error, analysis_failed_error
+from ....utils.timing import StageTimer
+from ....utils.sse import format_sse
+from ....utils.pagination import decode_cursor
+from ....utils.serialization import dumps, encode_page, encode_rows
+from ....utils.ndjson import DuplexStreamingResponse, iter_lines, read_body
+from ....utils.export import EXPORT_ENCODERS, EXPORT_MEDIA_TYPES, parquet_available
+from ....utils.errors import StandardError, empty_text_error, analysis_failed_error, export_format_unavailable_error
+from ....config import settings
 
 analysis_router = APIRouter(tags=["analysis"])
 
@@ -17,6 +27,7 @@ analysis_router = APIRouter(tags=["analysis"])
 @analysis_router.post("/analyze", response_model=AnalysisResult)
 async def analyze_text(
     request: AnalysisRequest,
+    response: Response,
     analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
 
@@ -28,16 +39,115 @@ async def analyze_text(
 
     try:
         # Delegate the core logic to the service layer.
-        analysis = await analysis_service.perform_analysis(request.text)
+        timer = StageTimer()
+        analysis = await analysis_service.perform_analysis(
+            request.text, timer=timer, use_cache=not request.bypass_cache)
+        # Expose per-stage durations to clients and browser dev tools.
+        response.headers["Server-Timing"] = timer.server_timing_header()
         return AnalysisResult.model_validate(analysis)
+    except HTTPException:
+        # Keep deliberate client-facing errors (429 when rate limited, 503 when the LLM is down).
+        raise
     except Exception as e:
         # Any unexpected errors from the service layer.
         logger.error("Analysis failed: {}", str(e), exc_info=True)
         raise analysis_failed_error()
 
 
+# POST /analyze/stream
+@analysis_router.post("/analyze/stream")
+async def analyze_text_stream(
+    request: AnalysisRequest,
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    # Streams the analysis as Server-Sent Events: "delta" events carry LLM content chunks and the
+    # running confidence score, a final "complete" event carries the persisted analysis.
+    if not request.text.strip():
+        logger.warning("Received empty text input.")
+        raise empty_text_error()
+
+    async def event_stream():
+        try:
+            async for event in analysis_service.stream_analysis_events(request.text, use_cache=not request.bypass_cache):
+                if event["event"] == "complete":
+                    data = AnalysisResult.model_validate(
+                        event["data"]).model_dump(mode="json")
+                else:
+                    data = event["data"]
+                yield format_sse(event["event"], data)
+        except HTTPException as e:
+            # Headers are already sent, so errors are reported in-band as a final event.
+            yield format_sse("error", e.detail)
+        except Exception as e:
+            logger.error("Streaming analysis failed: {}", str(e), exc_info=True)
+            yield format_sse("error", analysis_failed_error().detail)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as soon as they are produced.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# POST /analyze/batch
+@analysis_router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_batch(
+    request: BatchAnalysisRequest,
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    # Analyzes many texts in one request. Items succeed or fail individually.
+    if len(request.texts) > settings.batch_max_items:
+        logger.warning(
+            f"Rejected batch of {len(request.texts)} texts (limit {settings.batch_max_items}).")
+        raise StandardError.validation_error(
+            "texts", f"a batch may contain at most {settings.batch_max_items} texts.")
+
+    results = await analysis_service.perform_batch_analysis(
+        request.texts, use_cache=not request.bypass_cache)
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return BatchAnalysisResponse(
+        results=[BatchItemResult.model_validate(result) for result in results],
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
+
+
+# POST /analyze/ingest
+@analysis_router.post("/analyze/ingest")
+async def ingest_ndjson(
+    request: Request,
+    view: Literal["full", "summary"] = Query(
+        "summary", description="Fields of the returned analyses. 'summary' (the default) omits original_text"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields of the returned analyses (id and createdAt are always included). Overrides view."),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    # Analyzes a streamed NDJSON upload with one /analyze request body per line, and streams back one
+    # NDJSON result per line as soon as it is ready, in completion order:
+    # {"line": 3, "status": "success", "analysis": {...}} or {"line": 4, "status": "error", "error": "..."}.
+    # The body is parsed as it arrives and never buffered whole.
+    selected = resolve_fields(view, fields)
+    body_done = asyncio.Event()
+    lines = iter_lines(read_body(request.receive, body_done), settings.ingest_max_line_bytes)
+
+    async def result_stream():
+        try:
+            async for result in analysis_service.ingest_lines(lines, settings.ingest_max_concurrency, selected):
+                yield dumps(result) + b"\n"
+        except ClientDisconnect:
+            logger.warning("Client disconnected during ingest.")
+        except Exception as e:
+            # The status has already been sent, so all that can be done is to cut the body short.
+            logger.error("Ingest failed: {}", str(e), exc_info=True)
+            raise
+
+    return DuplexStreamingResponse(result_stream(), body_done, media_type="application/x-ndjson")
+
+
 # GET /search
-@analysis_router.get("/search", response_model=List[AnalysisResult])
+@analysis_router.get("/search", response_model=Union[List[Union[AnalysisResult, AnalysisProjection]], SearchResponse],
+                     response_model_exclude_unset=True)
 async def search_analyses(
     topic: str = Query(
         None, description="Search analyses by a key topic or keyword."),
@@ -45,9 +155,98 @@ async def search_analyses(
         50, ge=1, le=200, description="Maximum number of results to return (1-200)"),
     offset: int = Query(
         0, ge=0, description="Number of results to skip for pagination"),
+    mode: Literal["substring", "fulltext"] = Query(
+        "substring", description="'substring' for partial matches, 'fulltext' for ranked full-text search"),
+    paginate: Literal["offset", "cursor"] = Query(
+        "offset", description="'offset' returns a plain list, 'cursor' returns a page envelope with next_cursor"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from a previous page's next_cursor. Implies paginate=cursor."),
+    view: Literal["full", "summary"] = Query(
+        "full", description="'summary' omits original_text; fetch it from /analyses/{id} when needed"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return (id and createdAt are always included). Overrides view."),
     analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     # Searches for stored analyses matching a given topic or keyword.
     # Delegate the search logic to the service layer.
-    analyses = await analysis_service.search_analyses(topic, limit=limit, offset=offset)
-    return [AnalysisResult.model_validate(res) for res in analyses]
+    # The rows are encoded to JSON directly, without validating them into models: they come from
+    # our own SELECT, which already gives them the response_model's shape.
+    selected = resolve_fields(view, fields)
+    if cursor is not None:
+        paginate = "cursor"
+
+    # Hits are served as the stored response body, after a single version lookup instead of the
+    # search query and without validating the rows.
+    cache = analysis_service.search_cache
+    if cache is not None:
+        cache_key = cache.make_key(topic, limit, offset if paginate == "offset" else 0, mode, cursor,
+                                   paginate, selected)
+        cache_version = await analysis_service.search_version()
+        body = cache.get(cache_key, cache_version)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    if paginate == "offset":
+        analyses = await analysis_service.search_analyses(topic, limit=limit, offset=offset, mode=mode, fields=selected)
+        body = encode_rows(analyses)
+    else:
+        # Keyset pagination follows (createdAt, id), which full-text results are not ordered by.
+        if mode == "fulltext":
+            raise StandardError.validation_error(
+                "paginate", "cursor pagination is only supported with mode=substring.")
+        position = decode_cursor(cursor) if cursor else None
+        analyses, next_cursor = await analysis_service.search_analyses_page(
+            topic, limit=limit, cursor=position, fields=selected)
+        body = encode_page(analyses, next_cursor)
+
+    if cache is not None:
+        cache.set(cache_key, body, cache_version)
+    return Response(content=body, media_type="application/json")
+
+
+# GET /analyses/export (declared before /analyses/{analysis_id}, which would otherwise match it)
+@analysis_router.get("/analyses/export")
+async def export_analyses(
+    export_format: Literal["ndjson", "csv", "parquet"] = Query(
+        "ndjson", alias="format", description="'ndjson' (one analysis per line), 'csv', or 'parquet' if the server has pyarrow"),
+    since: Optional[datetime] = Query(
+        None, description="Only export analyses created at or after this time (ISO 8601, UTC when no offset is given)"),
+    view: Literal["full", "summary"] = Query(
+        "full", description="'summary' omits original_text"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to export (id and createdAt are always included). Overrides view."),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    # Streams every stored analysis, oldest first, for bulk and incremental (since=) exports.
+    # Rows are read in keyset chunks and encoded chunk by chunk, so memory does not grow with the table.
+    selected = resolve_fields(view, fields)
+    if export_format == "parquet" and not parquet_available():
+        raise export_format_unavailable_error(export_format)
+
+    chunks = analysis_service.export_analyses(since=since, fields=selected, chunk_size=settings.export_chunk_size)
+
+    async def export_stream():
+        try:
+            async for piece in EXPORT_ENCODERS[export_format](chunks, selected):
+                yield piece
+        except Exception as e:
+            # The status has already been sent, so all that can be done is to cut the body short.
+            logger.error("Export failed: {}", str(e), exc_info=True)
+            raise
+
+    return StreamingResponse(
+        export_stream(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="analyses.{export_format}"'}
+    )
+
+
+# GET /analyses/{analysis_id}
+@analysis_router.get("/analyses/{analysis_id}", response_model=AnalysisResult)
+async def get_analysis(
+    analysis_id: int,
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    # Returns a single stored analysis, including the original text that summary views leave out.
+    analysis = await analysis_service.get_analysis(analysis_id)
+    return AnalysisResult.model_validate(analysis)
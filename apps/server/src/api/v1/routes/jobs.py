@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Response, status
+
+from ....models.analysis import JobSubmitRequest, JobStatusResponse
+from ..dependencies import get_job_queue
+from ....services.job_queue import AnalysisJobQueue
+from ....utils.logging import logger
+from ....utils.errors import empty_text_error
+
+jobs_router = APIRouter(tags=["jobs"])
+
+
+# POST /jobs
+@jobs_router.post("/jobs", response_model=JobStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: JobSubmitRequest,
+    response: Response,
+    job_queue: AnalysisJobQueue = Depends(get_job_queue)
+):
+    # Queues a text for analysis and returns immediately. Poll GET /jobs/{id} (see the Location header)
+    # or pass a webhook_url to be notified once the job has finished.
+    if not request.text.strip():
+        logger.warning("Received empty text input.")
+        raise empty_text_error()
+
+    job = await job_queue.submit(
+        request.text,
+        bypass_cache=request.bypass_cache,
+        webhook_url=str(request.webhook_url) if request.webhook_url else None
+    )
+    response.headers["Location"] = f"/api/v1/jobs/{job['id']}"
+    return JobStatusResponse.model_validate(job)
+
+
+# GET /jobs/{job_id}
+@jobs_router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(
+    job_id: str,
+    job_queue: AnalysisJobQueue = Depends(get_job_queue)
+):
+    # Returns the status of a job, with the analysis once it has succeeded.
+    job = await job_queue.get_status(job_id)
+    return JobStatusResponse.model_validate(job)
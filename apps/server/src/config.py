@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv, find_dotenv
 
@@ -10,11 +11,96 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(extra='ignore')
 
     database_url: str
+    # Searches are routed to this read replica when set (they may lag the primary slightly)
+    database_replica_url: Optional[str] = None
+    # Connection pool per Prisma client, passed as connection string parameters (0 = Prisma's default)
+    db_pool_size: int = 0
+    db_pool_timeout: int = 10
+    db_connect_timeout: int = 5
+    # Statement timeout for search queries in milliseconds (0 = none), set on the search connections
+    db_search_statement_timeout_ms: int = 5000
+    # Separate login for searches on the primary, e.g. a role with its own statement_timeout (default: database_url)
+    database_search_url: Optional[str] = None
     llm_api_key: str
     llm_mock_enabled: bool = True
     llm_model: str
     llm_max_tokens: int
     llm_temperature: float
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 60.0
+    llm_http2: bool = True
+    llm_timeout: float = 60.0
+    llm_connect_timeout: float = 5.0
+    # Client-side OpenAI rate limits (0 = use the limits the API reports in its rate-limit headers)
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_max_retries: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 20.0
+    # Calls waiting for rate-limit budget; beyond this, or past the max wait, requests get a 429
+    llm_max_queue_size: int = 256
+    llm_max_queue_wait: float = 30.0
+    # Mock mode: time to first token as a ms distribution ("const:0", "lognormal:300:0.5", ...),
+    # streaming speed (0 = no pacing) and the fraction of calls failing with a 500 or a 429
+    llm_mock_ttft: str = "const:0"
+    llm_mock_tokens_per_second: float = 0.0
+    llm_mock_tokens_per_chunk: int = 4
+    llm_mock_failure_rate: float = 0.0
+    llm_mock_rate_limit_rate: float = 0.0
+    llm_mock_retry_after: float = 1.0
+    llm_mock_seed: Optional[int] = None
+
+    keyword_pool_enabled: bool = True
+    keyword_pool_workers: int = 0
+    keyword_pool_max_pending: int = 64
+    keyword_pool_queue_timeout: float = 5.0
+    keyword_pool_start_method: str = "spawn"
+    keyword_batch_size: int = 64
+    keyword_n_process: int = 1
+    # Never try to download the SpaCy model (offline containers); fall back to simple extraction instead
+    spacy_offline: bool = False
+
+    analysis_cache_enabled: bool = True
+    analysis_cache_max_entries: int = 1024
+    analysis_cache_ttl_seconds: float = 3600
+    analysis_cache_persistent_enabled: bool = True
+    analysis_cache_persistent_ttl_seconds: float = 7 * 24 * 3600
+    # How often expired persistent entries are deleted (0 = never)
+    analysis_cache_purge_interval_seconds: float = 3600
+    # Concurrent identical /analyze requests share one analysis and its stored row
+    analysis_coalescing_enabled: bool = True
+    # Serialized /search responses, dropped on every insert and after the TTL
+    search_cache_enabled: bool = True
+    search_cache_ttl_seconds: float = 5.0
+    search_cache_max_entries: int = 256
+    search_cache_max_bytes: int = 32 * 1024 * 1024
+    # Rows per keyset query (and per NDJSON/CSV piece or Parquet row group) of /analyses/export, at most 10000
+    export_chunk_size: int = 1000
+    # Streamed NDJSON ingest (/analyze/ingest and ingest.py): lines analyzed at once, longest accepted line
+    ingest_max_concurrency: int = 8
+    ingest_max_line_bytes: int = 5 * 1024 * 1024
+
+    batch_max_items: int = 500
+    batch_max_concurrency: int = 8
+
+    # Texts estimated above the threshold are analyzed chunk by chunk, then merged (0 = never chunk)
+    long_document_threshold_tokens: int = 8000
+    chunk_max_tokens: int = 4000
+    chunk_max_concurrency: int = 4
+    # Max chunk analyses merged by one reduce call; more are merged hierarchically
+    chunk_reduce_fan_in: int = 16
+
+    # Asynchronous analysis jobs (POST /jobs)
+    job_workers: int = 4
+    job_poll_interval_seconds: float = 5.0
+    # Running jobs without a heartbeat for this long (their process crashed) are picked up again
+    job_stale_after_seconds: float = 600
+    job_max_attempts: int = 3
+    job_webhook_timeout: float = 10.0
+    job_webhook_retries: int = 3
+    # Comma-separated hosts webhooks may call. Empty: any https host that resolves to public addresses only
+    job_webhook_allowed_hosts: str = ""
 
 
 settings = Settings()  # type: ignore
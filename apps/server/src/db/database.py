@@ -1,10 +1,61 @@
 import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+import httpx
 from prisma import Prisma, errors as prisma_errors
+from ..config import settings
 from ..utils.logging import logger
 from ..utils.errors import database_error
+from ..utils.metrics import observe_query
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+def pooled_url(url: str) -> str:
+    # Adds the pool settings to a Postgres URL as Prisma connection string parameters. Parameters
+    # already in the URL win, so a deployment can still tune a single datasource by hand.
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    pool_params = {
+        "connection_limit": settings.db_pool_size,
+        "pool_timeout": settings.db_pool_timeout,
+        "connect_timeout": settings.db_connect_timeout,
+    }
+    for name, value in pool_params.items():
+        # 0 keeps Prisma's default (connection_limit: num_cpus * 2 + 1).
+        if value:
+            query.setdefault(name, str(value))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def search_url(url: str) -> str:
+    # Pooled URL for the search clients. Their connections run every statement under the search statement
+    # timeout, sent once as a startup option when the connection opens, so searches need no transaction
+    # or SET per query. Options already in the URL are kept.
+    url = pooled_url(url)
+    timeout_ms = settings.db_search_statement_timeout_ms
+    if timeout_ms <= 0:
+        return url
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    option = f"-c statement_timeout={int(timeout_ms)}"
+    query["options"] = f"{query['options']} {option}" if query.get("options") else option
+    return urlunsplit(parts._replace(query=urlencode(query, quote_via=quote)))
+
 
 # Global Prisma client instance for the application.
-prisma = Prisma()
+prisma = Prisma(datasource={"url": pooled_url(settings.database_url)})
+# Client for searches on the primary, with its own connections carrying the search statement timeout.
+# Without a timeout or a separate search login, searches share the main client.
+primary_search: Optional[Prisma] = Prisma(
+    datasource={"url": search_url(settings.database_search_url or settings.database_url)}
+) if settings.db_search_statement_timeout_ms > 0 or settings.database_search_url else None
+# Optional read replica that searches are routed to, keeping their load off the primary.
+replica: Optional[Prisma] = Prisma(
+    datasource={"url": search_url(settings.database_replica_url)}) if settings.database_replica_url else None
 
 
 class DatabaseError(Exception):
@@ -12,6 +63,67 @@ class DatabaseError(Exception):
     pass
 
 
+class QueryStats:
+
+    # Queries in flight per client. Each Prisma client has its own pool of `db_pool_size`
+    # connections, so in-flight counts close to the pool size mean queries are queueing for one.
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {PRIMARY: 0, REPLICA: 0}
+        self.max_in_flight: Dict[str, int] = {PRIMARY: 0, REPLICA: 0}
+
+    @asynccontextmanager
+    async def track(self, operation: str, target: str = PRIMARY) -> AsyncIterator[None]:
+        # Times one query (including its wait for a pooled connection) as db_query_duration_seconds.
+        self.in_flight[target] += 1
+        self.max_in_flight[target] = max(self.max_in_flight[target], self.in_flight[target])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight[target] -= 1
+            observe_query(operation, target, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"pool_size": settings.db_pool_size}
+        for target in (PRIMARY, REPLICA):
+            stats[f"{target}_in_flight"] = self.in_flight[target]
+            stats[f"{target}_max_in_flight"] = self.max_in_flight[target]
+        return stats
+
+
+query_stats = QueryStats()
+
+
+def get_primary_search_client() -> Prisma:
+    # Client for searches on the primary.
+    return primary_search if primary_search is not None and primary_search.is_connected() else prisma
+
+
+def get_read_client() -> Prisma:
+    # Client for read-only queries that tolerate replication lag (searches).
+    return replica if replica is not None and replica.is_connected() else get_primary_search_client()
+
+
+def is_statement_timeout(error: Exception) -> bool:
+    # Postgres cancels the statement with SQLSTATE 57014 (query_canceled).
+    message = str(error)
+    return "57014" in message or "statement timeout" in message
+
+
+# Prisma errors for a database that can't be reached or dropped the connection: P1001 (can't reach
+# the server), P1002 (server timed out), P1008 (operation timed out) and P1017 (server closed the connection).
+CONNECTION_ERROR_CODES = ("P1001", "P1002", "P1008", "P1017")
+
+
+def is_connection_error(error: Exception) -> bool:
+    # True when a query failed because of its connection (or the query engine's), not because of the query.
+    if isinstance(error, (prisma_errors.ClientNotConnectedError, httpx.TransportError)):
+        return True
+    message = str(error)
+    return any(code in message for code in CONNECTION_ERROR_CODES) or "Can't reach database server" in message
+
+
 async def connect_to_db() -> None:
     logger.info("Attempting to connect to the database...")
     try:
@@ -25,7 +137,26 @@ async def connect_to_db() -> None:
             f"An unexpected error occurred during database connection: {e}")
         raise database_error()
 
+    if primary_search is not None:
+        # Searches fall back to the main client (without the search timeout) if this one can't connect.
+        try:
+            await primary_search.connect()
+            logger.info("Search connection established.")
+        except Exception as e:
+            logger.error(f"Search connection failed, searches will use the main connection: {e}")
+
+    if replica is not None:
+        # Searches fall back to the primary while the replica is unreachable.
+        try:
+            await replica.connect()
+            logger.info("Read replica connection established.")
+        except Exception as e:
+            logger.error(f"Read replica connection failed, searches will use the primary: {e}")
+
 
 async def disconnect_from_db() -> None:
     logger.info("Disconnecting from the database...")
+    for client in (replica, primary_search):
+        if client is not None and client.is_connected():
+            await client.disconnect()
     await prisma.disconnect()
@@ -1,11 +1,13 @@
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl
 
 
 class AnalysisRequest(BaseModel):
     text: str = Field(
         min_length=1, description="The unstructured text to be analyzed.")
+    bypass_cache: bool = Field(
+        default=False, description="Skip the analysis cache and always call the LLM.")
 
 
 class AnalysisResult(BaseModel):
@@ -17,8 +19,68 @@ class AnalysisResult(BaseModel):
     summary: str
     original_text: Optional[str]
     confidence_score: Optional[float]
+    chunk_count: int = Field(
+        default=1, description="Number of chunks a long document was analyzed in (1 if it was not split).")
     createdAt: datetime
 
 
+class AnalysisProjection(BaseModel):
+    # A search result restricted to the requested fields (see `view` / `fields` on /search).
+    id: int
+    createdAt: datetime
+    title: Optional[str] = None
+    topics: Optional[List[str]] = None
+    sentiment: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    summary: Optional[str] = None
+    original_text: Optional[str] = None
+    confidence_score: Optional[float] = None
+    chunk_count: Optional[int] = None
+
+
 class SearchResponse(BaseModel):
-    analyses: List[AnalysisResult]
+    analyses: List[Union[AnalysisResult, AnalysisProjection]]
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass as `cursor` to fetch the next page. Null on the last page.")
+
+
+class BatchAnalysisRequest(BaseModel):
+    texts: List[str] = Field(
+        min_length=1, description="The unstructured texts to be analyzed.")
+    bypass_cache: bool = Field(
+        default=False, description="Skip the analysis cache and always call the LLM.")
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: Literal["success", "error"]
+    analysis: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
+class JobSubmitRequest(BaseModel):
+    text: str = Field(
+        min_length=1, description="The unstructured text to be analyzed.")
+    bypass_cache: bool = Field(
+        default=False, description="Skip the analysis cache and always call the LLM.")
+    webhook_url: Optional[HttpUrl] = Field(
+        default=None, description="Called with the job status (POST, JSON) once the job has finished. "
+        "Must be https and resolve to a public address (or a host allowed by JOB_WEBHOOK_ALLOWED_HOSTS).")
+
+
+class JobStatusResponse(BaseModel):
+    id: str
+    status: Literal["pending", "running", "succeeded", "failed"]
+    attempts: int
+    error: Optional[str] = None
+    analysis_id: Optional[int] = None
+    analysis: Optional[AnalysisResult] = None
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from prisma import Prisma
+from ..config import settings
+from ..db.database import prisma
+from ..utils.logging import logger
+from ..utils.lru import TTLCache
+from ..utils.prompts import KNOWLEDGE_EXTRACTION_PROMPT_VERSION
+
+# Fields of an analysis that are derived from the input text and can be reused for identical requests.
+CACHED_FIELDS = ("summary", "title", "topics",
+                 "sentiment", "keywords", "confidence_score", "chunk_count")
+
+
+def normalize_text(text: str) -> str:
+    # Collapses whitespace so that re-submitted documents differing only in formatting share a cache entry.
+    return " ".join(text.split())
+
+
+def _copy_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Copy list values so callers can't mutate the cached entry.
+    return {key: list(value) if isinstance(value, list) else value for key, value in payload.items()}
+
+
+class AnalysisCache:
+
+    # Content-addressed cache of analysis results keyed on the normalized text hash plus the model
+    # configuration (model name, temperature, prompt version). An in-process LRU tier with TTL
+    # sits in front of a persistent tier stored in the AnalysisCacheEntry table, which survives restarts.
+    # Expired persistent entries are skipped when read and deleted every `purge_interval` seconds.
+
+    def __init__(self, prisma: Prisma, max_entries: int, ttl_seconds: float,
+                 persistent_enabled: bool = True, persistent_ttl_seconds: float = 7 * 24 * 3600,
+                 purge_interval: float = 3600):
+        self.prisma = prisma
+        self.memory: TTLCache[Dict[str, Any]] = TTLCache(
+            max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.persistent_enabled = persistent_enabled
+        self.persistent_ttl_seconds = persistent_ttl_seconds
+        self.purge_interval = purge_interval
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._purge_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        # Starts purging expired persistent entries in the background (a no-op without the persistent tier).
+        if self._purge_task is not None or not self.persistent_enabled or self.purge_interval <= 0:
+            return
+        self._purge_task = asyncio.create_task(self._purge_periodically())
+
+    async def shutdown(self) -> None:
+        if self._purge_task is None:
+            return
+        self._purge_task.cancel()
+        await asyncio.gather(self._purge_task, return_exceptions=True)
+        self._purge_task = None
+
+    async def _purge_periodically(self) -> None:
+        while True:
+            await self.purge_expired()
+            await asyncio.sleep(self.purge_interval)
+
+    async def purge_expired(self) -> int:
+        # Deletes persistent entries past their TTL and returns how many were removed. Several
+        # processes may purge at the same time; the delete is idempotent.
+        try:
+            count = await self.prisma.analysiscacheentry.delete_many(
+                where={"createdAt": {"lt": self._persistent_cutoff()}})
+        except Exception as e:
+            logger.warning(f"Failed to purge expired analysis cache entries: {e}")
+            return 0
+        if count:
+            self.purged += count
+            logger.info(f"Purged {count} expired analysis cache entries.")
+        return count
+
+    def _persistent_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.persistent_ttl_seconds)
+
+    @staticmethod
+    def make_key(text: str, model_name: str, temperature: float, variant: str = "") -> str:
+        # `variant` distinguishes other settings the result depends on (e.g. how a long document was chunked).
+        digest = hashlib.sha256()
+        for part in (model_name, repr(temperature), KNOWLEDGE_EXTRACTION_PROMPT_VERSION, variant, normalize_text(text)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self.memory.get(key)
+        if payload is not None:
+            self.memory_hits += 1
+            logger.info(f"Analysis cache hit (memory) for key {key[:12]}.")
+            return _copy_payload(payload)
+
+        if self.persistent_enabled:
+            payload = await self._get_persistent(key)
+            if payload is not None:
+                self.persistent_hits += 1
+                logger.info(
+                    f"Analysis cache hit (persistent) for key {key[:12]}.")
+                # Promote to the memory tier for subsequent lookups
+                self.memory.set(key, payload)
+                return _copy_payload(payload)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, payload: Dict[str, Any]) -> None:
+        payload = {field: payload.get(field) for field in CACHED_FIELDS}
+        self.memory.set(key, _copy_payload(payload))
+
+        if not self.persistent_enabled:
+            return
+        try:
+            data = {**payload, "createdAt": datetime.now(timezone.utc)}
+            await self.prisma.analysiscacheentry.upsert(
+                where={"key": key},
+                data={"create": {"key": key, **data}, "update": data}
+            )
+        except Exception as e:
+            # The persistent tier is an optimization, a failed write must never fail the request.
+            logger.warning(f"Failed to persist analysis cache entry: {e}")
+
+    async def _get_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = await self.prisma.analysiscacheentry.find_unique(where={"key": key})
+        except Exception as e:
+            logger.warning(f"Failed to read persistent analysis cache: {e}")
+            return None
+
+        if entry is None or entry.createdAt < self._persistent_cutoff():
+            return None
+        return {field: getattr(entry, field) for field in CACHED_FIELDS}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "purged": self.purged,
+            "memory_entries": len(self.memory)
+        }
+
+
+# Global cache instance for the application, shared by all requests.
+analysis_cache = AnalysisCache(
+    prisma=prisma,
+    max_entries=settings.analysis_cache_max_entries,
+    ttl_seconds=settings.analysis_cache_ttl_seconds,
+    persistent_enabled=settings.analysis_cache_persistent_enabled,
+    persistent_ttl_seconds=settings.analysis_cache_persistent_ttl_seconds,
+    purge_interval=settings.analysis_cache_purge_interval_seconds
+)
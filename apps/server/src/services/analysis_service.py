@@ -1,125 +1,790 @@
+import asyncio
 import json
-import math
-from prisma import Prisma
-from typing import Callable, List, Dict, Any
+import time
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from prisma import Prisma, errors as prisma_errors
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Sequence, Set, Tuple, TypeVar
+from ..config import settings
 from ..services.llm_client import LLMClient
-from ..models.analysis import AnalysisResult
+from ..services.analysis_cache import AnalysisCache
+from ..services.search_cache import SearchResultCache
+from ..db.database import PRIMARY, REPLICA, is_connection_error, is_statement_timeout, query_stats
+from pydantic import ValidationError
+from ..models.analysis import AnalysisRequest, AnalysisResult
 from ..utils.logging import logger
-from ..utils.errors import llm_unavailable_error, database_error
+from ..utils.errors import (StandardError, llm_unavailable_error, database_error, analysis_not_found_error,
+                            search_timeout_error)
+from ..utils.confidence import ConfidenceTracker, weighted_confidence
+from ..utils.chunking import split_into_chunks
+from ..utils.timing import StageTimer
+from ..utils.metrics import LLM_COMPLETION_TOKENS, LLM_TIME_TO_FIRST_TOKEN, observe_stages
+from ..utils.tokens import estimate_tokens
+from ..utils.pagination import encode_cursor, to_naive_utc
+from ..utils.single_flight import SingleFlight
+from ..utils.prompts import get_analysis_messages, get_reduce_messages
+
+T = TypeVar("T")
+
+# Fields a search can return, in column order. Listed explicitly because "Analysis" also has a
+# generated search_vector column that is only used for full-text matching.
+ANALYSIS_FIELDS = ("id", "title", "topics", "sentiment", "keywords",
+                   "summary", "createdAt", "confidence_score", "original_text", "chunk_count")
+# Always selected, whatever the projection: they identify a row and form its pagination cursor.
+REQUIRED_FIELDS = ("id", "createdAt")
+# List views never display the source document, which is by far the largest column.
+SUMMARY_VIEW_FIELDS = tuple(
+    field for field in ANALYSIS_FIELDS if field != "original_text")
+
+
+def column_list(fields: Sequence[str]) -> str:
+    return ", ".join(f'"{field}"' for field in fields)
+
+
+ANALYSIS_COLUMNS = column_list(ANALYSIS_FIELDS)
+
+# Substring search. The first condition is served by the trigram GIN indexes on summary, title and
+# search_tags, the generated topic/keyword text (combined with a BitmapOr). The second condition
+# rechecks the exact per-element semantics, since the joined text could also match across two array elements.
+SEARCH_CONDITION = """
+    (summary ILIKE $1
+     OR title ILIKE $1
+     OR search_tags ILIKE $1)
+    AND (summary ILIKE $1
+         OR title ILIKE $1
+         OR EXISTS (SELECT 1 FROM unnest(topics) AS t WHERE t ILIKE $1)
+         OR EXISTS (SELECT 1 FROM unnest(keywords) AS k WHERE k ILIKE $1))
+"""
+
+# Results are ordered newest first with id as the tie-breaker, matching the composite
+# ("createdAt" DESC, id DESC) index so pages are stable and keyset seeks can use it.
+NEWEST_FIRST = 'ORDER BY "createdAt" DESC, "id" DESC'
+
+# The query templates below take the projected column list as {columns}, so list views only
+# read the columns they return.
+SEARCH_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+WHERE {SEARCH_CONDITION}
+{NEWEST_FIRST}
+LIMIT $2 OFFSET $3
+"""
+
+LIST_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+{NEWEST_FIRST}
+LIMIT $1 OFFSET $2
+"""
+
+# Keyset variants: continue strictly after the (createdAt, id) position carried by the cursor
+# instead of skipping OFFSET rows, so deep pages cost the same as the first one and rows
+# inserted during a scroll never shift the remaining pages.
+KEYSET_SEARCH_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+WHERE {SEARCH_CONDITION}
+    AND ("createdAt", "id") < ($2::timestamp, $3)
+{NEWEST_FIRST}
+LIMIT $4
+"""
+
+KEYSET_LIST_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+WHERE ("createdAt", "id") < ($1::timestamp, $2)
+{NEWEST_FIRST}
+LIMIT $3
+"""
+
+# Exports walk the whole table oldest first, in keyset chunks (the composite index serves the
+# ascending order too), optionally starting at a createdAt.
+# Chunks run on the search clients, under the search statement timeout. A chunk is an index range
+# scan whose cost grows with its size, not with the table (about 15 ms per 10,000 cached rows), so
+# the chunk size is capped to stay far inside the timeout even when the rows come from disk.
+MAX_EXPORT_CHUNK_SIZE = 10000
+OLDEST_FIRST = 'ORDER BY "createdAt", "id"'
+
+EXPORT_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+{OLDEST_FIRST}
+LIMIT $1
+"""
+
+EXPORT_SINCE_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+WHERE "createdAt" >= $1::timestamp
+{OLDEST_FIRST}
+LIMIT $2
+"""
+
+KEYSET_EXPORT_SQL_TEMPLATE = f"""
+SELECT {{columns}} FROM "Analysis"
+WHERE ("createdAt", "id") > ($1::timestamp, $2)
+{OLDEST_FIRST}
+LIMIT $3
+"""
+
+# Version of the table for the search result cache. Analyses are only ever inserted, so the highest
+# id changes whenever a row becomes visible; an index-only lookup on the primary key.
+SEARCH_VERSION_SQL = 'SELECT max("id") AS version FROM "Analysis"'
+
+# Ranked full-text search over the weighted search_vector column (title and topics rank highest).
+FULLTEXT_SEARCH_SQL_TEMPLATE = """
+SELECT {columns}, ts_rank_cd(search_vector, query) AS rank
+FROM "Analysis", websearch_to_tsquery('english', $1) AS query
+WHERE search_vector @@ query
+ORDER BY rank DESC, "createdAt" DESC, "id" DESC
+LIMIT $2 OFFSET $3
+"""
+
+SEARCH_SQL = SEARCH_SQL_TEMPLATE.format(columns=ANALYSIS_COLUMNS)
+FULLTEXT_SEARCH_SQL = FULLTEXT_SEARCH_SQL_TEMPLATE.format(
+    columns=ANALYSIS_COLUMNS)
+
+
+def resolve_fields(view: str = "full", fields: Optional[str] = None) -> Tuple[str, ...]:
+    # Turns the `view` / comma-separated `fields` options of a search into the columns to select.
+    # An explicit field list wins over the view. Unknown fields are rejected with a 400.
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in ANALYSIS_FIELDS]
+        if unknown:
+            raise StandardError.validation_error(
+                "fields", f"unknown field(s) {', '.join(unknown)}. Allowed: {', '.join(ANALYSIS_FIELDS)}.")
+        selected = set(requested) | set(REQUIRED_FIELDS)
+        return tuple(field for field in ANALYSIS_FIELDS if field in selected)
+    if view == "summary":
+        return SUMMARY_VIEW_FIELDS
+    return ANALYSIS_FIELDS
+
+
+# Columns written by the bulk insert and the casts Postgres needs for their parameters.
+# "createdAt" is bound explicitly: its column default (CURRENT_TIMESTAMP) is in the session time zone,
+# while Prisma's create writes UTC, so relying on the default would skew bulk rows on a non-UTC server.
+BULK_INSERT_COLUMNS = ("summary", "title", "topics", "sentiment",
+                       "keywords", "original_text", "confidence_score", "chunk_count", "createdAt")
+BULK_INSERT_CASTS = {"topics": "::text[]", "keywords": "::text[]",
+                     "confidence_score": "::double precision", "chunk_count": "::integer",
+                     "createdAt": "::timestamptz AT TIME ZONE 'UTC'"}
+
+
+def _build_result(llm_output: Dict[str, Any], keywords: List[str], confidence_score: Optional[float],
+                  chunk_count: int = 1) -> Dict[str, Any]:
+    # Combines the stage outputs into the analysis fields that are cached and persisted.
+    return {
+        "summary": llm_output.get("summary", ""),
+        "title": llm_output.get("title"),
+        "topics": llm_output.get("topics", []),
+        "sentiment": llm_output.get("sentiment", "unknown"),
+        "keywords": keywords,
+        "confidence_score": confidence_score,
+        "chunk_count": chunk_count
+    }
+
+
+def _parse_llm_output(content: str) -> Dict[str, Any]:
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        logger.error(f"Failed to parse LLM response as JSON: {content}")
+        raise llm_unavailable_error()
+
+
+def _partial_analysis(llm_output: Dict[str, Any]) -> Dict[str, Any]:
+    # The part of a chunk's analysis that is passed on to the reduce prompt.
+    return {key: llm_output.get(key) for key in ("summary", "title", "topics", "sentiment")}
+
+
+async def _gather_or_cancel(*aws: Awaitable[T]) -> List[T]:
+    # Like asyncio.gather, but cancels the remaining work as soon as one awaitable fails.
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _error_message(error: BaseException) -> str:
+    # Extracts the client-facing message from a StandardError HTTPException.
+    if isinstance(error, HTTPException) and isinstance(error.detail, dict):
+        return error.detail.get("message", "Text analysis failed.")
+    return "Text analysis failed."
 
 
 class AnalysisService:
 
     # Service layer handling text analysis logic, integrating LLM calls and database operations.
 
-    def __init__(self, prisma: Prisma, llm_client: LLMClient, keyword_extractor: Callable[[str], List[str]]):
+    def __init__(self, prisma: Prisma, llm_client: LLMClient, keyword_extractor: Callable[[str], Awaitable[List[str]]],
+                 cache: Optional[AnalysisCache] = None,
+                 batch_keyword_extractor: Optional[Callable[[List[str]], Awaitable[List[List[str]]]]] = None,
+                 read_prisma: Optional[Prisma] = None,
+                 flights: Optional[SingleFlight] = None, search_cache: Optional[SearchResultCache] = None,
+                 primary_read_prisma: Optional[Prisma] = None):
         self.prisma = prisma
+        # Searches read from `read_prisma` (a replica) when given, everything else uses `prisma`.
+        # `primary_read_prisma` is the primary's search client, used when the replica fails.
+        self.primary_read_prisma = primary_read_prisma or prisma
+        self.read_prisma = read_prisma or self.primary_read_prisma
+        self.read_target = PRIMARY if self.read_prisma in (prisma, self.primary_read_prisma) else REPLICA
         self.llm_client = llm_client
         self.keyword_extractor = keyword_extractor
+        self.cache = cache
+        self.batch_keyword_extractor = batch_keyword_extractor
+        self.flights = flights
+        self.search_cache = search_cache
 
-    async def perform_analysis(self, text: str) -> Dict[str, Any]:
+    async def perform_analysis(self, text: str, timer: Optional[StageTimer] = None, use_cache: bool = True) -> Dict[str, Any]:
 
         logger.info("Starting analysis for input text.")
+        timer = timer or StageTimer()
+
+        with timer.stage("total"):
+            if self.flights is None:
+                analysis = await self._analyze_and_save(text, timer, use_cache)
+            else:
+                # Identical requests arriving while this text is being analyzed share one LLM call,
+                # keyword extraction and row instead of each starting their own.
+                flight_key = f"{self._cache_key(text)}:{'cached' if use_cache else 'fresh'}"
+                analysis = await self._join_flight(flight_key, text, timer, use_cache)
+
+        observe_stages(timer.durations)
+        logger.info(
+            f"Successfully performed and saved analysis for text ({timer.summary()}).")
+        return analysis
+
+    async def _join_flight(self, flight_key: str, text: str, timer: StageTimer, use_cache: bool) -> Dict[str, Any]:
+        # The flight times its stages on its own timer, since it outlives the caller that started it.
+        # That caller reports those stages. Callers that joined an analysis already in flight report
+        # their wait for it as a "coalesced" stage instead, so their work isn't counted twice.
+        async def analyze() -> Tuple[Dict[str, Any], StageTimer]:
+            return await self._analyze_and_save(text, flight_timer, use_cache), flight_timer
+
+        flight_timer = StageTimer()
+        started = time.perf_counter()
+        analysis, used_timer = await self.flights.do(flight_key, analyze)
+        if used_timer is flight_timer:
+            timer.durations.update(flight_timer.durations)
+        else:
+            timer.durations["coalesced"] = (time.perf_counter() - started) * 1000
+        return dict(analysis)
+
+    async def _analyze_and_save(self, text: str, timer: StageTimer, use_cache: bool) -> Dict[str, Any]:
+        # 1. Reuse a previous result for identical text and model configuration when available.
+        cache_key, result = await self._lookup_cache(text, timer, use_cache)
+
+        # 2. On a miss, compute the analysis and store it for subsequent requests.
+        if result is None:
+            result = await self._compute_analysis(text, timer)
+            if self.cache is not None and cache_key is not None:
+                await self.cache.set(cache_key, result)
+
+        # 3. Persist the analysis to the database.
+        return await self._save_analysis(result, text, timer)
+
+    async def stream_analysis_events(self, text: str, use_cache: bool = True) -> AsyncGenerator[Dict[str, Any], None]:
+        # Same pipeline as perform_analysis, but yields events as it goes: a "delta" event per LLM
+        # content chunk (with the running confidence score) and a final "complete" event carrying
+        # the persisted analysis, including its id and keywords.
+        logger.info("Starting streaming analysis for input text.")
+        timer = StageTimer()
+
+        # Unlike perform_analysis, a stream never joins a single-flight analysis: its deltas come from
+        # its own LLM stream as they are generated, and its work stops when its client disconnects, so
+        # identical streams can't share one. "total" covers the whole pipeline, including the time
+        # the client takes to receive the deltas.
+        with timer.stage("total"):
+            cache_key, result = await self._lookup_cache(text, timer, use_cache)
+            if result is not None:
+                cached_output = {field: result[field] for field in (
+                    "summary", "title", "topics", "sentiment")}
+                yield {"event": "delta", "data": {"content": json.dumps(cached_output), "confidence": result["confidence_score"]}}
+            else:
+                keyword_task = asyncio.create_task(
+                    self._run_keyword_stage(text, timer))
+                try:
+                    if self._is_long_document(text):
+                        # Chunk analyses can't be streamed as one JSON document, so the merged result
+                        # is sent as a single delta once the reduce step has finished.
+                        with timer.stage("llm"):
+                            llm_output, confidence_score, chunk_count = await self._run_chunked_llm_stage(text)
+                        yield {"event": "delta", "data": {"content": json.dumps(llm_output), "confidence": confidence_score}}
+                    else:
+                        full_response_content = ""
+                        confidence = ConfidenceTracker()
+                        with timer.stage("llm"):
+                            async for content in self._stream_llm(get_analysis_messages(text), confidence):
+                                full_response_content += content
+                                yield {"event": "delta", "data": {"content": content, "confidence": confidence.score}}
+
+                        with timer.stage("parse"):
+                            llm_output = _parse_llm_output(full_response_content)
+                        confidence_score, chunk_count = confidence.score, 1
+                    keywords = await keyword_task
+                finally:
+                    # Stops keyword extraction if the LLM failed or the client disconnected.
+                    keyword_task.cancel()
+
+                result = _build_result(
+                    llm_output, keywords, confidence_score, chunk_count)
+                if self.cache is not None and cache_key is not None:
+                    await self.cache.set(cache_key, result)
+
+            analysis = await self._save_analysis(result, text, timer)
+        observe_stages(timer.durations)
+        logger.info(
+            f"Successfully streamed and saved analysis for text ({timer.summary()}).")
+        yield {"event": "complete", "data": analysis}
+
+    async def perform_batch_analysis(self, texts: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+        # Analyzes many texts at once. LLM calls fan out under a concurrency limit and a token-rate
+        # budget, keywords are extracted in one batched pass, and every successful row is inserted with
+        # a single multi-row INSERT. Each item reports its own success or failure instead of failing the batch.
+        logger.info(f"Starting batch analysis for {len(texts)} texts.")
+
+        results: Dict[int, Dict[str, Any]] = {}
+        errors: Dict[int, str] = {}
+        cache_keys: Dict[int, str] = {}
+        to_compute: List[int] = []
+
+        # 1. Validate items and serve what we can from the cache.
+        for index, text in enumerate(texts):
+            if not text.strip():
+                errors[index] = "Input text cannot be empty."
+                continue
+            if self.cache is not None:
+                cache_keys[index] = self._cache_key(text)
+                if use_cache:
+                    cached = await self.cache.get(cache_keys[index])
+                    if cached is not None:
+                        results[index] = cached
+                        continue
+            to_compute.append(index)
+
+        # 2. Extract keywords for the whole batch while the LLM calls are in flight.
+        keyword_task = asyncio.create_task(
+            self._extract_keywords_batch([texts[index] for index in to_compute]))
+        semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+
+        async def run_llm(index: int) -> Tuple[Dict[str, Any], Optional[float], int]:
+            # Token and request budgets are applied per LLM call by the shared scheduler.
+            async with semaphore:
+                return await self._run_llm_stage(texts[index], StageTimer())
 
-        # 1. Call the LLM to get summary, title, topics, and sentiment.
-        llm_response = None
-        full_response_content = ""
-        all_logprobs = []
         try:
-            async for response_data in self.llm_client.stream_analysis(text):
-                full_response_content += response_data["content"]
-                if response_data["logprobs"]:
-                    all_logprobs.extend(response_data["logprobs"])
-        except Exception as e:
-            logger.error(f"LLM streaming failed: {e}", exc_info=True)
-            raise llm_unavailable_error()
+            llm_outcomes = await asyncio.gather(*(run_llm(index) for index in to_compute), return_exceptions=True)
+            try:
+                keyword_lists: List[Optional[List[str]]] = list(await keyword_task)
+                keyword_error = None
+            except Exception as e:
+                logger.error(
+                    f"Batch keyword extraction failed: {e}", exc_info=True)
+                keyword_lists = [None] * len(to_compute)
+                keyword_error = _error_message(e)
+        except BaseException:
+            keyword_task.cancel()
+            raise
 
-        # 2. Calculate confidence score from logprobs
-        confidence_score = None
-        if all_logprobs:
-            # Average logprob per token. logprobs are negative so closer to 0 = higher confidence
-            avg_logprob = sum(all_logprobs) / len(all_logprobs)
+        # 3. Join the stages per item.
+        newly_computed: List[int] = []
+        for index, outcome, keywords in zip(to_compute, llm_outcomes, keyword_lists):
+            if isinstance(outcome, BaseException):
+                errors[index] = _error_message(outcome)
+            elif keywords is None:
+                errors[index] = keyword_error or "Keyword extraction failed."
+            else:
+                llm_output, confidence_score, chunk_count = outcome
+                results[index] = _build_result(
+                    llm_output, keywords, confidence_score, chunk_count)
+                newly_computed.append(index)
 
-           # Convert to percentage confidence score (0-100)
-            raw_confidence = math.exp(avg_logprob)
-            confidence_score = min(100.0, max(0.0, raw_confidence * 100))
+        if self.cache is not None:
+            await asyncio.gather(*(self.cache.set(cache_keys[index], results[index]) for index in newly_computed))
 
-            logger.info(
-                f"Calculated confidence: avg_logprob={avg_logprob:.4f}, raw_confidence={raw_confidence:.4f}, final_score={confidence_score:.2f}%")
+        # 4. Persist all successful items in one round trip.
+        succeeded = sorted(results)
+        analyses: Dict[int, Dict[str, Any]] = {}
+        if succeeded:
+            try:
+                rows = await self._bulk_insert([{**results[index], "original_text": texts[index]} for index in succeeded])
+                analyses = dict(zip(succeeded, rows))
+            except Exception as e:
+                logger.error(
+                    f"Failed to bulk save batch analyses to database: {e}", exc_info=True)
+                message = _error_message(database_error())
+                for index in succeeded:
+                    errors[index] = message
 
-        # 3. Parse the LLM's streaming response content.
+        logger.info(
+            f"Batch analysis finished: {len(analyses)} succeeded, {len(errors)} failed.")
+        return [
+            {"index": index, "status": "success", "analysis": analyses[index]} if index in analyses
+            else {"index": index, "status": "error", "error": errors.get(index, "Text analysis failed.")}
+            for index in range(len(texts))
+        ]
+
+    async def ingest_lines(self, lines: AsyncIterator[Tuple[int, Optional[bytes]]], concurrency: int,
+                           fields: Sequence[str] = ANALYSIS_FIELDS) -> AsyncGenerator[Dict[str, Any], None]:
+        # Analyzes NDJSON lines (each an /analyze request body) as they are read, at most `concurrency`
+        # at a time, and yields one result per line in completion order. A line holds its slot until its
+        # result has been taken, and the next line is only read once a slot is free: a fast producer or
+        # a slow consumer holds the reader back instead of piling up lines or results in memory.
+        # Analyses are returned with the given `fields`.
+        slots = asyncio.Semaphore(concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        in_flight: Set[asyncio.Task] = set()
+
+        async def analyze(line_number: int, line: Optional[bytes]) -> None:
+            results.put_nowait(await self._ingest_line(line_number, line, fields))
+
+        async def read() -> None:
+            async for line_number, line in lines:
+                await slots.acquire()
+                task = asyncio.create_task(analyze(line_number, line))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            if in_flight:
+                await asyncio.wait(set(in_flight))
+
+        reader = asyncio.create_task(read())
+        # Wakes the loop below when the reader is done (or has failed) and no results are left.
+        reader.add_done_callback(lambda _: results.put_nowait(None))
+        succeeded = failed = 0
         try:
-            llm_output = json.loads(full_response_content)
-        except json.JSONDecodeError:
-            logger.error(
-                f"Failed to parse LLM response as JSON: {full_response_content}")
-            raise llm_unavailable_error()
+            while (result := await results.get()) is not None:
+                slots.release()
+                if result["status"] == "success":
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield result
+            # Re-raises a failed read, e.g. a client disconnecting mid-upload.
+            await reader
+        finally:
+            # A consumer that goes away cancels the lines still being analyzed, like a lone request.
+            for task in (reader, *in_flight):
+                task.cancel()
+            logger.info(f"Ingest finished: {succeeded} succeeded, {failed} failed.")
 
-        # 4. Perform local, CPU-bound keyword extraction.
-        keywords = self.keyword_extractor(text)
+    async def _ingest_line(self, line_number: int, line: Optional[bytes], fields: Sequence[str]) -> Dict[str, Any]:
+        if line is None:
+            return {"line": line_number, "status": "error",
+                    "error": f"Line exceeds {settings.ingest_max_line_bytes} bytes."}
+        try:
+            request = AnalysisRequest.model_validate_json(line)
+        except ValidationError as e:
+            return {"line": line_number, "status": "error",
+                    "error": f"Invalid request: {e.errors(include_url=False)[0]['msg']}"}
+        if not request.text.strip():
+            return {"line": line_number, "status": "error", "error": "Input text cannot be empty."}
 
-        # 5. Persist the analysis to the database.
         try:
-            analysis_data = {
-                "summary": llm_output.get("summary", ""),
-                "title": llm_output.get("title"),
-                "topics": llm_output.get("topics", []),
-                "sentiment": llm_output.get("sentiment", "unknown"),
-                "keywords": keywords,
-                "original_text": text,
-                "confidence_score": confidence_score
-            }
-            analysis = await self.prisma.analysis.create(data=analysis_data)
+            analysis = await self.perform_analysis(request.text, use_cache=not request.bypass_cache)
         except Exception as e:
-            logger.error(
-                f"Failed to save analysis to database: {e}", exc_info=True)
-            raise database_error()
+            if not isinstance(e, HTTPException):
+                logger.error("Ingest analysis of line {} failed: {}", line_number, str(e), exc_info=True)
+            return {"line": line_number, "status": "error", "error": _error_message(e)}
+        return {"line": line_number, "status": "success", "analysis": {field: analysis[field] for field in fields}}
+
+    async def _lookup_cache(self, text: str, timer: StageTimer, use_cache: bool) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        # Returns the cache key for the text (None without a cache) and the cached result, if any.
+        if self.cache is None:
+            return None, None
+
+        cache_key = self._cache_key(text)
+        if not use_cache:
+            return cache_key, None
+        with timer.stage("cache"):
+            return cache_key, await self.cache.get(cache_key)
+
+    def _cache_key(self, text: str) -> str:
+        # Chunked results also depend on how the document was split and merged.
+        variant = ""
+        if self._is_long_document(text):
+            variant = f"chunked:{settings.chunk_max_tokens}:{settings.chunk_reduce_fan_in}"
+        return AnalysisCache.make_key(text, self.llm_client.model_name, settings.llm_temperature, variant)
+
+    async def _save_analysis(self, result: Dict[str, Any], text: str, timer: StageTimer) -> Dict[str, Any]:
+        with timer.stage("db"):
+            try:
+                analysis_data = {**result, "original_text": text}
+                async with query_stats.track("insert"):
+                    analysis = await self.prisma.analysis.create(data=analysis_data)
+            except Exception as e:
+                logger.error(
+                    f"Failed to save analysis to database: {e}", exc_info=True)
+                raise database_error()
 
-        logger.info(f"Successfully performed and saved analysis for text.")
         # Convert Prisma object to dict for the API response
         return analysis.model_dump()
 
-    async def search_analyses(self, query: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    async def _extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        if not texts:
+            return []
+        if self.batch_keyword_extractor is not None:
+            return await self.batch_keyword_extractor(texts)
+        return list(await asyncio.gather(*(self.keyword_extractor(text) for text in texts)))
+
+    async def _bulk_insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Inserts all rows with a single multi-row INSERT ... RETURNING instead of one create per row.
+        values_sql = []
+        params: List[Any] = []
+        # One timestamp for the whole statement, like the column default would give.
+        created_at = datetime.now(timezone.utc)
+        for row in rows:
+            placeholders = []
+            for column in BULK_INSERT_COLUMNS:
+                params.append(created_at if column == "createdAt" else row[column])
+                placeholders.append(
+                    f"${len(params)}{BULK_INSERT_CASTS.get(column, '')}")
+            values_sql.append(f"({', '.join(placeholders)})")
+
+        column_sql = ", ".join(f'"{column}"' for column in BULK_INSERT_COLUMNS)
+        insert_sql = f'INSERT INTO "Analysis" ({column_sql}) VALUES {", ".join(values_sql)} RETURNING {ANALYSIS_COLUMNS}'
+        async with query_stats.track("bulk_insert"):
+            inserted = await self.prisma.query_raw(insert_sql, *params)
+        # Serial ids are assigned in VALUES order, so sorting by id restores the input order.
+        return sorted(inserted, key=lambda row: row["id"])
+
+    async def _compute_analysis(self, text: str, timer: StageTimer) -> Dict[str, Any]:
+        # Runs the LLM call (with streaming confidence computation) and the local keyword
+        # extraction concurrently. Keywords depend only on the input text, so latency
+        # becomes the slower of the two stages instead of their sum.
+        llm_task = asyncio.create_task(self._run_llm_stage(text, timer))
+        keyword_task = asyncio.create_task(
+            self._run_keyword_stage(text, timer))
+        try:
+            (llm_output, confidence_score, chunk_count), keywords = await asyncio.gather(llm_task, keyword_task)
+        except BaseException:
+            # One stage failed (or the request was cancelled): don't leave the other one running.
+            llm_task.cancel()
+            keyword_task.cancel()
+            raise
+
+        return _build_result(llm_output, keywords, confidence_score, chunk_count)
+
+    async def _stream_llm(self, messages: List[Dict[str, str]], confidence: ConfidenceTracker) -> AsyncGenerator[str, None]:
+        # Yields LLM content deltas as they arrive, folding their logprobs into `confidence`.
+        started = time.perf_counter()
+        first_token = True
+        try:
+            async for response_data in self.llm_client.stream_completion(messages):
+                if response_data["logprobs"]:
+                    confidence.add(response_data["logprobs"])
+                    LLM_COMPLETION_TOKENS.inc(len(response_data["logprobs"]))
+                if response_data["content"]:
+                    if first_token:
+                        LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+                        first_token = False
+                    yield response_data["content"]
+        except HTTPException:
+            # Already a client-facing error, e.g. a 429 when the LLM rate limits are exhausted.
+            raise
+        except Exception as e:
+            logger.error(f"LLM streaming failed: {e}", exc_info=True)
+            raise llm_unavailable_error()
+
+    def _is_long_document(self, text: str) -> bool:
+        threshold = settings.long_document_threshold_tokens
+        return threshold > 0 and estimate_tokens(text) > threshold
+
+    async def _run_llm_stage(self, text: str, timer: StageTimer) -> Tuple[Dict[str, Any], Optional[float], int]:
+        # Runs the LLM part of an analysis. Returns the parsed output, the confidence score and the
+        # number of chunks the text was analyzed in (1 unless it is a long document).
+        if self._is_long_document(text):
+            with timer.stage("llm"):
+                return await self._run_chunked_llm_stage(text)
+
+        llm_output, confidence_score = await self._complete_json(get_analysis_messages(text), timer)
+        return llm_output, confidence_score, 1
+
+    async def _run_chunked_llm_stage(self, text: str) -> Tuple[Dict[str, Any], Optional[float], int]:
+        # Map-reduce for documents too long for one call: token-bounded chunks are analyzed concurrently,
+        # then their analyses are merged by the reduce prompt (hierarchically when there are many).
+        # The confidence score is the mean of the chunk scores weighted by each chunk's token count.
+        chunks = split_into_chunks(text, settings.chunk_max_tokens)
+        logger.info(
+            f"Analyzing long document (~{estimate_tokens(text)} tokens) in {len(chunks)} chunks.")
+        semaphore = asyncio.Semaphore(settings.chunk_max_concurrency)
+
+        async def complete(messages: List[Dict[str, str]]) -> Tuple[Dict[str, Any], Optional[float]]:
+            async with semaphore:
+                return await self._complete_json(messages, StageTimer())
+
+        outcomes = await _gather_or_cancel(*(complete(get_analysis_messages(chunk)) for chunk in chunks))
+        confidence_score = weighted_confidence(
+            (score, estimate_tokens(chunk)) for (_, score), chunk in zip(outcomes, chunks))
+
+        async def merge(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+            if len(group) == 1:
+                return group[0]
+            merged, _ = await complete(get_reduce_messages(group))
+            return merged
+
+        fan_in = max(2, settings.chunk_reduce_fan_in)
+        partials = [_partial_analysis(output) for output, _ in outcomes]
+        while len(partials) > 1:
+            groups = [partials[i:i + fan_in]
+                      for i in range(0, len(partials), fan_in)]
+            partials = [_partial_analysis(output) for output in await _gather_or_cancel(*(merge(group) for group in groups))]
+
+        return partials[0], confidence_score, len(chunks)
+
+    async def _complete_json(self, messages: List[Dict[str, str]], timer: StageTimer) -> Tuple[Dict[str, Any], Optional[float]]:
+        # Streams the LLM response, folding logprobs into the confidence score as they arrive,
+        # then parses the JSON payload. Returns the parsed output and the confidence score.
+        full_response_content = ""
+        confidence = ConfidenceTracker()
+        with timer.stage("llm"):
+            async for content in self._stream_llm(messages, confidence):
+                full_response_content += content
+
+        confidence_score = confidence.score
+        if confidence_score is not None:
+            logger.info(
+                f"Calculated confidence: avg_logprob={confidence.avg_logprob:.4f}, final_score={confidence_score:.2f}%")
+
+        # Parse the LLM's streaming response content.
+        with timer.stage("parse"):
+            llm_output = _parse_llm_output(full_response_content)
+
+        return llm_output, confidence_score
+
+    async def _run_keyword_stage(self, text: str, timer: StageTimer) -> List[str]:
+        # Local, CPU-bound keyword extraction, executed off the event loop.
+        with timer.stage("keywords"):
+            return await self.keyword_extractor(text)
+
+    async def search_version(self) -> int:
+        # Current version of the Analysis table for the search result cache, read from the same client
+        # as the searches so a lagging replica reports the rows it can actually return. Ids are taken
+        # at insert time, not commit time, so a row committed after one with a higher id doesn't
+        # change the version; results missing it can be served for at most the cache TTL.
+        rows = await self._search_query("search_version", SEARCH_VERSION_SQL)
+        return rows[0]["version"] or 0
+
+    async def search_analyses(self, query: str, limit: int = 50, offset: int = 0, mode: str = "substring",
+                              fields: Sequence[str] = ANALYSIS_FIELDS) -> List[Dict[str, Any]]:
         # Search database for analyses based on a topic or keyword with pagination.
+        # mode="substring" matches partial text (case-insensitive), mode="fulltext" returns ranked full-text matches.
+        # Only the given `fields` are selected, so list views can leave the source text in storage.
         logger.info(
-            f"Searching analyses for query: '{query}', limit: {limit}, offset: {offset}")
+            f"Searching analyses for query: '{query}', mode: {mode}, limit: {limit}, offset: {offset}")
 
+        columns = column_list(fields)
         if query:
-            # Raw SQL is used for optimal performance with PostgreSQL array operations
-            search_sql = """
-            SELECT * FROM "Analysis" 
-            WHERE 
-                -- Search in text fields (case-insensitive)
-                summary ILIKE $1
-                OR title ILIKE $1
-                -- Search in array fields using unnest for partial matching
-                OR EXISTS (SELECT 1 FROM unnest(topics) AS t WHERE t ILIKE $1)
-                OR EXISTS (SELECT 1 FROM unnest(keywords) AS k WHERE k ILIKE $1)
-            ORDER BY "createdAt" DESC
-            LIMIT $2 OFFSET $3
-            """
-
-            # Prepare the search pattern for ILIKE (case-insensitive partial match)
-            search_pattern = f"%{query}%"
-
-            # Execute the optimized raw SQL query with pagination
-            analyses = await self.prisma.query_raw(
-                search_sql,
-                search_pattern,
-                limit,
-                offset
-            )
+            if mode == "fulltext":
+                analyses = await self._search_query(
+                    "search_fulltext", FULLTEXT_SEARCH_SQL_TEMPLATE.format(columns=columns), query, limit, offset)
+            else:
+                # Prepare the search pattern for ILIKE (case-insensitive partial match)
+                search_pattern = f"%{query}%"
+                analyses = await self._search_query(
+                    "search_substring", SEARCH_SQL_TEMPLATE.format(columns=columns), search_pattern, limit, offset)
         else:
             # No query so return all analyses with reasonable ordering and pagination
-            analyses = await self.prisma.analysis.find_many(
-                skip=offset,
-                take=limit,
-                order={"createdAt": "desc"}
-            )
-            # Convert to list of dicts for consistency with raw query result
-            analyses = [analysis.model_dump() for analysis in analyses]
+            analyses = await self._search_query(
+                "list", LIST_SQL_TEMPLATE.format(columns=columns), limit, offset)
 
         logger.info(
             f"Found {len(analyses)} analyses for query: '{query}' (limit: {limit}, offset: {offset})")
 
         return analyses
+
+    async def search_analyses_page(self, query: str, limit: int = 50,
+                                   cursor: Optional[Tuple[datetime, int]] = None,
+                                   fields: Sequence[str] = ANALYSIS_FIELDS) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset-paginated substring search (or listing when there is no query), newest first.
+        # `cursor` is the decoded (createdAt, id) position to continue after. Returns the page and
+        # the cursor for the next one, or None once the last page has been reached.
+        logger.info(
+            f"Searching analyses for query: '{query}', limit: {limit}, cursor: {cursor}")
+
+        # Fetch one extra row to find out whether another page follows without a COUNT query.
+        fetch = limit + 1
+        columns = column_list(fields)
+        if cursor is None:
+            if query:
+                analyses = await self._search_query(
+                    "search_substring", SEARCH_SQL_TEMPLATE.format(columns=columns), f"%{query}%", fetch, 0)
+            else:
+                analyses = await self._search_query(
+                    "list", LIST_SQL_TEMPLATE.format(columns=columns), fetch, 0)
+        else:
+            created_at, analysis_id = cursor
+            if query:
+                analyses = await self._search_query(
+                    "search_substring", KEYSET_SEARCH_SQL_TEMPLATE.format(columns=columns), f"%{query}%",
+                    created_at.isoformat(), analysis_id, fetch)
+            else:
+                analyses = await self._search_query(
+                    "list", KEYSET_LIST_SQL_TEMPLATE.format(columns=columns), created_at.isoformat(), analysis_id, fetch)
+
+        next_cursor = None
+        if len(analyses) > limit:
+            analyses = analyses[:limit]
+            last = analyses[-1]
+            next_cursor = encode_cursor(last["createdAt"], last["id"])
+
+        logger.info(
+            f"Found {len(analyses)} analyses for query: '{query}' (limit: {limit}, more: {next_cursor is not None})")
+
+        return analyses, next_cursor
+
+    async def export_analyses(self, since: Optional[datetime] = None, fields: Sequence[str] = ANALYSIS_FIELDS,
+                              chunk_size: int = 1000) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        # Yields every analysis created at or after `since` (all of them without it), oldest first, in
+        # chunks of `chunk_size` rows. Each chunk is one keyset query continuing after the last row of the
+        # previous one, so memory stays at one chunk and no connection or transaction is held between
+        # chunks. Rows inserted during an export are included when they sort after its position.
+        # Chunks are read like searches, including the fallback to the primary when the replica is down.
+        chunk_size = min(chunk_size, MAX_EXPORT_CHUNK_SIZE)
+        columns = column_list(fields)
+        if since is None:
+            sql, params = EXPORT_SQL_TEMPLATE.format(columns=columns), ()
+        else:
+            sql, params = EXPORT_SINCE_SQL_TEMPLATE.format(columns=columns), (to_naive_utc(since).isoformat(),)
+        exported = 0
+        while True:
+            rows = await self._search_query("export", sql, *params, chunk_size)
+            if rows:
+                exported += len(rows)
+                yield rows
+            if len(rows) < chunk_size:
+                break
+            last = rows[-1]
+            sql = KEYSET_EXPORT_SQL_TEMPLATE.format(columns=columns)
+            params = (to_naive_utc(last["createdAt"]).isoformat(), last["id"])
+        logger.info(f"Exported {exported} analyses (since: {since}).")
+
+    async def _search_query(self, operation: str, sql: str, *params: Any) -> List[Dict[str, Any]]:
+        # Runs a search query on the read client. A replica that fails with a connection error (it went
+        # down after startup) gets the query retried once on the primary.
+        try:
+            return await self._run_search_query(self.read_prisma, self.read_target, operation, sql, *params)
+        except Exception as e:
+            if self.read_target != REPLICA or not is_connection_error(e):
+                raise
+            logger.warning(f"Read replica unavailable ({e}), retrying search ({operation}) on the primary.")
+        return await self._run_search_query(self.primary_read_prisma, PRIMARY, operation, sql, *params)
+
+    async def _run_search_query(self, client: Prisma, target: str, operation: str, sql: str,
+                                *params: Any) -> List[Dict[str, Any]]:
+        # The search clients' connections carry the search statement timeout (see database.search_url).
+        try:
+            async with query_stats.track(operation, target):
+                return await client.query_raw(sql, *params)
+        except prisma_errors.PrismaError as e:
+            if not is_statement_timeout(e):
+                raise
+            logger.warning(
+                f"Search query ({operation}) cancelled after {settings.db_search_statement_timeout_ms} ms.")
+            raise search_timeout_error()
+
+    async def get_analysis(self, analysis_id: int) -> Dict[str, Any]:
+        # Fetches one stored analysis including its original text.
+        # Always read from the primary: clients fetch an analysis right after creating it.
+        async with query_stats.track("get"):
+            analysis = await self.prisma.analysis.find_unique(where={"id": analysis_id})
+        if analysis is None:
+            raise analysis_not_found_error()
+        return analysis.model_dump()
@@ -0,0 +1,329 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import AbstractSet, Any, Callable, Dict, Optional, Set
+import httpx
+from fastapi import HTTPException, status
+from prisma import Prisma
+from ..config import settings
+from ..db.database import prisma
+from ..services.analysis_service import AnalysisService
+from ..utils.logging import logger
+from ..utils.errors import database_error, invalid_webhook_url_error, job_not_found_error
+from ..utils.webhooks import WebhookTargetError, parse_allowed_hosts, pinned_request, resolve_webhook_target
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def _status_value(status: Any) -> str:
+    # Prisma returns enum members, the API and webhooks use the plain string.
+    return getattr(status, "value", status)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class AnalysisJobQueue:
+
+    # Durable queue of analysis jobs. Jobs are stored in the AnalysisJob table and drained by a pool of
+    # in-process worker tasks. Ids are handed to workers through an in-memory queue, and a poller picks
+    # up jobs this process doesn't know about yet (submitted before a restart or by another process).
+    # Workers claim a job with a conditional pending -> running update, so a job only runs once even
+    # when several processes poll the same table. While a job runs, its worker refreshes updatedAt every
+    # `stale_after / 4` seconds; only jobs whose process stopped doing so (it crashed) are requeued.
+    # Transient failures (5xx, connection errors) are retried on a later poll, up to `max_attempts` in total.
+
+    def __init__(self, prisma: Prisma, workers: int = 4, poll_interval: float = 5.0, stale_after: float = 600,
+                 max_attempts: int = 3, webhook_timeout: float = 10.0, webhook_retries: int = 3,
+                 webhook_allowed_hosts: AbstractSet[str] = frozenset()):
+        self.prisma = prisma
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = stale_after / 4
+        self.max_attempts = max_attempts
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.webhook_allowed_hosts = webhook_allowed_hosts
+        self._service_factory: Optional[Callable[[], AnalysisService]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._webhook_tasks: Set[asyncio.Task] = set()
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._queue is not None
+
+    @property
+    def depth(self) -> int:
+        # Jobs queued in this process and not yet picked up by a worker.
+        return len(self._queued)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": len(self._queued), "running": len(self._running)}
+
+    async def start(self, service_factory: Callable[[], AnalysisService]) -> None:
+        if self.is_running:
+            return
+
+        self._service_factory = service_factory
+        self._queue = asyncio.Queue()
+        self._http_client = httpx.AsyncClient(timeout=self.webhook_timeout)
+        logger.info(f"Starting analysis job queue with {self.workers} workers.")
+
+        for number in range(self.workers):
+            self._spawn(self._worker(number))
+        # The first poll requeues jobs left over from before the restart.
+        self._spawn(self._poll())
+
+    async def shutdown(self) -> None:
+        if not self.is_running:
+            return
+
+        logger.info("Shutting down analysis job queue...")
+        interrupted = list(self._running)
+        tasks = self._tasks | self._webhook_tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Interrupted jobs go back to pending so the next start runs them again right away.
+        if interrupted:
+            try:
+                await self.prisma.analysisjob.update_many(
+                    where={"id": {"in": interrupted}, "status": JOB_RUNNING},
+                    data={"status": JOB_PENDING}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to release interrupted jobs: {e}")
+
+        await self._http_client.aclose()
+        self._queue, self._http_client = None, None
+        self._tasks, self._webhook_tasks = set(), set()
+        self._queued, self._running = set(), set()
+
+    async def submit(self, text: str, bypass_cache: bool = False, webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        # Persists a new pending job and queues it for the workers. Returns its status.
+        if webhook_url is not None:
+            try:
+                await resolve_webhook_target(webhook_url, self.webhook_allowed_hosts)
+            except WebhookTargetError as e:
+                logger.warning(f"Rejected webhook URL for analysis job: {e}")
+                raise invalid_webhook_url_error(str(e))
+
+        try:
+            job = await self.prisma.analysisjob.create(data={
+                "text": text,
+                "bypass_cache": bypass_cache,
+                "webhook_url": webhook_url
+            })
+        except Exception as e:
+            logger.error(f"Failed to create analysis job: {e}", exc_info=True)
+            raise database_error()
+
+        logger.info(f"Queued analysis job {job.id}.")
+        self._enqueue(job.id)
+        return self._to_status(job)
+
+    async def get_status(self, job_id: str) -> Dict[str, Any]:
+        # Returns the job status, including the analysis once the job has succeeded.
+        job = await self.prisma.analysisjob.find_unique(where={"id": job_id})
+        if job is None:
+            raise job_not_found_error()
+
+        status = self._to_status(job)
+        if job.analysis_id is not None:
+            analysis = await self.prisma.analysis.find_unique(where={"id": job.analysis_id})
+            if analysis is not None:
+                status["analysis"] = analysis.model_dump()
+        return status
+
+    def _to_status(self, job: Any) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "status": _status_value(job.status),
+            "attempts": job.attempts,
+            "error": job.error,
+            "analysis_id": job.analysis_id,
+            "createdAt": job.createdAt,
+            "startedAt": job.startedAt,
+            "finishedAt": job.finishedAt
+        }
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _enqueue(self, job_id: str) -> None:
+        if self._queue is None or job_id in self._queued or job_id in self._running:
+            return
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self._requeue_stale_jobs()
+                pending = await self.prisma.analysisjob.find_many(
+                    where={"status": JOB_PENDING},
+                    order={"createdAt": "asc"},
+                    take=max(100, self.workers * 10)
+                )
+                for job in pending:
+                    self._enqueue(job.id)
+            except Exception as e:
+                logger.warning(f"Polling for pending analysis jobs failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _requeue_stale_jobs(self) -> None:
+        # Jobs left running by a process that crashed go back to pending once their heartbeat is stale.
+        cutoff = _now() - timedelta(seconds=self.stale_after)
+        count = await self.prisma.analysisjob.update_many(
+            where={"status": JOB_RUNNING, "updatedAt": {"lt": cutoff}},
+            data={"status": JOB_PENDING}
+        )
+        if count:
+            logger.warning(f"Requeued {count} stale analysis jobs.")
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the worker alive: the job stays claimed and is retried once it goes stale.
+                logger.error(f"Analysis job worker {number} failed on job {job_id}: {e}", exc_info=True)
+
+    async def _process(self, job_id: str) -> None:
+        # Atomically claim the job; another worker or process may have taken it already.
+        claimed = await self.prisma.analysisjob.update_many(
+            where={"id": job_id, "status": JOB_PENDING},
+            data={"status": JOB_RUNNING, "startedAt": _now(), "attempts": {"increment": 1}}
+        )
+        if not claimed:
+            return
+
+        self._running.add(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            job = await self.prisma.analysisjob.find_unique(where={"id": job_id})
+            if job.attempts > self.max_attempts:
+                job = await self._finish(job_id, JOB_FAILED, error="Job exceeded the maximum number of attempts.")
+            else:
+                job = await self._run(job)
+        finally:
+            heartbeat.cancel()
+            self._running.discard(job_id)
+
+        # Deferred jobs go back to pending and only notify once they finish.
+        if job is not None and job.webhook_url and _status_value(job.status) in (JOB_SUCCEEDED, JOB_FAILED):
+            task = asyncio.create_task(self._send_webhook(job))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        # Marks the job as alive for as long as it runs, however long a large document takes.
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.prisma.analysisjob.update_many(
+                    where={"id": job_id, "status": JOB_RUNNING},
+                    data={"updatedAt": _now()}
+                )
+            except Exception as e:
+                logger.warning(f"Heartbeat of analysis job {job_id} failed: {e}")
+
+    async def _run(self, job: Any) -> Any:
+        logger.info(f"Running analysis job {job.id} (attempt {job.attempts}).")
+        try:
+            analysis = await self._service_factory().perform_analysis(job.text, use_cache=not job.bypass_cache)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                # The LLM is at capacity: give the attempt back and let a later poll pick the job up.
+                logger.info(f"Analysis job {job.id} deferred, the LLM is rate limited.")
+                return await self._release(job.id)
+            message = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+            if e.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+                return await self._fail_or_retry(job, message)
+            logger.warning(f"Analysis job {job.id} failed: {message}")
+            return await self._finish(job.id, JOB_FAILED, error=message)
+        except Exception as e:
+            # Unexpected errors (dropped connections and the like) are treated as transient too.
+            logger.error(f"Analysis job {job.id} failed: {e}", exc_info=True)
+            return await self._fail_or_retry(job, "Text analysis failed.")
+
+        logger.info(f"Analysis job {job.id} succeeded (analysis {analysis['id']}).")
+        return await self._finish(job.id, JOB_SUCCEEDED, analysis_id=analysis["id"])
+
+    async def _fail_or_retry(self, job: Any, message: str) -> Any:
+        # Transient failures go back to pending for a later poll until the attempts are used up.
+        if job.attempts >= self.max_attempts:
+            logger.warning(f"Analysis job {job.id} failed after {job.attempts} attempts: {message}")
+            return await self._finish(job.id, JOB_FAILED, error=message)
+        logger.warning(f"Analysis job {job.id} failed (attempt {job.attempts}), retrying: {message}")
+        return await self.prisma.analysisjob.update(
+            where={"id": job.id},
+            data={"status": JOB_PENDING, "startedAt": None, "error": message}
+        )
+
+    async def _release(self, job_id: str) -> Any:
+        return await self.prisma.analysisjob.update(
+            where={"id": job_id},
+            data={"status": JOB_PENDING, "startedAt": None, "attempts": {"decrement": 1}}
+        )
+
+    async def _finish(self, job_id: str, status: str, analysis_id: Optional[int] = None, error: Optional[str] = None) -> Any:
+        return await self.prisma.analysisjob.update(
+            where={"id": job_id},
+            data={"status": status, "analysis_id": analysis_id,
+                  "error": error, "finishedAt": _now()}
+        )
+
+    async def _send_webhook(self, job: Any) -> None:
+        # Best effort delivery with exponential backoff. The job result never depends on the webhook.
+        payload = self._to_status(job)
+        payload = {key: value.isoformat() if isinstance(value, datetime) else value
+                   for key, value in payload.items()}
+        for attempt in range(1, self.webhook_retries + 1):
+            try:
+                # Checked again on delivery, and the request goes to the address that was checked.
+                url, address = await resolve_webhook_target(job.webhook_url, self.webhook_allowed_hosts)
+                request_url, headers, extensions = pinned_request(url, address)
+                response = await self._http_client.post(
+                    request_url, json=payload, headers=headers, extensions=extensions)
+                if response.status_code < 400:
+                    logger.info(f"Delivered webhook for analysis job {job.id}.")
+                    return
+                logger.warning(
+                    f"Webhook for analysis job {job.id} returned {response.status_code} (attempt {attempt}).")
+            except WebhookTargetError as e:
+                logger.error(f"Not delivering webhook for analysis job {job.id}: URL {e}")
+                return
+            except httpx.HTTPError as e:
+                logger.warning(f"Webhook for analysis job {job.id} failed (attempt {attempt}): {e}")
+            if attempt < self.webhook_retries:
+                await asyncio.sleep(2 ** (attempt - 1))
+        logger.error(f"Giving up on webhook for analysis job {job.id}.")
+
+
+# Global job queue for the application, started and stopped by the app lifespan.
+analysis_job_queue = AnalysisJobQueue(
+    prisma=prisma,
+    workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval_seconds,
+    stale_after=settings.job_stale_after_seconds,
+    max_attempts=settings.job_max_attempts,
+    webhook_timeout=settings.job_webhook_timeout,
+    webhook_retries=settings.job_webhook_retries,
+    webhook_allowed_hosts=parse_allowed_hosts(settings.job_webhook_allowed_hosts)
+)
@@ -0,0 +1,237 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, TypeVar
+from ..config import settings
+from ..utils.logging import logger
+from ..utils.errors import keyword_extraction_unavailable_error
+
+T = TypeVar("T")
+
+
+# Signals the gunicorn and uvicorn workers install handlers for. A forked pool process inherits those
+# handlers, which would keep it from exiting on SIGTERM (how a broken pool's processes are stopped).
+_INHERITED_SIGNALS = ("SIGTERM", "SIGHUP", "SIGQUIT", "SIGABRT", "SIGUSR1", "SIGUSR2", "SIGWINCH", "SIGCHLD")
+
+
+def _init_worker() -> None:
+    # Runs once in every worker process: loads and warms up the SpaCy model, so each worker pays
+    # the load cost a single time and reuses the pipeline for every task. A process forked from a
+    # parent that already loaded the model (the gunicorn master) reuses it copy-on-write instead.
+    for name in _INHERITED_SIGNALS:
+        signal.signal(getattr(signal, name), signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # The parent's event loop may have routed signals to its wakeup fd, which the fork shares.
+    signal.set_wakeup_fd(-1)
+    from ..utils.keywords import load_model
+    load_model()
+
+
+def _warm_up_worker() -> str:
+    # Task used at startup to force worker processes (and their models) to load.
+    from ..utils.keywords import load_model
+    return load_model()
+
+
+def _extract_in_worker(text: str) -> List[str]:
+    from ..utils.keywords import extract_nouns
+    return extract_nouns(text)
+
+
+def _extract_many_in_worker(texts: List[str], batch_size: int, n_process: int) -> List[List[str]]:
+    from ..utils.keywords import extract_nouns_batch
+    return extract_nouns_batch(texts, batch_size=batch_size, n_process=n_process)
+
+
+class KeywordExecutor:
+
+    # Runs CPU-bound SpaCy keyword extraction in a pool of worker processes so it never blocks the event loop.
+    # The number of in-flight extractions is bounded; callers wait for a free slot and are rejected
+    # with a 503 once the queue stays saturated for longer than `queue_timeout` seconds.
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 64, queue_timeout: float = 5.0,
+                 use_processes: bool = True, start_method: str = "spawn", batch_size: int = 64, n_process: int = 1):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.use_processes = use_processes
+        self.start_method = start_method
+        self.batch_size = batch_size
+        # Only used when extraction runs in a thread: pool workers are already one process per core.
+        self.n_process = n_process
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._model_state: Optional[str] = None
+        self._rebuild_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._slots is not None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def is_ready(self) -> bool:
+        # True once the model is loaded and warmed up (or the fallback extractor is in place).
+        return self._model_state is not None
+
+    @property
+    def model_state(self) -> Optional[str]:
+        return self._model_state
+
+    async def start(self) -> None:
+        # Starts the executor without waiting for the model: loading and warm-up run in the
+        # background so startup stays fast. Requests arriving earlier simply wait for the load.
+        if self.is_running:
+            return
+
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._rebuild_lock = asyncio.Lock()
+        if not self.use_processes:
+            logger.info(
+                "Keyword process pool disabled, extraction will run in a background thread.")
+        else:
+            logger.info(
+                f"Starting keyword extraction pool with {self.max_workers} workers ({self.start_method}).")
+            self._pool = self._new_pool()
+        self._warm_up_task = self._start_warm_up()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker
+        )
+
+    def _start_warm_up(self) -> asyncio.Task:
+        # Submits one task per worker so every process is started and has its model loaded before
+        # traffic arrives. The tasks are submitted right away rather than from the warm-up task: with
+        # the fork start method the pool forks all its processes on the first submit, and doing that
+        # here, before the app has started other threads, keeps the fork safe.
+        if self._pool is None:
+            return asyncio.create_task(self._warm_up(None))
+        futures = [self._pool.submit(_warm_up_worker) for _ in range(self.max_workers)]
+        return asyncio.create_task(self._warm_up(futures))
+
+    async def _warm_up(self, futures: Optional[List["Future[str]"]]) -> None:
+        try:
+            if futures is None:
+                from ..utils.keywords import load_model
+                states = [await asyncio.to_thread(load_model)]
+            else:
+                states = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        except Exception as e:
+            logger.error(f"Keyword model warm-up failed: {e}", exc_info=True)
+            return
+
+        self._model_state = states[0]
+        logger.info(f"Keyword extraction ready (model: {self._model_state}).")
+
+    async def shutdown(self) -> None:
+        if not self.is_running:
+            return
+
+        logger.info("Shutting down keyword extraction pool...")
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        pool, self._pool, self._slots = self._pool, None, None
+        self._warm_up_task, self._model_state, self._rebuild_lock = None, None, None
+        if pool is not None:
+            # Drop queued work and wait for running tasks without blocking the event loop.
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def extract(self, text: str) -> List[str]:
+        # Extracts keywords for a single text off the event loop.
+        return await self._submit(_extract_in_worker, text)
+
+    async def extract_many(self, texts: List[str]) -> List[List[str]]:
+        # Extracts keywords for many texts in one batched pass through nlp.pipe. With the process pool,
+        # the batch is split into one contiguous chunk per worker so large batches still use every core.
+        if not texts:
+            return []
+
+        if self.use_processes:
+            chunk_size = math.ceil(len(texts) / self.max_workers)
+            n_process = 1
+        else:
+            chunk_size = len(texts)
+            n_process = self.n_process
+        chunks = [texts[i:i + chunk_size]
+                  for i in range(0, len(texts), chunk_size)]
+        results = await asyncio.gather(*(
+            self._submit(_extract_many_in_worker, chunk, self.batch_size, n_process) for chunk in chunks
+        ))
+        return [keywords for chunk_result in results for keywords in chunk_result]
+
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> T:
+        # Runs `fn` in the pool once a queue slot is free, applying backpressure when saturated.
+        slots = self._slots
+        if slots is None:
+            logger.error("Keyword extraction requested before the executor was started.")
+            raise keyword_extraction_unavailable_error()
+
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Keyword extraction queue saturated ({self._in_flight}/{self.max_pending} in flight), rejecting request.")
+            raise keyword_extraction_unavailable_error()
+
+        if self._slots is not slots:
+            # Shut down while waiting for the slot.
+            raise keyword_extraction_unavailable_error()
+
+        pool = self._pool
+        self._in_flight += 1
+        try:
+            if pool is None:
+                return await asyncio.to_thread(fn, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool as e:
+            # The task that was running may be what killed the worker, so it is not retried; the
+            # pool is replaced so later extractions succeed.
+            logger.error(f"Keyword extraction worker crashed: {e}", exc_info=True)
+            await self._replace_pool(pool)
+            raise keyword_extraction_unavailable_error()
+        finally:
+            self._in_flight -= 1
+            slots.release()
+
+    async def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        # A worker that dies (OOM kill, crash in native code) breaks the whole pool: every pending and
+        # later task fails. Every task running at the time reports the failure, but only the first
+        # replaces the pool. Readiness is cleared until the new workers have loaded the model.
+        if self._rebuild_lock is None:
+            return
+        async with self._rebuild_lock:
+            if self._pool is not broken:
+                return
+            logger.warning("Replacing the broken keyword extraction pool.")
+            self._model_state = None
+            if self._warm_up_task is not None and not self._warm_up_task.done():
+                self._warm_up_task.cancel()
+            self._pool = self._new_pool()
+            self._warm_up_task = self._start_warm_up()
+        # The broken pool's processes are already gone or terminating; nothing left to wait for.
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+# Global executor instance for the application, started and stopped by the app lifespan.
+keyword_executor = KeywordExecutor(
+    max_workers=settings.keyword_pool_workers or None,
+    max_pending=settings.keyword_pool_max_pending,
+    queue_timeout=settings.keyword_pool_queue_timeout,
+    use_processes=settings.keyword_pool_enabled,
+    start_method=settings.keyword_pool_start_method,
+    batch_size=settings.keyword_batch_size,
+    n_process=settings.keyword_n_process
+)
@@ -1,78 +1,224 @@
-import json
-from typing import AsyncGenerator, Dict, Any, Optional
+import asyncio
+import importlib.util
+import httpx
+import openai
+from typing import AsyncGenerator, Dict, Any, List, Optional
 from openai import AsyncOpenAI
 from ..config import settings
 from ..utils.logging import logger
-from ..utils.errors import llm_unavailable_error
+from ..utils.errors import llm_unavailable_error, llm_rate_limited_error
 from ..utils.prompts import get_analysis_messages
+from ..utils.tokens import estimate_tokens
+from .llm_scheduler import LLMScheduler, llm_scheduler, is_retryable, retry_after_seconds
+from .mock_llm import MockLLMBackend
+
+
+class ConnectionStats:
+
+    # Counts outgoing LLM requests and the TCP connections / TLS handshakes they needed, using httpx
+    # trace events. With a healthy keep-alive pool, connections opened stays far below requests.
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_requests": reused,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0
+        }
+
+
+def create_http_client(stats: ConnectionStats) -> httpx.AsyncClient:
+    # Builds the pooled HTTP client shared by every OpenAI request in this process.
+    http2 = settings.llm_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "HTTP/2 requested for the LLM client but the 'h2' package is not installed, falling back to HTTP/1.1.")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry
+        ),
+        timeout=httpx.Timeout(settings.llm_timeout,
+                              connect=settings.llm_connect_timeout),
+        event_hooks={"request": [stats.on_request]}
+    )
 
 
 class LLMClient:
 
-    # Uses a mock implementation for testing and a real client for production.
-    def __init__(self, api_key: str, mock_enabled: bool):
+    # Uses a mock backend for testing and a real client for production. Both go through the same
+    # scheduler and retry logic, so mock mode exercises rate limiting and retries too.
+    def __init__(self, api_key: str, mock_enabled: bool, http_client: Optional[httpx.AsyncClient] = None,
+                 scheduler: Optional[LLMScheduler] = None, mock_backend: Optional[MockLLMBackend] = None):
         self.mock_enabled = mock_enabled
+        self.scheduler = scheduler or LLMScheduler()
+        self.mock_backend: Optional[MockLLMBackend] = None
         if not self.mock_enabled:
-            self.client: Optional[AsyncOpenAI] = AsyncOpenAI(api_key=api_key)
+            # Retries are handled by the scheduler, which knows the rate limits and whether any
+            # content has been streamed yet, so the SDK's own retries are turned off.
+            self.client: Optional[AsyncOpenAI] = AsyncOpenAI(
+                api_key=api_key, http_client=http_client, max_retries=0)
             self.model_name = settings.llm_model
         else:
             self.client: Optional[AsyncOpenAI] = None
+            self.mock_backend = mock_backend or MockLLMBackend.from_settings()
             self.model_name = "mock_model"
 
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+
     async def stream_analysis(self, text: str) -> AsyncGenerator[Dict[str, Any], None]:
-        # Streams analysis results from the LLM as a generator of dicts with content and logprobs.
-        if self.mock_enabled:
+        # Streams analysis results from the LLM as a generator of dicts with a content delta and its logprobs.
+        async for response_data in self.stream_completion(get_analysis_messages(text)):
+            yield response_data
+
+    async def stream_completion(self, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        # Streams a JSON completion for the given chat messages (analysis or chunk merge prompts).
+        if self.mock_backend is not None:
             logger.info("Using mock LLM response.")
-            mock_data = {
-                "summary": "This is a mock summary of the provided text, used for testing and development purposes. It simulates a fast, perfect response.",
-                "title": "Mock Analysis Title",
-                "topics": ["mocking", "testing", "development"],
-                "sentiment": "neutral"
-            }
-            # Keep interface consistent with non-mock path - include fake logprobs for confidence score
-            fake_logprobs = [-0.1, -0.15, -0.08, -0.12, -0.09]  # Mock realistic logprobs
-            yield {"content": json.dumps(mock_data), "logprobs": fake_logprobs}
+        elif self.client is None:
+            raise llm_unavailable_error()
+        else:
+            logger.info(
+                f"Requesting analysis from OpenAI model: {self.model_name}")
+
+        # Budget the prompt plus the maximum completion size, then refund what the call didn't use.
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        estimated_tokens = prompt_tokens + settings.llm_max_tokens
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(estimated_tokens)
+            streamed = False
+            # The usage the API reports at the end of the stream, otherwise the prompt estimate plus
+            # the completion tokens streamed so far (one logprob per token).
+            usage: Optional[int] = None
+            completion_tokens = 0
+            try:
+                # Forward every incremental delta as soon as it arrives so callers can stream it onwards.
+                async for response_data in self._open_stream(messages):
+                    if "usage" in response_data:
+                        usage = response_data["usage"]
+                        continue
+                    streamed = True
+                    completion_tokens += len(response_data["logprobs"])
+                    yield response_data
+                return
+
+            except Exception as e:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                rate_limited = isinstance(e, openai.RateLimitError)
+                pause = self.scheduler.record_rate_limited(headers) if rate_limited else 0.0
+                # Once deltas have reached the caller the call can't be replayed transparently.
+                if streamed or not is_retryable(e) or attempt >= self.scheduler.max_retries:
+                    logger.error(
+                        "Error calling LLM API (attempt {}): {}", attempt + 1, str(e), exc_info=True)
+                    if rate_limited and is_retryable(e):
+                        raise llm_rate_limited_error(pause or retry_after_seconds(headers))
+                    raise llm_unavailable_error()
+
+                delay = self.scheduler.retry_delay(attempt)
+                attempt += 1
+                logger.warning(
+                    f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.2f}s (attempt {attempt + 1}).")
+            finally:
+                self.scheduler.release(estimated_tokens, usage if usage is not None else prompt_tokens + completion_tokens)
+            await asyncio.sleep(delay)
+
+    async def _open_stream(self, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        # One attempt against the mock backend or OpenAI, yielding deltas with their token logprobs.
+        # OpenAI ends the stream with {"usage": total_tokens}, which is not a delta.
+        if self.mock_backend is not None:
+            async for response_data in self.mock_backend.stream(messages):
+                yield response_data
             return
 
-        # Type guard: client cannot be None
-        if self.client is None:
-            raise llm_unavailable_error()
+        raw_response = await self.client.chat.completions.with_raw_response.create(  # type: ignore
+            model=self.model_name,
+            messages=messages,  # type: ignore
+            max_tokens=settings.llm_max_tokens,
+            temperature=settings.llm_temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            logprobs=True,
+            response_format={"type": "json_object"}
+        )
+        self.scheduler.observe(raw_response.headers)
+        response_stream = raw_response.parse()
 
-        logger.info(
-            f"Requesting analysis from OpenAI model: {self.model_name}")
-
-        try:
-            response_stream = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=get_analysis_messages(text),  # type: ignore
-                max_tokens=settings.llm_max_tokens,
-                temperature=settings.llm_temperature,
-                stream=True,
-                logprobs=True,
-                response_format={"type": "json_object"}
-            )
-
-            # For this simple task, we'll wait for the full response since it's small.
-            full_response_content = ""
-            all_logprobs = []
-            async for chunk in response_stream:
-                # choices is a list. take the first incremental delta
-                if getattr(chunk, "choices", None) and len(chunk.choices) > 0:
-                    choice = chunk.choices[0]
-                    # Content delta
-                    if getattr(choice, "delta", None) and getattr(choice.delta, "content", None):
-                        content = choice.delta.content
-                        if content is not None:
-                            full_response_content += content
-                    # Logprobs per token
-                    if getattr(choice, "logprobs", None) and getattr(choice.logprobs, "content", None):
-                        for logprob_info in choice.logprobs.content:
-                            # Defensive: ensure attribute exists
-                            if hasattr(logprob_info, "logprob") and logprob_info.logprob is not None:
-                                all_logprobs.append(logprob_info.logprob)
-
-            yield {"content": full_response_content, "logprobs": all_logprobs}
-
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}", exc_info=True)
-            raise llm_unavailable_error()
+        async for chunk in response_stream:
+            # choices is a list. take the first incremental delta
+            if getattr(chunk, "choices", None) and len(chunk.choices) > 0:
+                choice = chunk.choices[0]
+                content = ""
+                logprobs = []
+                # Content delta
+                if getattr(choice, "delta", None) and getattr(choice.delta, "content", None):
+                    content = choice.delta.content or ""
+                # Logprobs per token
+                if getattr(choice, "logprobs", None) and getattr(choice.logprobs, "content", None):
+                    for logprob_info in choice.logprobs.content:
+                        # Defensive: ensure attribute exists
+                        if hasattr(logprob_info, "logprob") and logprob_info.logprob is not None:
+                            logprobs.append(logprob_info.logprob)
+
+                if content or logprobs:
+                    yield {"content": content, "logprobs": logprobs}
+            # With include_usage, the last chunk has no choices and carries the token usage of the call.
+            usage = getattr(chunk, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                yield {"usage": usage.total_tokens}
+
+
+# Application-scoped client shared by all requests, so connections (and their TLS sessions) are reused.
+connection_stats = ConnectionStats()
+_shared_client: Optional[LLMClient] = None
+
+
+def get_shared_llm_client() -> LLMClient:
+    # Returns the shared client, creating it on first use.
+    global _shared_client
+    if _shared_client is None:
+        http_client = None if settings.llm_mock_enabled else create_http_client(
+            connection_stats)
+        _shared_client = LLMClient(
+            api_key=settings.llm_api_key, mock_enabled=settings.llm_mock_enabled, http_client=http_client,
+            scheduler=llm_scheduler)
+    return _shared_client
+
+
+async def start_llm_client() -> None:
+    client = get_shared_llm_client()
+    logger.info(
+        f"LLM client ready (model: {client.model_name}, mock: {client.mock_enabled}).")
+
+
+async def close_llm_client() -> None:
+    global _shared_client
+    if _shared_client is None:
+        return
+    logger.info(
+        f"Closing LLM client. Connection stats: {connection_stats.snapshot()}, scheduler stats: {llm_scheduler.snapshot()}")
+    client, _shared_client = _shared_client, None
+    await client.close()
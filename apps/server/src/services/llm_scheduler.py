@@ -0,0 +1,217 @@
+import asyncio
+import random
+import re
+import time
+from typing import Any, Dict, Mapping, Optional
+import httpx
+import openai
+from ..config import settings
+from ..utils.logging import logger
+from ..utils.errors import llm_rate_limited_error
+from ..utils.rate_limit import TokenBucket
+from ..utils.metrics import LLM_RATE_LIMIT_WAIT
+
+# Status codes worth another attempt: timeouts, conflicts, rate limits and server errors.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# OpenAI reports reset times as Go durations, e.g. "120ms", "1s", "6m0s" or "1h2m3.5s".
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    # Converts a rate-limit reset duration to seconds. Returns None when it can't be parsed.
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    # The server-requested delay from retry-after-ms / retry-after (seconds only, not HTTP dates).
+    if not headers:
+        return None
+    retry_after_ms = _header_number(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return _header_number(headers, "retry-after")
+
+
+def is_retryable(error: BaseException) -> bool:
+    # Transient failures are retried. Out-of-quota 429s won't clear up on their own, so they're not.
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+class SchedulerStats:
+
+    # Admission and retry counters for the LLM scheduler.
+
+    def __init__(self):
+        self.admitted = 0
+        self.shed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.admitted += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class LLMScheduler:
+
+    # Admission control in front of the OpenAI calls. Every attempt takes one request from the
+    # requests-per-minute bucket and its estimated tokens from the tokens-per-minute bucket, and gives
+    # back what it didn't use once it has finished (see release). Both buckets
+    # follow the x-ratelimit-* headers of each response: the API's limits become the refill rates (capped
+    # by the configured ones) and the remaining budgets lower the local ones. A 429 pauses all callers
+    # for the requested time. When too many calls are already waiting, or the wait would exceed
+    # max_queue_wait, new calls are rejected right away with a 429 instead of piling up.
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, max_queue_size: int = 256,
+                 max_queue_wait: float = 30.0, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(rate_per_minute=requests_per_minute)
+        self.tokens = TokenBucket(rate_per_minute=tokens_per_minute)
+        self.max_queue_size = max_queue_size
+        self.max_queue_wait = max_queue_wait
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = SchedulerStats()
+        self._waiting = 0
+        self._resume_at = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        # Calls currently waiting for rate-limit budget.
+        return self._waiting
+
+    def _pause_remaining(self) -> float:
+        return max(0.0, self._resume_at - time.monotonic())
+
+    def estimated_wait(self, tokens: float) -> float:
+        return max(self._pause_remaining(), self.requests.estimated_wait(1), self.tokens.estimated_wait(tokens))
+
+    async def acquire(self, tokens: float) -> float:
+        # Waits until a call estimated at `tokens` tokens fits the budgets. Returns the seconds waited,
+        # or raises a 429 when the call would have to queue for too long.
+        if self._waiting >= self.max_queue_size:
+            self._shed(f"{self._waiting} calls already waiting", self.estimated_wait(tokens))
+        wait = self.estimated_wait(tokens)
+        if self.max_queue_wait > 0 and wait > self.max_queue_wait:
+            self._shed(f"estimated wait {wait:.1f}s", wait)
+
+        self._waiting += 1
+        started = time.monotonic()
+        try:
+            # Re-checked in a loop because another caller's 429 can extend the pause while we sleep.
+            while (pause := self._pause_remaining()) > 0:
+                await asyncio.sleep(pause)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - started
+        self.stats.record_wait(waited)
+        LLM_RATE_LIMIT_WAIT.observe(waited)
+        if waited > 1:
+            logger.info(f"LLM call waited {waited:.2f}s for rate-limit budget.")
+        return waited
+
+    def release(self, reserved: float, used: float) -> None:
+        # Called after each attempt with the tokens acquire reserved for it and the tokens it used.
+        # Calls reserve their full max_tokens but most completions are much shorter, so without the
+        # refund the budget would run out long before the API's does.
+        taken = min(reserved, self.tokens.capacity)
+        self.tokens.refund(taken - used)
+
+    def _shed(self, reason: str, retry_after: float) -> None:
+        self.stats.shed += 1
+        logger.warning(f"Rejecting LLM call: {reason}.")
+        raise llm_rate_limited_error(retry_after or None)
+
+    def observe(self, headers: Optional[Mapping[str, str]]) -> None:
+        # Adapts both buckets to the rate-limit headers of an OpenAI response.
+        if not headers:
+            return
+        self._adapt(self.requests, self.requests_per_minute, headers, "requests")
+        self._adapt(self.tokens, self.tokens_per_minute, headers, "tokens")
+
+    def _adapt(self, bucket: TokenBucket, configured: int, headers: Mapping[str, str], kind: str) -> None:
+        limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+        if limit is not None and limit > 0:
+            rate = min(limit, configured) if configured > 0 else limit
+            if rate != bucket.rate_per_minute:
+                logger.info(f"Adjusting LLM {kind} per minute to {rate:g}.")
+                bucket.set_rate(rate)
+        remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+        if remaining is not None and bucket.enabled:
+            bucket.sync(remaining)
+
+    def record_rate_limited(self, headers: Optional[Mapping[str, str]]) -> float:
+        # Handles a 429 from the API: pauses every caller until the limit resets. Returns the pause.
+        self.stats.rate_limited += 1
+        self.observe(headers)
+        pause = retry_after_seconds(headers)
+        if pause is None and headers:
+            resets = [parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                      for kind in ("requests", "tokens")]
+            pause = max((reset for reset in resets if reset is not None), default=None)
+        if pause:
+            self._resume_at = max(self._resume_at, time.monotonic() + pause)
+        return pause or 0.0
+
+    def retry_delay(self, attempt: int) -> float:
+        # Full-jitter exponential backoff, so callers that failed together don't retry together.
+        # Pauses requested by the API are applied separately, in acquire.
+        self.stats.retries += 1
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._waiting,
+            "admitted": self.stats.admitted,
+            "shed": self.stats.shed,
+            "retries": self.stats.retries,
+            "rate_limited": self.stats.rate_limited,
+            "wait_seconds_total": round(self.stats.wait_seconds_total, 3),
+            "wait_seconds_avg": round(self.stats.wait_seconds_total / self.stats.admitted, 4) if self.stats.admitted else 0.0,
+            "wait_seconds_max": round(self.stats.wait_seconds_max, 3),
+            "requests_per_minute": self.requests.rate_per_minute,
+            "tokens_per_minute": self.tokens.rate_per_minute
+        }
+
+
+# Scheduler shared by every OpenAI call in this process.
+llm_scheduler = LLMScheduler(
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_queue_size=settings.llm_max_queue_size,
+    max_queue_wait=settings.llm_max_queue_wait,
+    max_retries=settings.llm_max_retries,
+    base_delay=settings.llm_retry_base_delay,
+    max_delay=settings.llm_retry_max_delay
+)
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+import openai
+
+from ..config import settings
+from ..utils.distributions import Distribution
+from ..utils.keywords import extract_keywords_fallback
+from ..utils.prompts import CHUNK_REDUCE_SYSTEM_PROMPT
+from ..utils.tokens import CHARS_PER_TOKEN
+
+SUMMARY_MAX_WORDS = 40
+TITLE_MAX_WORDS = 6
+# Mean of the per-token logprobs is -1/LOGPROB_RATE, i.e. roughly 90% confidence.
+LOGPROB_RATE = 10.0
+
+POSITIVE_WORDS = frozenset({
+    "good", "great", "excellent", "positive", "success", "successful", "improve", "improves", "improved",
+    "improvement", "benefit", "benefits", "growth", "gain", "gains", "happy", "love", "best", "better", "strong",
+    "win", "effective", "innovative", "progress", "opportunity", "opportunities", "breakthrough", "enjoy",
+})
+NEGATIVE_WORDS = frozenset({
+    "bad", "poor", "terrible", "negative", "fail", "failed", "failure", "decline", "declined", "loss",
+    "losses", "risk", "risks", "crisis", "problem", "problems", "worse", "worst", "weak", "threat",
+    "threats", "concern", "concerns", "damage", "sad", "hate", "attack", "shortage", "debt",
+})
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z]+")
+# Where the mock requests would have gone; only used to build realistic error objects.
+_MOCK_REQUEST = httpx.Request("POST", "https://mock-llm.invalid/v1/chat/completions")
+
+
+class MockLLMBackend:
+
+    # Offline stand-in for the OpenAI chat completions API, used in mock mode. The completion is derived
+    # from the prompt: title and summary from its first sentences, topics from the fallback keyword
+    # extractor, sentiment from a small word list, and chunk merge prompts merge their partial analyses.
+    # It is streamed like the real API: a time to first token drawn from `ttft`, then a delta of
+    # `tokens_per_chunk` tokens at `tokens_per_second` (0 = no pacing), each with per-token logprobs.
+    # Output and delays are seeded from the prompt, so the same text always streams the same way.
+    #
+    # Failures are injected before the first token as the errors the OpenAI SDK raises (500s and 429s
+    # with a retry-after-ms header), so they take the same retry and rate-limit paths as real ones.
+    # Injection draws from a separate RNG, otherwise a failing prompt would fail on every retry.
+
+    def __init__(self, ttft: Optional[Distribution] = None, tokens_per_second: float = 0.0, tokens_per_chunk: int = 4,
+                 failure_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 seed: Optional[int] = None):
+        self.ttft = ttft or Distribution("const", (0.0,))
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_chunk = max(1, tokens_per_chunk)
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.seed = seed or 0
+        self.failures = random.Random(seed)
+
+    @classmethod
+    def from_settings(cls) -> "MockLLMBackend":
+        return cls(ttft=Distribution.parse(settings.llm_mock_ttft),
+                   tokens_per_second=settings.llm_mock_tokens_per_second,
+                   tokens_per_chunk=settings.llm_mock_tokens_per_chunk,
+                   failure_rate=settings.llm_mock_failure_rate,
+                   rate_limit_rate=settings.llm_mock_rate_limit_rate,
+                   retry_after=settings.llm_mock_retry_after,
+                   seed=settings.llm_mock_seed)
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        prompt = messages[-1]["content"]
+        rng = random.Random(f"{self.seed}:{hashlib.sha256(prompt.encode()).hexdigest()}")
+        self._inject_failure()
+        if messages[0]["content"] == CHUNK_REDUCE_SYSTEM_PROMPT:
+            content = json.dumps(merge_analyses(json.loads(prompt)))
+        else:
+            content = json.dumps(analyze_text(prompt))
+
+        await asyncio.sleep(self.ttft.sample(rng))
+        chunk_chars = self.tokens_per_chunk * CHARS_PER_TOKEN
+        for start in range(0, len(content), chunk_chars):
+            piece = content[start:start + chunk_chars]
+            tokens = max(1, round(len(piece) / CHARS_PER_TOKEN))
+            if start and self.tokens_per_second > 0:
+                await asyncio.sleep(tokens / self.tokens_per_second)
+            yield {"content": piece, "logprobs": [-rng.expovariate(LOGPROB_RATE) for _ in range(tokens)]}
+
+    def _inject_failure(self) -> None:
+        roll = self.failures.random()
+        if roll < self.rate_limit_rate:
+            response = httpx.Response(429, request=_MOCK_REQUEST,
+                                      headers={"retry-after-ms": str(int(self.retry_after * 1000))})
+            raise openai.RateLimitError("Mock rate limit reached", response=response, body=None)
+        if roll < self.rate_limit_rate + self.failure_rate:
+            response = httpx.Response(500, request=_MOCK_REQUEST)
+            raise openai.InternalServerError("Mock server error", response=response, body=None)
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    sentences = [sentence.strip() for sentence in _SENTENCE_END.split(text.strip()) if sentence.strip()]
+    summary_words = " ".join(sentences[:2]).split()[:SUMMARY_MAX_WORDS]
+    title_words = sentences[0].rstrip(".!?").split()[:TITLE_MAX_WORDS] if sentences else []
+    return {
+        "summary": " ".join(summary_words),
+        "title": " ".join(title_words).title() or None,
+        "topics": extract_keywords_fallback(text) or ["general"],
+        "sentiment": sentiment_of(text)
+    }
+
+
+def merge_analyses(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Topics ranked by how many parts mention them, ties broken by first mention.
+    topics = Counter(topic for partial in partials for topic in partial.get("topics", []))
+    sentiments = Counter(partial.get("sentiment", "neutral") for partial in partials)
+    summary = " ".join(partial.get("summary", "") for partial in partials[:2])
+    return {
+        "summary": " ".join(summary.split()[:SUMMARY_MAX_WORDS]),
+        "title": next((partial["title"] for partial in partials if partial.get("title")), None),
+        "topics": [topic for topic, _ in topics.most_common(3)] or ["general"],
+        "sentiment": sentiments.most_common(1)[0][0] if sentiments else "neutral"
+    }
+
+
+def sentiment_of(text: str) -> str:
+    words = _WORD.findall(text.lower())
+    score = sum(word in POSITIVE_WORDS for word in words) - sum(word in NEGATIVE_WORDS for word in words)
+    return "positive" if score > 0 else "negative" if score < 0 else "neutral"
@@ -0,0 +1,88 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+from ..config import settings
+
+
+class SearchResultCache:
+
+    # Short-lived cache of serialized /search responses, so dashboards polling the same handful of
+    # topics don't re-run the search SQL (or re-validate the rows) on every poll. Bounded by entry
+    # count and by total body bytes, least recently used entries are evicted first.
+    #
+    # Entries are tagged with the version of the Analysis table the search started at (its highest id,
+    # see AnalysisService.search_version) and only served while that is still the current version.
+    # The version is read from the database on every lookup, so an insert made by any worker, or one
+    # that has since reached a lagging replica, retires the entries of every worker, and a search that
+    # raced with an insert can't be served without the new row. Not thread-safe: intended to be used
+    # from the event loop only.
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(topic: Optional[str], limit: int, offset: int, mode: str, cursor: Optional[str],
+                 paginate: str, fields: Sequence[str]) -> str:
+        return json.dumps([topic, limit, offset, mode, paginate, cursor, list(fields)])
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        # `version` is the current version of the table; an entry stored at an older one is dropped.
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, entry_version, body = entry
+        if expires_at <= time.monotonic() or entry_version != version:
+            if entry_version != version:
+                self.invalidations += 1
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: str, body: bytes, version: int) -> None:
+        # `version` is the one read before the search ran, so a result that might miss a row inserted
+        # while it ran is never served once that row is visible.
+        if len(body) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, version, body)
+        self.bytes += len(body)
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[2])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.bytes
+        }
+
+
+# Global search result cache for the application, shared by all requests.
+search_cache = SearchResultCache(
+    max_entries=settings.search_cache_max_entries,
+    max_bytes=settings.search_cache_max_bytes,
+    ttl_seconds=settings.search_cache_ttl_seconds
+)
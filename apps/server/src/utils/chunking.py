@@ -0,0 +1,48 @@
+import re
+from typing import Iterator, List
+from .tokens import CHARS_PER_TOKEN
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    # Splits text into chunks of at most `max_tokens` estimated tokens, preferring to cut between
+    # paragraphs, then between sentences, and only cutting inside a sentence when it alone is too long.
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_length = 0
+
+    for piece in _pieces(text, max_chars):
+        # +1 for the separator that rejoins pieces
+        if current and current_length + 1 + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            current, current_length = [], 0
+        current.append(piece)
+        current_length += len(piece) + (1 if current_length else 0)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _pieces(text: str, max_chars: int) -> Iterator[str]:
+    # Yields paragraphs, or the sentences (or hard-cut slices) of paragraphs that exceed max_chars.
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                # Cut at the last space before the limit when there is one
+                cut = sentence.rfind(" ", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
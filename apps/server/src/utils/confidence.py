@@ -0,0 +1,49 @@
+import math
+from typing import Iterable, Optional, Tuple
+
+
+class ConfidenceTracker:
+
+    # Incrementally computes the confidence score from token logprobs as they stream in,
+    # so no separate pass over the full logprob list is needed once the LLM finishes.
+
+    def __init__(self):
+        self.logprob_sum = 0.0
+        self.token_count = 0
+
+    def add(self, logprobs: Iterable[float]) -> None:
+        for logprob in logprobs:
+            self.logprob_sum += logprob
+            self.token_count += 1
+
+    @property
+    def avg_logprob(self) -> Optional[float]:
+        if not self.token_count:
+            return None
+        return self.logprob_sum / self.token_count
+
+    @property
+    def score(self) -> Optional[float]:
+        # Average logprob per token. logprobs are negative so closer to 0 = higher confidence
+        avg_logprob = self.avg_logprob
+        if avg_logprob is None:
+            return None
+
+        # Convert to percentage confidence score (0-100)
+        raw_confidence = math.exp(avg_logprob)
+        return min(100.0, max(0.0, raw_confidence * 100))
+
+
+def weighted_confidence(scores: Iterable[Tuple[Optional[float], int]]) -> Optional[float]:
+    # Combines per-part confidence scores into one, weighting each (score, weight) pair by its weight
+    # (e.g. the token count of the chunk it was computed on). Parts without a score are skipped.
+    total = 0.0
+    total_weight = 0
+    for score, weight in scores:
+        if score is None or weight <= 0:
+            continue
+        total += score * weight
+        total_weight += weight
+    if not total_weight:
+        return None
+    return total / total_weight
@@ -0,0 +1,45 @@
+import math
+import random
+from dataclasses import dataclass
+from typing import Tuple
+
+# Latency distributions for the mock LLM backend and the load harness, written as "kind:param[:param]" in
+# milliseconds (e.g. "const:5", "uniform:2:8", "normal:40:10", "lognormal:300:0.5").
+KINDS = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+
+@dataclass(frozen=True)
+class Distribution:
+
+    # `lognormal` takes the median and the sigma of the underlying normal, so its long right tail
+    # looks like real API latencies. Samples are never negative.
+
+    kind: str
+    params: Tuple[float, ...]
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        kind, *values = spec.split(":")
+        if kind not in KINDS or len(values) != KINDS[kind]:
+            raise ValueError(
+                f"Invalid distribution '{spec}'. Use const:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV or lognormal:MEDIAN:SIGMA.")
+        return cls(kind, tuple(float(value) for value in values))
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(max(median, 1e-9)), sigma)
+        return max(0.0, value)
+
+    def sample(self, rng: random.Random) -> float:
+        # Seconds, ready for asyncio.sleep.
+        return self.sample_ms(rng) / 1000
+
+    def __str__(self) -> str:
+        return ":".join([self.kind, *(f"{value:g}" for value in self.params)])
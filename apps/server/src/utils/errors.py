@@ -1,45 +1,63 @@
-from fastapi import HTTPException, status
+import math
+from fastapi import HTTPException, Request, Response, status
+from fastapi.exception_handlers import http_exception_handler
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from typing import Dict, Any, Optional
+from .metrics import count_error
+
+# Error type for HTTP exceptions not created through StandardError (e.g. the router's 404 and 405).
+UNTYPED_ERROR = "http_error"
+
+
+class TypedHTTPException(HTTPException):
+    # An HTTPException carrying its StandardError type for the error metrics.
+
+    def __init__(self, error_type: str, status_code: int, detail: Any = None,
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+        self.error_type = error_type
 
 
 class StandardError:
    # Utility for creating standardized HTTP exceptions.
 
     @staticmethod
-    def bad_request(message: str) -> HTTPException:
-        return HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={"message": message}
+    def _create(error_type: str, status_code: int, message: str,
+                headers: Optional[Dict[str, str]] = None) -> HTTPException:
+        return TypedHTTPException(
+            error_type,
+            status_code=status_code,
+            detail={"message": message},
+            headers=headers
         )
 
+    @staticmethod
+    def bad_request(message: str) -> HTTPException:
+        return StandardError._create("bad_request", status.HTTP_400_BAD_REQUEST, message)
+
     @staticmethod
     def not_found(message: str) -> HTTPException:
-        return HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": message}
-        )
+        return StandardError._create("not_found", status.HTTP_404_NOT_FOUND, message)
 
     @staticmethod
     def internal_error(message: str = "An internal server error occurred") -> HTTPException:
-        return HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={"message": message}
-        )
+        return StandardError._create("internal_error", status.HTTP_500_INTERNAL_SERVER_ERROR, message)
 
     @staticmethod
     def validation_error(field_name: str, issue: str) -> HTTPException:
-        return HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={"message": f"{field_name.title()}: {issue}"}
-        )
+        return StandardError._create(
+            "validation_error", status.HTTP_400_BAD_REQUEST, f"{field_name.title()}: {issue}")
 
     @staticmethod
     def service_unavailable(service_name: str) -> HTTPException:
-        return HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail={
-                "message": f"{service_name} is temporarily unavailable. Please try again later."}
-        )
+        return StandardError._create(
+            "service_unavailable", status.HTTP_503_SERVICE_UNAVAILABLE,
+            f"{service_name} is temporarily unavailable. Please try again later.")
+
+    @staticmethod
+    def too_many_requests(message: str, retry_after: Optional[float] = None) -> HTTPException:
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after else None
+        return StandardError._create("too_many_requests", status.HTTP_429_TOO_MANY_REQUESTS, message, headers)
 
 
 # Convenience functions for common error scenarios
@@ -55,5 +73,48 @@ def llm_unavailable_error() -> HTTPException:
     return StandardError.service_unavailable("AI analysis service")
 
 
+def llm_rate_limited_error(retry_after: Optional[float] = None) -> HTTPException:
+    return StandardError.too_many_requests(
+        "AI analysis service is at capacity. Please retry later.", retry_after)
+
+
 def database_error() -> HTTPException:
     return StandardError.internal_error("Database temporarily unavailable. Please try again.")
+
+
+def search_timeout_error() -> HTTPException:
+    return StandardError._create(
+        "search_timeout", status.HTTP_503_SERVICE_UNAVAILABLE,
+        "Search took too long. Please narrow the query or try again later.")
+
+
+def keyword_extraction_unavailable_error() -> HTTPException:
+    return StandardError.service_unavailable("Keyword extraction service")
+
+
+def invalid_cursor_error() -> HTTPException:
+    return StandardError.validation_error("cursor", "is not a valid pagination cursor.")
+
+
+def analysis_not_found_error() -> HTTPException:
+    return StandardError.not_found("Analysis not found.")
+
+
+def job_not_found_error() -> HTTPException:
+    return StandardError.not_found("Job not found.")
+
+
+def invalid_webhook_url_error(reason: str) -> HTTPException:
+    return StandardError.validation_error("webhook_url", reason)
+
+
+def export_format_unavailable_error(export_format: str) -> HTTPException:
+    return StandardError.validation_error("format", f"{export_format} export is not available on this server.")
+
+
+async def counting_http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    # Counts an error once it is actually returned to the client, with the status it is returned with.
+    # Errors that are only built (e.g. for a message) or reported per item inside a 200 response aren't counted.
+    count_error(getattr(exc, "error_type", UNTYPED_ERROR), exc.status_code)
+    return await http_exception_handler(request, exc)
+
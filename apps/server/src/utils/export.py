@@ -0,0 +1,120 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Sequence
+from .serialization import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Parquet export is optional (the "parquet" extra).
+    pa = pq = None
+
+# Encoders of an export: each takes the stream of row chunks and the exported fields and produces
+# the body incrementally, one piece per chunk, so the export never holds more than one chunk.
+Chunks = AsyncIterator[List[Dict[str, Any]]]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+async def ndjson_stream(chunks: Chunks, fields: Sequence[str]) -> AsyncIterator[bytes]:
+    # One JSON object per line, encoded like /search results.
+    async for rows in chunks:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _csv_value(value: Any) -> Any:
+    # Topic and keyword arrays are written as JSON arrays, timestamps as ISO 8601.
+    if isinstance(value, list):
+        return dumps(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat().replace("+00:00", "Z")
+    return value
+
+
+async def csv_stream(chunks: Chunks, fields: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for rows in chunks:
+        for row in rows:
+            writer.writerow([_csv_value(row.get(field)) for field in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Only the header, when nothing matched.
+        yield buffer.getvalue().encode()
+
+
+class _DrainedSink(io.RawIOBase):
+
+    # Write-only file that hands out what has been written since the last drain. The Parquet footer
+    # records column chunk offsets from tell(), so it keeps counting across drains.
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _parquet_schema(fields: Sequence[str]) -> "pa.Schema":
+    types = {
+        "id": pa.int64(),
+        "title": pa.string(),
+        "topics": pa.list_(pa.string()),
+        "sentiment": pa.string(),
+        "keywords": pa.list_(pa.string()),
+        "summary": pa.string(),
+        "createdAt": pa.timestamp("ms", tz="UTC"),
+        "confidence_score": pa.float64(),
+        "original_text": pa.string(),
+        "chunk_count": pa.int32(),
+    }
+    return pa.schema([(field, types[field]) for field in fields])
+
+
+async def parquet_stream(chunks: Chunks, fields: Sequence[str]) -> AsyncIterator[bytes]:
+    # One row group per chunk, sent as soon as it is written; the footer follows the last one.
+    schema = _parquet_schema(fields)
+    sink = _DrainedSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_ENCODERS: Dict[str, Callable[[Chunks, Sequence[str]], AsyncIterator[bytes]]] = {
+    "ndjson": ndjson_stream,
+    "csv": csv_stream,
+    "parquet": parquet_stream,
+}
@@ -0,0 +1,46 @@
+from typing import Dict, Union
+
+# Memory of a process as the kernel accounts it, read from /proc (Linux only). RSS counts every
+# resident page, including the copy-on-write pages a forked worker still shares with its master.
+# PSS charges each shared page to the processes mapping it in equal parts, so the PSS of all workers
+# adds up to their real footprint; private memory is what each additional worker costs.
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+MIB = 1024 * 1024
+
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    # Byte counts of rss, pss, shared and private memory. Falls back to RSS alone on kernels without
+    # smaps_rollup, and returns an empty dict where /proc is unavailable.
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            kib = _read_kib(rollup, SMAPS_FIELDS)
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                kib = _read_kib(status, ("VmRSS",))
+        except OSError:
+            return {}
+        return {"rss_bytes": kib.get("VmRSS", 0) * 1024}
+
+    return {
+        "rss_bytes": kib.get("Rss", 0) * 1024,
+        "pss_bytes": kib.get("Pss", 0) * 1024,
+        "shared_bytes": (kib.get("Shared_Clean", 0) + kib.get("Shared_Dirty", 0)) * 1024,
+        "private_bytes": (kib.get("Private_Clean", 0) + kib.get("Private_Dirty", 0)) * 1024,
+    }
+
+
+def format_memory(memory: Dict[str, int]) -> str:
+    # e.g. "rss 310.2 MiB, pss 121.7 MiB, shared 240.0 MiB, private 70.2 MiB"
+    if not memory:
+        return "memory unavailable"
+    return ", ".join(f"{key.removesuffix('_bytes')} {value / MIB:.1f} MiB" for key, value in memory.items())
+
+
+def _read_kib(lines, fields) -> Dict[str, int]:
+    values = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in fields:
+            values[name] = int(rest.split()[0])
+    return values
@@ -0,0 +1,157 @@
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Tuple
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, disable_created_metrics, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Prometheus metrics for the server. Everything on the request path is a pre-labelled counter or
+# histogram update (a lock and a few additions); app-wide stats that already exist as snapshots
+# (cache, pools, queues) are read only when /metrics is scraped.
+
+# Set by gunicorn.conf.py in multi-worker deployments: every worker writes its counters and histograms
+# to files in this directory, which /metrics aggregates so any worker answers for all of them.
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# The *_created timestamp series only add scrape volume.
+disable_created_metrics()
+
+# Request latency spans the whole response, so for streamed responses it includes the stream.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+
+ANALYSIS_STAGE_DURATION = Histogram(
+    "analysis_stage_duration_seconds", "Duration of the stages of an analysis (llm, keywords, parse, db, cache, total).",
+    ["stage"], buckets=LATENCY_BUCKETS)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Time from sending an LLM call to its first content delta.",
+    buckets=LATENCY_BUCKETS)
+
+LLM_COMPLETION_TOKENS = Counter(
+    "llm_completion_tokens", "Completion tokens streamed from the LLM, counted from their logprobs.")
+
+LLM_RATE_LIMIT_WAIT = Histogram(
+    "llm_rate_limit_wait_seconds", "Time LLM calls waited for rate-limit budget.",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30))
+
+# Includes the wait for a pooled connection, which is where an undersized pool shows up.
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database query latency by operation and target (primary or replica).",
+    ["operation", "target"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+ERRORS = Counter(
+    "errors", "Error responses by StandardError type and returned status code.", ["type", "status"])
+
+# Unmatched paths share one label so random URLs can't blow up the number of series.
+UNMATCHED_ROUTE = "unmatched"
+
+# Labelled children are cached: labels() validates and locks on every call, a dict lookup doesn't.
+_stage_histograms: Dict[str, Any] = {}
+_request_histograms: Dict[Tuple[str, str, int], Any] = {}
+_query_histograms: Dict[Tuple[str, str], Any] = {}
+
+
+def observe_stages(durations: Mapping[str, float]) -> None:
+    # Records the StageTimer durations (milliseconds) of one analysis.
+    for stage, duration in durations.items():
+        histogram = _stage_histograms.get(stage)
+        if histogram is None:
+            histogram = _stage_histograms[stage] = ANALYSIS_STAGE_DURATION.labels(stage)
+        histogram.observe(duration / 1000)
+
+
+def observe_query(operation: str, target: str, seconds: float) -> None:
+    histogram = _query_histograms.get((operation, target))
+    if histogram is None:
+        histogram = _query_histograms[(operation, target)] = DB_QUERY_DURATION.labels(operation, target)
+    histogram.observe(seconds)
+
+
+def count_error(error_type: str, status_code: int) -> None:
+    ERRORS.labels(error_type, str(status_code)).inc()
+
+
+class MetricsMiddleware:
+
+    # Pure ASGI middleware recording the latency of every HTTP request, labelled with the route template
+    # (e.g. /api/v1/analyses/{analysis_id}) rather than the raw path.
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope.
+            key = (scope["method"], getattr(scope.get("route"), "path", UNMATCHED_ROUTE), status_code)
+            histogram = _request_histograms.get(key)
+            if histogram is None:
+                histogram = _request_histograms[key] = HTTP_REQUEST_DURATION.labels(*key[:2], str(status_code))
+            histogram.observe(time.perf_counter() - start)
+
+
+class SnapshotCollector(Collector):
+
+    # Exposes the stats dicts that services already keep (e.g. AnalysisCache.stats()) as metrics,
+    # read at scrape time. Keys listed in `counters` are monotonic counts, the rest are gauges.
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Mapping[str, Any]], frozenset]] = {}
+
+    def add(self, prefix: str, snapshot: Callable[[], Mapping[str, Any]], counters: Iterable[str] = ()) -> None:
+        self._sources[prefix] = (snapshot, frozenset(counters))
+
+    def collect(self) -> Iterator[Any]:
+        for prefix, (snapshot, counters) in self._sources.items():
+            try:
+                values = snapshot()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                name = f"{prefix}_{key}"
+                if key in counters:
+                    yield CounterMetricFamily(name, f"{prefix} {key}", value=value)
+                else:
+                    yield GaugeMetricFamily(name, f"{prefix} {key}", value=value)
+
+
+app_stats = SnapshotCollector()
+REGISTRY.register(app_stats)
+# The snapshot stats live in each worker's memory, so with multiple workers they are the answering
+# worker's own; they're rendered from this registry next to the aggregated file-backed metrics.
+_worker_registry = CollectorRegistry(auto_describe=True)
+_worker_registry.register(app_stats)
+
+
+def register_stats(prefix: str, snapshot: Callable[[], Mapping[str, Any]], counters: Iterable[str] = ()) -> None:
+    app_stats.add(prefix, snapshot, counters)
+
+
+def generate_metrics() -> bytes:
+    # Renders the application metrics in the Prometheus text format.
+    if not os.environ.get(MULTIPROCESS_DIR_ENV):
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry) + generate_latest(_worker_registry)
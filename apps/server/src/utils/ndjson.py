@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, AsyncIterator, Optional, Tuple
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    # Splits a byte stream into lines as it arrives, holding at most one partial line. Yields
+    # (line number, line) for every non-blank line. A line longer than `max_line_bytes` is dropped
+    # as it arrives instead of being buffered, and reported as (line number, None).
+    buffer = bytearray()
+    line_number = 0
+    too_long = False
+    async for chunk in chunks:
+        *complete, tail = chunk.split(b"\n")
+        for piece in complete:
+            line_number += 1
+            if not too_long:
+                buffer += piece
+            if too_long or len(buffer) > max_line_bytes:
+                yield line_number, None
+            elif buffer.strip():
+                yield line_number, bytes(buffer)
+            buffer.clear()
+            too_long = False
+        if not too_long:
+            buffer += tail
+            if len(buffer) > max_line_bytes:
+                too_long = True
+                buffer.clear()
+
+    # The last line may lack its newline.
+    if too_long or buffer.strip():
+        yield line_number + 1, None if too_long else bytes(buffer)
+
+
+async def read_body(receive: Receive, done: asyncio.Event) -> AsyncIterator[bytes]:
+    # Yields the request body as it arrives, like request.stream(), and sets `done` as soon as its last
+    # message has been received: a consumer reading lines only as fast as it processes them would
+    # otherwise reach the end of the stream long after the client finished sending.
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        body = message.get("body", b"")
+        if not message.get("more_body", False):
+            done.set()
+            if body:
+                yield body
+            return
+        if body:
+            yield body
+
+
+class DuplexStreamingResponse(StreamingResponse):
+
+    # StreamingResponse for endpoints that keep reading the request body while the response streams.
+    # Starlette's version listens for the client disconnect on `receive` under ASGI servers older than
+    # spec 2.4 (uvicorn included), and that listener would swallow the body chunks. Here `receive` is
+    # left to the endpoint until `body_done` is set (see read_body); a disconnect during the upload
+    # surfaces as ClientDisconnect from the body stream. After that the response listens itself and
+    # cancels the stream on a disconnect, since uvicorn silently drops sends to a closed connection
+    # and the stream would keep working for nobody.
+
+    def __init__(self, content: Any, body_done: asyncio.Event, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.body_done = body_done
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stream = asyncio.ensure_future(self.stream_response(send))
+        disconnected = False
+
+        async def cancel_on_disconnect() -> None:
+            nonlocal disconnected
+            await self.body_done.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected = True
+            stream.cancel()
+
+        listener = asyncio.ensure_future(cancel_on_disconnect())
+        try:
+            await stream
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            return
+        finally:
+            listener.cancel()
+        if self.background is not None:
+            await self.background()
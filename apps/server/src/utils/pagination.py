@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Tuple, Union
+from .errors import invalid_cursor_error
+
+
+def to_naive_utc(value: Union[datetime, str]) -> datetime:
+    # "createdAt" is a timestamp without time zone holding UTC, so cursors carry naive UTC values.
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(created_at: Union[datetime, str], analysis_id: int) -> str:
+    # Opaque keyset cursor pointing just past the given (createdAt, id) position.
+    payload = json.dumps(
+        {"t": to_naive_utc(created_at).isoformat(), "id": analysis_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    # Returns the (createdAt, id) position encoded in a cursor, raising a 400 for anything malformed.
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at, analysis_id = payload["t"], payload["id"]
+        if not isinstance(created_at, str):
+            raise invalid_cursor_error()
+        created_at = to_naive_utc(created_at)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise invalid_cursor_error()
+
+    if not isinstance(analysis_id, int) or isinstance(analysis_id, bool):
+        raise invalid_cursor_error()
+    return created_at, analysis_id
@@ -1,4 +1,6 @@
-
+import hashlib
+import json
+from typing import Any, Dict, List
 
 # System prompt for knowledge extraction analysis
 KNOWLEDGE_EXTRACTION_SYSTEM_PROMPT = """
@@ -12,6 +14,24 @@ The sentiment must be one of 'positive', 'neutral', or 'negative'.
 Return only the raw JSON, without any other commentary.
 """.strip()
 
+# System prompt merging the analyses of consecutive chunks of a long document
+CHUNK_REDUCE_SYSTEM_PROMPT = """
+You are a knowledge extractor. 
+You will receive a JSON array of analyses of consecutive parts of one long document, in order. 
+Merge them into a single JSON object describing the whole document. 
+The JSON must have these keys: 'summary', 'title', 'topics', and 'sentiment'. 
+The summary should be 1-2 sentences covering the whole document. 
+The title should be the document's title if one of the parts has it (or null if none). 
+The topics array should contain the 3 most important topics across all parts. 
+The sentiment must be one of 'positive', 'neutral', or 'negative', reflecting the document overall. 
+Return only the raw JSON, without any other commentary.
+""".strip()
+
+# Version of the system prompts, derived from their content. Changing a prompt changes the version,
+# which invalidates any analysis cached under the previous prompts.
+KNOWLEDGE_EXTRACTION_PROMPT_VERSION = hashlib.sha256(
+    (KNOWLEDGE_EXTRACTION_SYSTEM_PROMPT + "\0" + CHUNK_REDUCE_SYSTEM_PROMPT).encode("utf-8")).hexdigest()[:12]
+
 
 def get_analysis_messages(text: str):
     """Generate messages for analysis request."""
@@ -19,3 +39,11 @@ def get_analysis_messages(text: str):
         {"role": "system", "content": KNOWLEDGE_EXTRACTION_SYSTEM_PROMPT},
         {"role": "user", "content": text}
     ]
+
+
+def get_reduce_messages(partial_analyses: List[Dict[str, Any]]):
+    """Generate messages for merging the analyses of a long document's chunks."""
+    return [
+        {"role": "system", "content": CHUNK_REDUCE_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(partial_analyses)}
+    ]
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+
+    # Token bucket refilled continuously at `rate_per_minute`. Callers await `acquire` until enough
+    # budget is available; waiters are served in FIFO order. A rate of 0 disables the limit.
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        # Tokens requested by callers that are still waiting for the lock or the refill.
+        self._queued = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    @property
+    def rate_per_minute(self) -> float:
+        return self.rate_per_second * 60
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens +
+                           (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        # Changes the refill rate, e.g. to the limit the API reports. The capacity follows the rate.
+        was_enabled = self.enabled
+        self._refill()
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        # A bucket that was unlimited starts out full.
+        self._tokens = min(self._tokens, self.capacity) if was_enabled else self.capacity
+
+    def sync(self, remaining: float) -> None:
+        # Lowers the local budget to what the API says is left. The API limit is shared with other
+        # processes and clients, so it can run out before this bucket does.
+        self._refill()
+        self._tokens = min(self._tokens, remaining)
+
+    def refund(self, amount: float) -> None:
+        # Returns tokens taken by acquire that turned out not to be needed, up to a full bucket.
+        if not self.enabled or amount <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def estimated_wait(self, amount: float) -> float:
+        # Seconds a new caller asking for `amount` would wait behind the callers already queued.
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        deficit = self._queued + min(amount, self.capacity) - self._tokens
+        return max(0.0, deficit / self.rate_per_second)
+
+    async def acquire(self, amount: float) -> float:
+        # Consumes `amount` tokens, waiting for the bucket to refill if needed. Returns the seconds waited.
+        if not self.enabled:
+            return 0.0
+
+        # A single request larger than the bucket can never fit, so cap it at a full bucket.
+        amount = min(amount, self.capacity)
+        self._queued += amount
+        try:
+            async with self._lock:
+                self._refill()
+                deficit = amount - self._tokens
+                waited = 0.0
+                if deficit > 0:
+                    waited = deficit / self.rate_per_second
+                    await asyncio.sleep(waited)
+                    self._refill()
+                self._tokens -= amount
+                return waited
+        finally:
+            self._queued -= amount
+
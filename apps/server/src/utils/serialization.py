@@ -0,0 +1,22 @@
+from typing import Any, Dict, List, Optional
+import orjson
+from pydantic_core import to_jsonable_python
+
+# Datetimes in UTC are written with a "Z" suffix, as Pydantic writes them.
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(value: Any) -> bytes:
+    # Types orjson doesn't know natively (Decimal, models, ...) go through Pydantic's encoder.
+    return orjson.dumps(value, default=to_jsonable_python, option=JSON_OPTIONS)
+
+
+def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+    # Search rows come from our own SELECTs of typed columns, so they already have the shape of
+    # AnalysisResult / AnalysisProjection and are encoded as they are, without building a model per row.
+    return dumps(rows)
+
+
+def encode_page(rows: List[Dict[str, Any]], next_cursor: Optional[str]) -> bytes:
+    # Body of a cursor-paginated search (SearchResponse).
+    return dumps({"analyses": rows, "next_cursor": next_cursor})
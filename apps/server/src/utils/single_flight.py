@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    # Coalesces concurrent calls with the same key: the first caller starts the call, callers arriving
+    # while it runs await that same call and get its result (or its exception). The call runs in its
+    # own task, shielded from the callers, so one caller going away (e.g. a client disconnect) does not
+    # cancel it for the others. Once every caller has gone the call is cancelled, as a lone request's
+    # work would be. Not thread-safe: intended to be used from the event loop only.
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight[Any]] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget the flight right away so a caller arriving now starts a new call instead of
+                # joining one that is being cancelled.
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight[Any]) -> None:
+        self._forget(key, flight)
+        # Retrieve the exception so a call that failed after its last caller left isn't logged as
+        # "never retrieved"; callers still waiting receive it from the shield.
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _forget(self, key: str, flight: _Flight[Any]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), "started": self.started, "coalesced": self.coalesced}
+
+
+# Global registry of in-flight analyses, shared by all requests.
+analysis_flights = SingleFlight()
@@ -0,0 +1,7 @@
+import json
+from typing import Any
+
+
+def format_sse(event: str, data: Any) -> str:
+    # Formats a single Server-Sent Events message. `data` is JSON-encoded on one line.
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
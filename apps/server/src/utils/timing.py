@@ -0,0 +1,26 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+
+    # Records wall-clock durations (in milliseconds) of the named stages of a single request.
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = (time.perf_counter() - start) * 1000
+
+    def server_timing_header(self) -> str:
+        # Formats the durations as an HTTP Server-Timing header value, e.g. "llm;dur=812.4, keywords;dur=35.0".
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.durations.items())
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={duration:.1f}ms" for name, duration in self.durations.items())
@@ -0,0 +1,9 @@
+import math
+
+# Rough characters-per-token ratio for English text with OpenAI tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # Cheap token estimate used for budgeting; avoids a tokenizer dependency.
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,63 @@
+import asyncio
+import ipaddress
+import socket
+from typing import AbstractSet, Dict, Optional, Tuple, Union
+import httpx
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+class WebhookTargetError(ValueError):
+    # The webhook URL may not be called: wrong scheme, unresolvable, or pointing at a private address.
+    pass
+
+
+def parse_allowed_hosts(value: str) -> AbstractSet[str]:
+    # Comma-separated host names from the settings, compared case-insensitively.
+    return frozenset(host.strip().lower().rstrip(".") for host in value.split(",") if host.strip())
+
+
+def is_public_address(address: IPAddress) -> bool:
+    # Rejects loopback, RFC 1918 and other private ranges, link-local (including the cloud metadata
+    # address 169.254.169.254), carrier-grade NAT, multicast, reserved and unspecified addresses.
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+async def resolve_webhook_target(url: str, allowed_hosts: AbstractSet[str] = frozenset()) -> Tuple[httpx.URL, str]:
+    # Checks that a webhook URL may be called and returns it with the address to connect to. Only https is
+    # accepted. With an allowlist, only its hosts are accepted (wherever they resolve). Without one, every
+    # address the host resolves to must be public, so clients can't make the server call internal services.
+    # Connecting to the returned address instead of resolving again keeps DNS rebinding from changing the
+    # target after the check.
+    parsed = httpx.URL(url)
+    if parsed.scheme != "https":
+        raise WebhookTargetError("must be an https URL.")
+    host = parsed.raw_host.decode("ascii").lower().rstrip(".")
+    if not host:
+        raise WebhookTargetError("must include a host.")
+    if allowed_hosts and host not in allowed_hosts:
+        raise WebhookTargetError("host is not allowed.")
+
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, parsed.port or 443, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            raise WebhookTargetError("host could not be resolved.")
+        # Drop IPv6 scope ids ("fe80::1%eth0"); scoped addresses are link-local and rejected anyway.
+        addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+
+    if not allowed_hosts and not all(is_public_address(address) for address in addresses):
+        raise WebhookTargetError("must not point to a private or reserved address.")
+    return parsed, str(addresses[0])
+
+
+def pinned_request(url: httpx.URL, address: str) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    # Builds the (url, headers, extensions) of a request sent to `address` for `url`'s host. The Host header
+    # and the TLS server name (SNI, and the certificate check) still use the original host.
+    return str(url.copy_with(host=address)), {"Host": url.netloc.decode("ascii")}, {"sni_hostname": url.raw_host.decode("ascii")}
+
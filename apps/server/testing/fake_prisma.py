@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import random
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.services.analysis_service import ANALYSIS_FIELDS, BULK_INSERT_COLUMNS
+from src.utils.distributions import Distribution
+
+# In-memory stand-in for the parts of the Prisma client the server uses, so the load harness and the
+# unit tests run without Postgres. Every call sleeps for a sample of the configured latency
+# distribution. Raw SQL is recognized by the shape of the service's own queries (insert, substring,
+# full-text, keyset, list, export, search version), not parsed.
+
+_SELECTED_COLUMNS = re.compile(r"SELECT\s+(.*?)\s+FROM", re.DOTALL)
+
+
+class Record(dict):
+
+    # Row object with attribute access and model_dump(), like the generated Prisma models.
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def model_dump(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+class FakeTable:
+
+    def __init__(self, db: "FakePrisma", key: str):
+        self.db = db
+        self.key = key
+        self.rows: Dict[Any, Record] = {}
+
+    async def create(self, data: Dict[str, Any]) -> Record:
+        await self.db.wait()
+        return Record(self.insert(data))
+
+    def insert(self, data: Dict[str, Any]) -> Record:
+        row = Record(data)
+        if self.key == "id":
+            # Analyses always take createdAt from the fake clock, even when the insert binds one (as the
+            # bulk insert does with the real time), so (createdAt, id) order matches insertion order.
+            row.setdefault("id", next(self.db.ids))
+            row["createdAt"] = self.db.now()
+        else:
+            row.setdefault("createdAt", self.db.now())
+        row.setdefault("chunk_count", 1)
+        self.rows[row[self.key]] = row
+        return row
+
+    async def find_unique(self, where: Dict[str, Any]) -> Optional[Record]:
+        await self.db.wait()
+        row = self.rows.get(where[self.key])
+        return Record(row) if row is not None else None
+
+    async def upsert(self, where: Dict[str, Any], data: Dict[str, Any]) -> Record:
+        await self.db.wait()
+        row = self.rows.get(where[self.key])
+        if row is None:
+            return Record(self.insert(data["create"]))
+        row.update(data["update"])
+        return Record(row)
+
+    async def delete_many(self, where: Dict[str, Any]) -> int:
+        # Only the `createdAt < cutoff` filter the analysis cache purge uses.
+        await self.db.wait()
+        cutoff = where["createdAt"]["lt"]
+        expired = [key for key, row in self.rows.items() if row["createdAt"] < cutoff]
+        for key in expired:
+            del self.rows[key]
+        return len(expired)
+
+
+class FakePrisma:
+
+    def __init__(self, latency: Distribution, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.analysis = FakeTable(self, "id")
+        self.analysiscacheentry = FakeTable(self, "key")
+        # Timestamps advance by a microsecond per row so (createdAt, id) ordering is deterministic.
+        self._clock = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def now(self) -> datetime:
+        self._clock += timedelta(microseconds=1)
+        return self._clock
+
+    async def wait(self) -> None:
+        await asyncio.sleep(self.latency.sample(self.rng))
+
+    def is_connected(self) -> bool:
+        return True
+
+    def seed_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.analysis.insert(row)
+
+    async def query_raw(self, sql: str, *params: Any) -> List[Dict[str, Any]]:
+        await self.wait()
+        if sql.lstrip().startswith("INSERT"):
+            return self._bulk_insert(params)
+        if "max(" in sql:
+            return [{"version": max(self.analysis.rows, default=None)}]
+        if 'ORDER BY "createdAt", "id"' in sql:
+            return self._export(sql, params)
+
+        # Ids and timestamps only grow, so insertion order is already oldest first.
+        newest_first = list(reversed(self.analysis.rows.values()))
+        keyset = '("createdAt", "id") <' in sql
+        if "websearch_to_tsquery" in sql:
+            query, limit, offset = params
+            matches = self._fulltext(newest_first, query)
+        elif "ILIKE" in sql:
+            needle = params[0].strip("%").lower()
+            matches = [row for row in newest_first if _matches(row, needle)]
+            params = params[1:]
+        else:
+            matches = newest_first
+
+        if keyset:
+            created_at, last_id, limit = params
+            position = (datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc), last_id)
+            page = [row for row in matches if (row["createdAt"], row["id"]) < position][:limit]
+        else:
+            limit, offset = params[-2:]
+            page = matches[offset:offset + limit]
+        return [self._project(row, sql) for row in page]
+
+    def _export(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        # Oldest first, starting at a createdAt (since) or continuing after a (createdAt, id) position.
+        *position, limit = params
+        rows = list(self.analysis.rows.values())
+        if position:
+            created_at = datetime.fromisoformat(position[0]).replace(tzinfo=timezone.utc)
+            if '("createdAt", "id") >' in sql:
+                rows = [row for row in rows if (row["createdAt"], row["id"]) > (created_at, position[1])]
+            else:
+                rows = [row for row in rows if row["createdAt"] >= created_at]
+        return [self._project(row, sql) for row in rows[:limit]]
+
+    def _bulk_insert(self, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        values = list(params)
+        width = len(BULK_INSERT_COLUMNS)
+        inserted = []
+        for start in range(0, len(values), width):
+            row = self.analysis.insert(dict(zip(BULK_INSERT_COLUMNS, values[start:start + width])))
+            inserted.append({field: row.get(field) for field in ANALYSIS_FIELDS})
+        return inserted
+
+    @staticmethod
+    def _fulltext(rows: List[Record], query: str) -> List[Record]:
+        terms = [term.lower() for term in query.split()]
+        scored = []
+        for row in rows:
+            words = " ".join([row.get("title") or "", row["summary"], *row["topics"], *row["keywords"]]).lower()
+            score = sum(words.count(term) for term in terms)
+            if score:
+                scored.append((score, row))
+        # Stable sort keeps newest first among equal scores, like the SQL tie-breakers.
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [row for _, row in scored]
+
+    @staticmethod
+    def _project(row: Record, sql: str) -> Dict[str, Any]:
+        selected = _SELECTED_COLUMNS.search(sql)
+        fields = [column.strip().strip('"') for column in selected.group(1).split(",")] if selected else ANALYSIS_FIELDS
+        return {field: row.get(field) for field in fields if field in ANALYSIS_FIELDS}
+
+
+def _matches(row: Record, needle: str) -> bool:
+    return (needle in row["summary"].lower()
+            or needle in (row.get("title") or "").lower()
+            or any(needle in value.lower() for value in row["topics"])
+            or any(needle in value.lower() for value in row["keywords"]))
@@ -5,6 +5,11 @@ from httpx import AsyncClient
 
 # Ensure we're using mock mode for tests
 os.environ['LLM_MOCK_ENABLED'] = 'true'
+# Settings the app requires at import time, so the unit tests also run outside the container.
+# Mock mode needs no real values; a .env file or the environment takes precedence.
+for name, value in {"DATABASE_URL": "postgresql://test", "LLM_API_KEY": "test", "LLM_MODEL": "test",
+                    "LLM_MAX_TOKENS": "1000", "LLM_TEMPERATURE": "0.3"}.items():
+    os.environ.setdefault(name, value)
 
 
 @pytest.fixture(scope="session")
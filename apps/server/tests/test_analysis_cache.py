@@ -0,0 +1,73 @@
+import asyncio
+from datetime import timedelta
+
+from src.services.analysis_cache import AnalysisCache
+from src.utils.distributions import Distribution
+from testing.fake_prisma import FakePrisma
+
+PAYLOAD = {"summary": "A summary.", "title": "A title", "topics": ["energy"], "sentiment": "neutral",
+           "keywords": ["markets"], "confidence_score": 0.9, "chunk_count": 1}
+
+
+def make_cache(db: FakePrisma) -> AnalysisCache:
+    return AnalysisCache(prisma=db, max_entries=16, ttl_seconds=60, persistent_ttl_seconds=3600)
+
+
+def age(db: FakePrisma, key: str, seconds: float) -> None:
+    db.analysiscacheentry.rows[key]["createdAt"] -= timedelta(seconds=seconds)
+
+
+class TestPersistentExpiry:
+
+    # An expired persistent entry is a miss, even though its row is still in the table.
+    def test_expired_entry_is_not_served(self):
+        async def scenario():
+            db = FakePrisma(Distribution.parse("const:0"))
+            await make_cache(db).set("old", PAYLOAD)
+            age(db, "old", 7200)
+
+            # A new process: nothing in the memory tier.
+            cache = make_cache(db)
+            assert await cache.get("old") is None
+            assert cache.stats()["misses"] == 1
+
+        asyncio.run(scenario())
+
+    # Purging deletes expired rows and keeps live ones.
+    def test_purge_deletes_expired_rows(self):
+        async def scenario():
+            db = FakePrisma(Distribution.parse("const:0"))
+            cache = make_cache(db)
+            await cache.set("old", PAYLOAD)
+            await cache.set("fresh", PAYLOAD)
+            age(db, "old", 7200)
+
+            assert await cache.purge_expired() == 1
+            assert set(db.analysiscacheentry.rows) == {"fresh"}
+            assert await make_cache(db).get("fresh") == PAYLOAD
+            assert cache.stats()["purged"] == 1
+            assert await cache.purge_expired() == 0
+
+        asyncio.run(scenario())
+
+    # The lifespan starts the purge, which runs right away and then every purge_interval.
+    def test_purge_runs_in_background(self):
+        async def scenario():
+            db = FakePrisma(Distribution.parse("const:0"))
+            cache = make_cache(db)
+            cache.purge_interval = 0.01
+            await cache.set("old", PAYLOAD)
+            age(db, "old", 7200)
+
+            await cache.start()
+            try:
+                await asyncio.sleep(0.05)
+                assert not db.analysiscacheentry.rows
+                await cache.set("later", PAYLOAD)
+                age(db, "later", 7200)
+                await asyncio.sleep(0.05)
+                assert not db.analysiscacheentry.rows
+            finally:
+                await cache.shutdown()
+
+        asyncio.run(scenario())
@@ -0,0 +1,224 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, List
+import pytest
+from fastapi import HTTPException
+from prisma import errors as prisma_errors
+
+from src.db.database import REPLICA
+from src.services.analysis_service import AnalysisService, BULK_INSERT_COLUMNS, MAX_EXPORT_CHUNK_SIZE
+from src.services.llm_client import LLMClient
+from src.utils.distributions import Distribution
+from src.utils.metrics import ANALYSIS_STAGE_DURATION
+from src.utils.pagination import decode_cursor
+from src.utils.single_flight import SingleFlight
+from src.utils.timing import StageTimer
+from testing.fake_prisma import FakePrisma
+
+
+class RecordingPrisma(FakePrisma):
+
+    # Keeps the raw SQL and parameters of every query_raw call.
+
+    def __init__(self):
+        super().__init__(Distribution.parse("const:0"))
+        self.raw_queries: List[Any] = []
+
+    async def query_raw(self, sql: str, *params: Any):
+        self.raw_queries.append((sql, params))
+        return await super().query_raw(sql, *params)
+
+
+class FailingPrisma(FakePrisma):
+
+    # Every raw query fails with the given error.
+
+    def __init__(self, error: Exception):
+        super().__init__(Distribution.parse("const:0"))
+        self.error = error
+        self.calls = 0
+
+    async def query_raw(self, sql: str, *params: Any):
+        self.calls += 1
+        raise self.error
+
+
+async def no_keywords(text: str) -> List[str]:
+    return []
+
+
+def make_service(prisma: FakePrisma, **options: Any) -> AnalysisService:
+    return AnalysisService(prisma=prisma, llm_client=LLMClient(api_key="", mock_enabled=True),
+                           keyword_extractor=no_keywords, **options)
+
+
+def analysis_row(text: str) -> dict:
+    return {"summary": "A summary.", "title": None, "topics": ["energy"], "sentiment": "neutral",
+            "keywords": ["grid"], "original_text": text, "confidence_score": 0.9, "chunk_count": 1}
+
+
+class TestBulkInsert:
+
+    # createdAt is bound as UTC instead of left to the column default, which uses the session time zone.
+    def test_binds_created_at_in_utc(self):
+        prisma = RecordingPrisma()
+        before = datetime.now(timezone.utc)
+
+        rows = asyncio.run(make_service(prisma)._bulk_insert([analysis_row("first"), analysis_row("second")]))
+
+        sql, params = prisma.raw_queries[-1]
+        assert '"createdAt"' in sql
+        assert "::timestamptz AT TIME ZONE 'UTC'" in sql
+        created = params[BULK_INSERT_COLUMNS.index("createdAt")::len(BULK_INSERT_COLUMNS)]
+        assert len(created) == 2 and created[0] == created[1]
+        assert created[0].utcoffset() == timedelta(0)
+        assert before <= created[0] <= datetime.now(timezone.utc)
+        assert [row["original_text"] for row in rows] == ["first", "second"]
+
+    # Bulk-inserted rows page in (createdAt, id) order among rows inserted one at a time.
+    def test_bulk_rows_keep_keyset_order(self):
+        async def scenario():
+            prisma = FakePrisma(Distribution.parse("const:0"))
+            service = make_service(prisma)
+            await prisma.analysis.create(analysis_row("first"))
+            await service._bulk_insert([analysis_row("second"), analysis_row("third")])
+            await prisma.analysis.create(analysis_row("fourth"))
+            first_page, cursor = await service.search_analyses_page("", limit=2)
+            second_page, _ = await service.search_analyses_page("", limit=2, cursor=decode_cursor(cursor))
+            return first_page + second_page
+
+        rows = asyncio.run(scenario())
+
+        assert [row["original_text"] for row in rows] == ["fourth", "third", "second", "first"]
+
+
+class TestReplicaFallback:
+
+    def make_primary(self) -> FakePrisma:
+        primary = FakePrisma(Distribution.parse("const:0"))
+        primary.analysis.insert(analysis_row("Stored on the primary."))
+        return primary
+
+    # A replica that went away after startup fails the query; it is retried once on the primary.
+    def test_connection_errors_retry_on_primary(self):
+        primary = self.make_primary()
+        replica = FailingPrisma(prisma_errors.PrismaError("P1001: Can't reach database server at `replica:5432`"))
+        service = make_service(primary, read_prisma=replica)
+        assert service.read_target == REPLICA
+
+        analyses = asyncio.run(service.search_analyses("energy"))
+
+        assert [analysis["original_text"] for analysis in analyses] == ["Stored on the primary."]
+        assert replica.calls == 1
+
+    # Other errors, like a statement timeout, aren't retried.
+    def test_other_errors_are_not_retried(self):
+        replica = FailingPrisma(prisma_errors.PrismaError("canceling statement due to statement timeout (57014)"))
+        service = make_service(self.make_primary(), read_prisma=replica)
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(service.search_analyses("energy"))
+
+        assert error.value.status_code == 503
+        assert replica.calls == 1
+
+    # Export chunks are read like searches, so they fall back to the primary too.
+    def test_export_falls_back_to_primary(self):
+        primary = self.make_primary()
+        replica = FailingPrisma(prisma_errors.PrismaError("P1001: Can't reach database server at `replica:5432`"))
+        service = make_service(primary, read_prisma=replica)
+
+        async def export():
+            return [chunk async for chunk in service.export_analyses()]
+
+        chunks = asyncio.run(export())
+
+        assert [row["original_text"] for chunk in chunks for row in chunk] == ["Stored on the primary."]
+        assert replica.calls == 1
+
+    # The primary's search client counts as the primary, so its failures aren't retried.
+    def test_primary_search_client_is_not_a_replica(self):
+        primary = self.make_primary()
+        primary_search = FailingPrisma(prisma_errors.PrismaError("P1017: Server has closed the connection."))
+        service = make_service(primary, read_prisma=primary_search, primary_read_prisma=primary_search)
+
+        with pytest.raises(prisma_errors.PrismaError):
+            asyncio.run(service.search_analyses("energy"))
+
+        assert primary_search.calls == 1
+
+
+class TestCoalescedTiming:
+
+    # The request that started an analysis reports its stages; one that joined it reports its wait.
+    def test_follower_reports_coalesced_stage(self):
+        async def slow_keywords(text: str) -> List[str]:
+            await asyncio.sleep(0.05)
+            return ["grid"]
+
+        async def scenario():
+            prisma = FakePrisma(Distribution.parse("const:0"))
+            service = make_service(prisma, flights=SingleFlight())
+            service.keyword_extractor = slow_keywords
+            leader_timer, follower_timer = StageTimer(), StageTimer()
+            leader = asyncio.create_task(service.perform_analysis("Grid storage is expanding.", timer=leader_timer))
+            await asyncio.sleep(0.01)
+            follower = await service.perform_analysis("Grid storage is expanding.", timer=follower_timer)
+            assert (await leader)["id"] == follower["id"]
+            assert len(prisma.analysis.rows) == 1
+            return leader_timer.durations, follower_timer.durations
+
+        leader, follower = asyncio.run(scenario())
+
+        assert {"llm", "keywords", "db", "total"} <= set(leader)
+        assert set(follower) == {"coalesced", "total"}
+        assert 0 < follower["coalesced"] <= follower["total"]
+
+
+class TestExport:
+
+    # Chunks are capped so each one stays well inside the search statement timeout.
+    def test_chunk_size_is_capped(self):
+        prisma = RecordingPrisma()
+        for index in range(3):
+            prisma.analysis.insert(analysis_row(f"Document {index}."))
+
+        async def export():
+            return [chunk async for chunk in make_service(prisma).export_analyses(chunk_size=10 ** 6)]
+
+        chunks = asyncio.run(export())
+
+        assert [len(chunk) for chunk in chunks] == [3]
+        assert prisma.raw_queries[0][1] == (MAX_EXPORT_CHUNK_SIZE,)
+
+    # Each chunk continues after the last row of the previous one, oldest first.
+    def test_chunks_continue_after_the_last_row(self):
+        prisma = FakePrisma(Distribution.parse("const:0"))
+        for index in range(5):
+            prisma.analysis.insert(analysis_row(f"Document {index}."))
+
+        async def export():
+            return [chunk async for chunk in make_service(prisma).export_analyses(chunk_size=2)]
+
+        chunks = asyncio.run(export())
+
+        assert [[row["original_text"] for row in chunk] for chunk in chunks] == [
+            ["Document 0.", "Document 1."], ["Document 2.", "Document 3."], ["Document 4."]]
+
+
+class TestStreamingTiming:
+
+    # A streamed analysis reports its total time like a buffered one.
+    def test_stream_reports_total_stage(self):
+        def stage_seconds(stage: str) -> float:
+            return ANALYSIS_STAGE_DURATION.labels(stage)._sum.get()
+
+        async def events():
+            service = make_service(FakePrisma(Distribution.parse("const:0")))
+            return [event async for event in service.stream_analysis_events("Grid storage is expanding.")]
+
+        before = stage_seconds("total")
+        streamed = asyncio.run(events())
+
+        assert streamed[-1]["event"] == "complete"
+        assert stage_seconds("total") > before
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 import json
 from httpx import AsyncClient
@@ -10,6 +11,25 @@ class TestHealthCheck:
         assert response.status_code == 200
         assert response.json() == {"message": "Server is running"}
 
+    async def test_readiness(self, client: AsyncClient):
+        # Readiness is reported separately from liveness, with the state of each dependency.
+        response = await client.get("/ready")
+        assert response.status_code in (200, 503)
+        data = response.json()
+        assert set(data["checks"]) == {"database", "keyword_model"}
+        assert data["status"] == ("ready" if response.status_code == 200 else "starting")
+
+    async def test_metrics(self, client: AsyncClient, sample_text: str):
+        # Requests and analysis stages show up in the Prometheus metrics.
+        await client.post("/api/v1/analyze", json={"text": sample_text})
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/analyze",status="200"}' in response.text
+        assert 'analysis_stage_duration_seconds_count{stage="total"}' in response.text
+
 
 class TestAnalysisEndpoint:
 
@@ -47,6 +67,31 @@ class TestAnalysisEndpoint:
             assert len(data["topics"]) >= 1
             assert data["summary"] != ""
 
+    async def test_analyze_reports_stage_timings(self, client: AsyncClient, sample_text: str):
+        # Per-stage durations are exposed through the Server-Timing header.
+        # Bypass the cache so the LLM and keyword stages actually run.
+        response = await client.post(
+            "/api/v1/analyze",
+            json={"text": sample_text, "bypass_cache": True}
+        )
+
+        assert response.status_code == 200
+        server_timing = response.headers.get("server-timing", "")
+        for stage in ("llm", "keywords", "db", "total"):
+            assert f"{stage};dur=" in server_timing
+
+    async def test_analyze_bypass_cache(self, client: AsyncClient, sample_text: str):
+        # Bypassing the cache still returns a complete, newly persisted analysis.
+        response = await client.post(
+            "/api/v1/analyze",
+            json={"text": sample_text, "bypass_cache": True}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["original_text"] == sample_text
+        assert "llm;dur=" in response.headers.get("server-timing", "")
+
     async def test_analyze_empty_text(self, client: AsyncClient):
        # Test analysis with empty text should return error.
         response = await client.post(
@@ -84,6 +129,23 @@ class TestAnalysisEndpoint:
         assert len(data["topics"]) > 0
         assert len(data["keywords"]) > 0
 
+    async def test_analyze_long_document_in_chunks(self, client: AsyncClient):
+        # Documents above the long-document threshold are analyzed in chunks and merged.
+        paragraph = ("Renewable energy investment keeps growing as governments set emission targets "
+                     "and utilities replace coal plants with wind and solar farms. ")
+        long_text = "\n\n".join(paragraph * 10 for _ in range(40))
+        response = await client.post(
+            "/api/v1/analyze",
+            json={"text": long_text, "bypass_cache": True}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["chunk_count"] > 1
+        assert data["summary"]
+        assert data["sentiment"] in ("positive", "neutral", "negative")
+        assert 0 <= data["confidence_score"] <= 100
+
     async def test_analyze_invalid_request(self, client: AsyncClient):
         # Test analysis with invalid request body.
         response = await client.post(
@@ -94,6 +156,90 @@ class TestAnalysisEndpoint:
         assert response.status_code == 422  # Validation error
 
 
+class TestStreamingAnalysisEndpoint:
+
+    async def test_stream_emits_deltas_and_completion(self, client: AsyncClient, sample_text: str):
+        # The stream carries content deltas followed by a final event with the persisted record.
+        response = await client.post(
+            "/api/v1/analyze/stream",
+            json={"text": sample_text}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = []
+        for message in response.text.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in message.splitlines())
+            events.append((lines["event"], json.loads(lines["data"])))
+
+        assert events[0][0] == "delta"
+        assert events[-1][0] == "complete"
+        content = "".join(data["content"] for name, data in events if name == "delta")
+        assert "summary" in json.loads(content)
+
+        analysis = events[-1][1]
+        assert isinstance(analysis["id"], int)
+        assert isinstance(analysis["keywords"], list)
+        assert analysis["original_text"] == sample_text
+
+    async def test_stream_empty_text(self, client: AsyncClient):
+        response = await client.post(
+            "/api/v1/analyze/stream",
+            json={"text": "   "}
+        )
+
+        assert response.status_code == 400
+
+
+class TestBatchAnalysisEndpoint:
+
+    async def test_batch_reports_per_item_results(self, client: AsyncClient, sample_text: str, complex_text: str):
+        # Valid items are analyzed while invalid ones fail individually.
+        response = await client.post(
+            "/api/v1/analyze/batch",
+            json={"texts": [sample_text, "   ", complex_text]}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 1
+
+        results = data["results"]
+        assert [item["index"] for item in results] == [0, 1, 2]
+        assert results[0]["status"] == "success"
+        assert results[0]["analysis"]["original_text"] == sample_text
+        assert results[1]["status"] == "error"
+        assert results[1]["error"]
+        assert results[2]["analysis"]["original_text"] == complex_text
+
+    async def test_batch_empty_list(self, client: AsyncClient):
+        # An empty batch is a validation error.
+        response = await client.post("/api/v1/analyze/batch", json={"texts": []})
+
+        assert response.status_code == 422
+
+
+class TestIngestEndpoint:
+
+    async def test_ingest_reports_each_line(self, client: AsyncClient, sample_text: str):
+        # Every non-blank NDJSON line gets its own result, successes and failures alike.
+        body = "\n".join([json.dumps({"text": sample_text}), "not json", "", json.dumps({"text": "  "})])
+        response = await client.post(
+            "/api/v1/analyze/ingest", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        results = {result["line"]: result for result in map(json.loads, response.text.splitlines())}
+        assert sorted(results) == [1, 2, 4]
+        assert results[1]["status"] == "success"
+        assert isinstance(results[1]["analysis"]["id"], int)
+        assert "original_text" not in results[1]["analysis"]
+        assert results[2]["status"] == "error"
+        assert results[4]["error"] == "Input text cannot be empty."
+
+
 class TestSearchEndpoint:
 
     async def test_search_no_query(self, client: AsyncClient):
@@ -127,6 +273,100 @@ class TestSearchEndpoint:
         search_results = search_response.json()
         assert isinstance(search_results, list)
 
+    async def test_search_fulltext_mode(self, client: AsyncClient, complex_text: str):
+        # Ranked full-text search returns the same result shape as substring search.
+        analyze_response = await client.post(
+            "/api/v1/analyze",
+            json={"text": complex_text}
+        )
+        assert analyze_response.status_code == 200
+
+        response = await client.get("/api/v1/search?topic=climate&mode=fulltext")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data, list)
+        for item in data:
+            assert "id" in item and "summary" in item
+
+    async def test_search_invalid_mode(self, client: AsyncClient):
+        response = await client.get("/api/v1/search?topic=climate&mode=fuzzy")
+
+        assert response.status_code == 422
+
+    async def test_search_cursor_pagination(self, client: AsyncClient, sample_text: str):
+        # Cursor pages are newest first and never repeat a row.
+        for _ in range(3):
+            analyze_response = await client.post(
+                "/api/v1/analyze",
+                json={"text": sample_text}
+            )
+            assert analyze_response.status_code == 200
+
+        first = await client.get("/api/v1/search?paginate=cursor&limit=2")
+        assert first.status_code == 200
+        first_page = first.json()
+        assert len(first_page["analyses"]) == 2
+        assert first_page["next_cursor"]
+
+        second = await client.get(
+            f"/api/v1/search?cursor={first_page['next_cursor']}&limit=2")
+        assert second.status_code == 200
+        second_page = second.json()
+
+        first_ids = [item["id"] for item in first_page["analyses"]]
+        second_ids = [item["id"] for item in second_page["analyses"]]
+        assert second_ids
+        assert not set(first_ids) & set(second_ids)
+        assert first_page["analyses"][-1]["createdAt"] >= second_page["analyses"][0]["createdAt"]
+
+    async def test_search_invalid_cursor(self, client: AsyncClient):
+        response = await client.get("/api/v1/search?cursor=not-a-cursor")
+
+        assert response.status_code == 400
+
+    async def test_search_summary_view(self, client: AsyncClient, sample_text: str):
+        # The summary view leaves out the original text.
+        analyze_response = await client.post(
+            "/api/v1/analyze",
+            json={"text": sample_text}
+        )
+        assert analyze_response.status_code == 200
+
+        response = await client.get("/api/v1/search?view=summary&limit=5")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data
+        for item in data:
+            assert "original_text" not in item
+            assert "summary" in item
+
+    async def test_search_selected_fields(self, client: AsyncClient):
+        response = await client.get("/api/v1/search?fields=title,summary&limit=5")
+
+        assert response.status_code == 200
+        for item in response.json():
+            assert set(item) == {"id", "createdAt", "title", "summary"}
+
+    async def test_search_unknown_field(self, client: AsyncClient):
+        response = await client.get("/api/v1/search?fields=title,password")
+
+        assert response.status_code == 400
+
+    async def test_search_sees_new_analysis(self, client: AsyncClient):
+        # Cached search results are dropped as soon as a new analysis is stored.
+        term = f"quillback{int(asyncio.get_running_loop().time() * 1000)}"
+        before = await client.get(f"/api/v1/search?topic={term}")
+        assert before.json() == []
+
+        analyze_response = await client.post(
+            "/api/v1/analyze", json={"text": f"The {term} survey found stable fish stocks.", "bypass_cache": True})
+        assert analyze_response.status_code == 200
+
+        after = await client.get(f"/api/v1/search?topic={term}")
+        assert [result["id"] for result in after.json()] == [analyze_response.json()["id"]]
+
     async def test_search_nonexistent_topic(self, client: AsyncClient):
         # Search with a topic that does not exist should return empty list.
         response = await client.get("/api/v1/search?topic=nonexistenttermshouldnotmatch123")
@@ -136,6 +376,91 @@ class TestSearchEndpoint:
         assert isinstance(data, list)
 
 
+class TestGetAnalysisEndpoint:
+
+    async def test_get_analysis(self, client: AsyncClient, sample_text: str):
+        # A single analysis is returned with its original text.
+        analyze_response = await client.post(
+            "/api/v1/analyze",
+            json={"text": sample_text}
+        )
+        assert analyze_response.status_code == 200
+        analysis_id = analyze_response.json()["id"]
+
+        response = await client.get(f"/api/v1/analyses/{analysis_id}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == analysis_id
+        assert data["original_text"] == sample_text
+
+    async def test_get_analysis_not_found(self, client: AsyncClient):
+        response = await client.get("/api/v1/analyses/999999999")
+
+        assert response.status_code == 404
+
+
+class TestExportEndpoint:
+
+    async def test_export_ndjson_since(self, client: AsyncClient, sample_text: str):
+        # An incremental export starting at a new analysis streams it as one JSON object per line.
+        analyze_response = await client.post(
+            "/api/v1/analyze", json={"text": sample_text, "bypass_cache": True})
+        assert analyze_response.status_code == 200
+        analysis = analyze_response.json()
+
+        response = await client.get(
+            "/api/v1/analyses/export", params={"since": analysis["createdAt"], "view": "summary"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert analysis["id"] in [row["id"] for row in rows]
+        assert all("original_text" not in row for row in rows)
+
+    async def test_export_csv_header(self, client: AsyncClient):
+        response = await client.get(
+            "/api/v1/analyses/export", params={"format": "csv", "fields": "title", "since": "2999-01-01T00:00:00Z"})
+
+        assert response.status_code == 200
+        assert response.text.splitlines() == ["id,title,createdAt"]
+
+
+class TestJobsEndpoint:
+
+    async def test_submit_and_poll_job(self, client: AsyncClient, sample_text: str):
+        # A job is accepted right away and finishes in the background.
+        response = await client.post("/api/v1/jobs", json={"text": sample_text})
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] in ["pending", "running", "succeeded"]
+        assert response.headers["location"] == f"/api/v1/jobs/{data['id']}"
+
+        for _ in range(60):
+            status_response = await client.get(f"/api/v1/jobs/{data['id']}")
+            assert status_response.status_code == 200
+            status = status_response.json()
+            if status["status"] in ["succeeded", "failed"]:
+                break
+            await asyncio.sleep(0.5)
+
+        assert status["status"] == "succeeded"
+        assert status["attempts"] >= 1
+        assert status["analysis"]["id"] == status["analysis_id"]
+        assert status["analysis"]["original_text"] == sample_text
+
+    async def test_submit_job_empty_text(self, client: AsyncClient):
+        response = await client.post("/api/v1/jobs", json={"text": "   "})
+
+        assert response.status_code == 400
+
+    async def test_get_job_not_found(self, client: AsyncClient):
+        response = await client.get("/api/v1/jobs/00000000-0000-0000-0000-000000000000")
+
+        assert response.status_code == 404
+
+
 class TestMockDataBehavior:
     # Test that mock data is working as expected.
 
@@ -159,6 +484,18 @@ class TestMockDataBehavior:
         assert data1["original_text"] == data2["original_text"]
         assert data1["original_text"] == test_text
 
+    async def test_mock_analysis_follows_text(self, client: AsyncClient):
+        # The mock backend derives the analysis from the submitted text.
+        test_text = "Volcano monitoring improves. Volcano sensors and volcano satellites track eruptions."
+
+        response = await client.post("/api/v1/analyze", json={"text": test_text, "bypass_cache": True})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "volcano" in data["topics"]
+        assert data["summary"].startswith("Volcano monitoring improves.")
+        assert data["sentiment"] == "positive"
+
     async def test_confidence_score_calculation(self, client: AsyncClient):
         response = await client.post(
             "/api/v1/analyze",
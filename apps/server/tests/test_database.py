@@ -0,0 +1,34 @@
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+from src.config import settings
+from src.db.database import search_url
+
+
+def url_params(url: str) -> dict:
+    return {name: values[0] for name, values in parse_qs(urlsplit(url).query).items()}
+
+
+class TestSearchUrl:
+
+    # The search statement timeout is sent as a startup option, so it is set once per connection.
+    def test_adds_statement_timeout_option(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "db_search_statement_timeout_ms", 1500)
+
+        url = search_url("postgresql://user:secret@db:5432/app?schema=public")
+
+        assert url.startswith("postgresql://user:secret@db:5432/app?")
+        assert "options=-c%20statement_timeout%3D1500" in url
+        assert url_params(url)["schema"] == "public"
+
+    def test_keeps_existing_options(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "db_search_statement_timeout_ms", 1500)
+
+        url = search_url("postgresql://db/app?options=-c%20search_path%3Dreporting")
+
+        assert url_params(url)["options"] == "-c search_path=reporting -c statement_timeout=1500"
+
+    def test_no_option_without_timeout(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "db_search_statement_timeout_ms", 0)
+
+        assert "options" not in url_params(search_url("postgresql://db/app"))
@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from src.utils.errors import (counting_http_exception_handler, database_error, invalid_cursor_error,
+                              llm_rate_limited_error)
+from src.utils.metrics import ERRORS
+
+
+def error_count(error_type: str, status: int) -> float:
+    return ERRORS.labels(error_type, str(status))._value.get()
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_exception_handler(StarletteHTTPException, counting_http_exception_handler)
+
+    @app.get("/limited")
+    async def limited():
+        raise llm_rate_limited_error(2.5)
+
+    @app.get("/cursor")
+    async def cursor():
+        raise invalid_cursor_error()
+
+    return TestClient(app)
+
+
+class TestErrorMetrics:
+
+    # Building an error (e.g. only for its message) doesn't count it.
+    def test_constructing_does_not_count(self):
+        before = error_count("internal_error", 500)
+
+        message = database_error().detail["message"]
+
+        assert message
+        assert error_count("internal_error", 500) == before
+
+    # Returned errors are counted with their type and status, and the response is unchanged.
+    def test_returned_errors_are_counted(self):
+        before = error_count("too_many_requests", 429), error_count("validation_error", 400)
+        client = make_client()
+
+        limited = client.get("/limited")
+        cursor = client.get("/cursor")
+
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "3"
+        assert limited.json() == {"detail": {"message": "AI analysis service is at capacity. Please retry later."}}
+        assert cursor.status_code == 400
+        assert error_count("too_many_requests", 429) == before[0] + 1
+        assert error_count("validation_error", 400) == before[1] + 1
+
+    def test_routing_errors_are_untyped(self):
+        before = error_count("http_error", 404)
+
+        assert make_client().get("/missing").status_code == 404
+
+        assert error_count("http_error", 404) == before + 1
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import pytest
+from fastapi import HTTPException
+
+from src.services.job_queue import AnalysisJobQueue, JOB_FAILED, JOB_PENDING, JOB_SUCCEEDED
+from src.utils.errors import analysis_failed_error, empty_text_error, llm_unavailable_error
+from testing.fake_prisma import Record
+
+
+def _matches(row: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    for field, condition in where.items():
+        value = row[field]
+        if isinstance(condition, dict):
+            if "in" in condition and value not in condition["in"]:
+                return False
+            if "lt" in condition and not (value is not None and value < condition["lt"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeJobTable:
+
+    # The AnalysisJob queries the job queue makes, in memory. updatedAt is maintained like Prisma's @updatedAt.
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.ids = itertools.count(1)
+
+    def _apply(self, row: Dict[str, Any], data: Dict[str, Any]) -> None:
+        for field, value in data.items():
+            if isinstance(value, dict):
+                value = row[field] + value.get("increment", 0) - value.get("decrement", 0)
+            row[field] = value
+        if "updatedAt" not in data:
+            row["updatedAt"] = datetime.now(timezone.utc)
+
+    async def create(self, data: Dict[str, Any]) -> Record:
+        row = {"id": str(next(self.ids)), "status": JOB_PENDING, "attempts": 0, "error": None, "analysis_id": None,
+               "createdAt": datetime.now(timezone.utc), "startedAt": None, "finishedAt": None}
+        self._apply(row, data)
+        self.rows[row["id"]] = row
+        return Record(row)
+
+    async def find_unique(self, where: Dict[str, Any]) -> Optional[Record]:
+        row = self.rows.get(where["id"])
+        return Record(row) if row is not None else None
+
+    async def find_many(self, where: Dict[str, Any], **options: Any) -> List[Record]:
+        return [Record(row) for row in self.rows.values() if _matches(row, where)]
+
+    async def update(self, where: Dict[str, Any], data: Dict[str, Any]) -> Record:
+        row = self.rows[where["id"]]
+        self._apply(row, data)
+        return Record(row)
+
+    async def update_many(self, where: Dict[str, Any], data: Dict[str, Any]) -> int:
+        matched = [row for row in self.rows.values() if _matches(row, where)]
+        for row in matched:
+            self._apply(row, data)
+        return len(matched)
+
+
+class FakeDatabase:
+
+    def __init__(self):
+        self.analysisjob = FakeJobTable()
+
+
+class ScriptedService:
+
+    # Stands in for AnalysisService: each call takes `duration` seconds, then raises the next scripted
+    # error or, once they are used up, returns an analysis.
+
+    def __init__(self, errors: List[Exception] = (), duration: float = 0.0):
+        self.errors = list(errors)
+        self.duration = duration
+        self.calls = 0
+
+    async def perform_analysis(self, text: str, use_cache: bool = True) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.duration)
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"id": self.calls}
+
+
+async def run_job(service: ScriptedService, stale_after: float = 600, timeout: float = 5.0) -> Dict[str, Any]:
+    # Two queues polling the same table, like two server processes.
+    db = FakeDatabase()
+    queues = [AnalysisJobQueue(prisma=db, workers=2, poll_interval=0.01, stale_after=stale_after, max_attempts=3)
+              for _ in range(2)]
+    for queue in queues:
+        await queue.start(lambda: service)
+    try:
+        job = await queues[0].submit("Some text to analyze.")
+        deadline = time.monotonic() + timeout
+        while db.analysisjob.rows[job["id"]]["status"] not in (JOB_SUCCEEDED, JOB_FAILED):
+            assert time.monotonic() < deadline, "job never finished"
+            await asyncio.sleep(0.01)
+        return dict(db.analysisjob.rows[job["id"]])
+    finally:
+        for queue in queues:
+            await queue.shutdown()
+
+
+class TestJobRetries:
+
+    # 5xx failures and unexpected errors are retried on a later poll.
+    def test_transient_failures_are_retried(self):
+        service = ScriptedService(errors=[llm_unavailable_error(), ConnectionResetError("reset")])
+
+        job = asyncio.run(run_job(service))
+
+        assert job["status"] == JOB_SUCCEEDED
+        assert job["attempts"] == 3
+        assert job["error"] is None
+        assert service.calls == 3
+
+    def test_gives_up_after_max_attempts(self):
+        service = ScriptedService(errors=[analysis_failed_error()] * 5)
+
+        job = asyncio.run(run_job(service))
+
+        assert job["status"] == JOB_FAILED
+        assert job["attempts"] == 3
+        assert service.calls == 3
+        assert job["error"] == "Text analysis failed. Please try again."
+
+    # Client errors won't change on a retry.
+    def test_client_errors_fail_at_once(self):
+        service = ScriptedService(errors=[empty_text_error()])
+
+        job = asyncio.run(run_job(service))
+
+        assert job["status"] == JOB_FAILED
+        assert job["attempts"] == 1
+        assert service.calls == 1
+
+
+class TestJobHeartbeat:
+
+    # A job running longer than stale_after keeps its claim through the heartbeat and runs only once.
+    def test_long_job_is_not_requeued(self):
+        service = ScriptedService(duration=0.5)
+
+        job = asyncio.run(run_job(service, stale_after=0.1))
+
+        assert job["status"] == JOB_SUCCEEDED
+        assert job["attempts"] == 1
+        assert service.calls == 1
+
+    # Without heartbeats (the process running the job died), the job is picked up again.
+    def test_abandoned_job_is_requeued(self):
+        async def scenario():
+            db = FakeDatabase()
+            service = ScriptedService()
+            queue = AnalysisJobQueue(prisma=db, workers=1, poll_interval=0.01, stale_after=0.1)
+            job = await db.analysisjob.create(data={"text": "Left running by a crashed process.", "bypass_cache": False,
+                                                    "webhook_url": None, "status": "running", "attempts": 1})
+            await queue.start(lambda: service)
+            try:
+                while db.analysisjob.rows[job.id]["status"] != JOB_SUCCEEDED:
+                    await asyncio.sleep(0.01)
+            finally:
+                await queue.shutdown()
+            return db.analysisjob.rows[job.id]
+
+        job = asyncio.run(scenario())
+
+        assert job["attempts"] == 2
+
+
+class TestWebhookValidation:
+
+    @pytest.mark.parametrize("url", ["http://example.com/hook", "https://169.254.169.254/latest", "https://[::1]/hook"])
+    def test_submit_rejects_unsafe_webhook(self, url: str):
+        async def scenario():
+            db = FakeDatabase()
+            queue = AnalysisJobQueue(prisma=db)
+            with pytest.raises(HTTPException) as error:
+                await queue.submit("Some text.", webhook_url=url)
+            assert error.value.status_code == 400
+            assert not db.analysisjob.rows
+
+        asyncio.run(scenario())
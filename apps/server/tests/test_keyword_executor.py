@@ -0,0 +1,131 @@
+import asyncio
+import os
+import signal
+import time
+import pytest
+from fastapi import HTTPException
+
+from src.services.keyword_executor import KeywordExecutor
+
+TEXT = "Renewable energy investments are reshaping electricity markets across Europe."
+
+
+async def wait_until_ready(executor: KeywordExecutor, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not executor.is_ready:
+        assert time.monotonic() < deadline, "keyword model never became ready"
+        await asyncio.sleep(0.05)
+
+
+class TestBackpressure:
+
+    # Extractions beyond max_pending wait for a slot and are rejected once the wait exceeds queue_timeout.
+    def test_rejects_when_saturated(self):
+        async def scenario():
+            executor = KeywordExecutor(max_pending=1, queue_timeout=0.05, use_processes=False)
+            await executor.start()
+            try:
+                busy = asyncio.create_task(executor._submit(time.sleep, 0.5))
+                while executor.in_flight == 0:
+                    await asyncio.sleep(0.001)
+
+                with pytest.raises(HTTPException) as error:
+                    await executor._submit(time.sleep, 0)
+                assert error.value.status_code == 503
+
+                await busy
+                assert executor.in_flight == 0
+                # The slot is free again.
+                await executor._submit(time.sleep, 0)
+            finally:
+                await executor.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_rejects_before_start(self):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(KeywordExecutor(use_processes=False).extract(TEXT))
+        assert error.value.status_code == 503
+
+
+class TestWorkerCrash:
+
+    # A worker dying mid-task fails that task with a 503, then the pool is replaced: /ready reports
+    # not ready until the new workers are warm, and the next extraction succeeds.
+    def test_pool_is_replaced_after_crash(self):
+        async def scenario():
+            executor = KeywordExecutor(max_workers=1, use_processes=True)
+            await executor.start()
+            try:
+                await wait_until_ready(executor)
+                broken = executor._pool
+
+                with pytest.raises(HTTPException) as error:
+                    await executor._submit(os._exit, 1)
+                assert error.value.status_code == 503
+                assert executor._pool is not broken
+                assert not executor.is_ready
+
+                keywords = await executor.extract(TEXT)
+                assert isinstance(keywords, list) and keywords
+                await wait_until_ready(executor)
+            finally:
+                await executor.shutdown()
+
+        asyncio.run(scenario())
+
+    # Every task running on the broken pool reports the crash, but the pool is rebuilt only once.
+    def test_concurrent_failures_rebuild_once(self):
+        async def scenario():
+            executor = KeywordExecutor(max_workers=2, use_processes=True)
+            await executor.start()
+            try:
+                await wait_until_ready(executor)
+                created = []
+                new_pool = executor._new_pool
+
+                def counting_new_pool():
+                    created.append(new_pool())
+                    return created[-1]
+
+                executor._new_pool = counting_new_pool
+                results = await asyncio.gather(
+                    executor._submit(os._exit, 1), executor._submit(time.sleep, 1),
+                    return_exceptions=True)
+
+                assert all(isinstance(result, HTTPException) for result in results)
+                assert len(created) == 1
+                assert executor._pool is created[0]
+                assert await executor.extract(TEXT)
+            finally:
+                await executor.shutdown()
+
+        asyncio.run(scenario())
+
+
+class TestForkedPool:
+
+    # With the fork start method every pool process is forked during start(), and a forked process
+    # drops the signal handlers it inherited so SIGTERM still stops it.
+    def test_processes_are_forked_at_start(self):
+        async def scenario():
+            executor = KeywordExecutor(max_workers=2, use_processes=True, start_method="fork")
+            await executor.start()
+            try:
+                processes = list(executor._pool._processes.values())
+                assert len(processes) == 2
+                await wait_until_ready(executor)
+                assert await executor.extract(TEXT)
+
+                os.kill(processes[0].pid, signal.SIGTERM)
+                await asyncio.to_thread(processes[0].join, 10)
+                assert processes[0].exitcode == -signal.SIGTERM
+            finally:
+                await executor.shutdown()
+
+        # Stands in for the handler a gunicorn worker installs.
+        previous = signal.signal(signal.SIGTERM, lambda *args: None)
+        try:
+            asyncio.run(scenario())
+        finally:
+            signal.signal(signal.SIGTERM, previous)
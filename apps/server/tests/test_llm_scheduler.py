@@ -0,0 +1,200 @@
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from src.services.llm_client import LLMClient
+from src.services.llm_scheduler import LLMScheduler, parse_duration
+from src.utils.rate_limit import TokenBucket
+from src.utils.tokens import estimate_tokens
+
+MESSAGES = [{"role": "user", "content": "Analyze this."}]
+
+
+class FlakyClient(LLMClient):
+
+    # Mock-mode client whose attempts fail with the scripted errors, optionally after streaming a delta first.
+
+    def __init__(self, scheduler: LLMScheduler, errors: List[Exception], fail_after_delta: bool = False):
+        super().__init__(api_key="", mock_enabled=True, scheduler=scheduler)
+        self.errors = list(errors)
+        self.fail_after_delta = fail_after_delta
+        self.attempts = 0
+
+    async def _open_stream(self, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        self.attempts += 1
+        if self.fail_after_delta:
+            yield {"content": "{", "logprobs": [-0.1]}
+        if self.errors:
+            raise self.errors.pop(0)
+        yield {"content": "}", "logprobs": [-0.2]}
+
+
+async def collect(client: LLMClient) -> List[Dict[str, Any]]:
+    return [delta async for delta in client.stream_completion(MESSAGES)]
+
+
+class TestShedding:
+
+    # A call that would wait longer than max_queue_wait is rejected at once with a Retry-After.
+    def test_rejects_long_waits(self):
+        scheduler = LLMScheduler(max_queue_wait=1.0)
+        scheduler.record_rate_limited({"retry-after": "30"})
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(scheduler.acquire(100))
+
+        assert error.value.status_code == 429
+        assert error.value.headers["Retry-After"] in ("29", "30")
+        assert scheduler.stats.shed == 1
+
+    # Once max_queue_size calls are waiting, new calls are rejected instead of queued.
+    def test_rejects_when_queue_is_full(self):
+        async def scenario():
+            scheduler = LLMScheduler(max_queue_size=1, max_queue_wait=0)
+            scheduler.record_rate_limited({"retry-after-ms": "100"})
+            waiting = asyncio.create_task(scheduler.acquire(100))
+            await asyncio.sleep(0)
+            assert scheduler.queue_depth == 1
+
+            with pytest.raises(HTTPException) as error:
+                await scheduler.acquire(100)
+            assert error.value.status_code == 429
+
+            # The queued call is admitted once the pause is over.
+            assert await waiting >= 0.05
+            assert scheduler.queue_depth == 0
+            assert scheduler.stats.admitted == 1
+
+        asyncio.run(scenario())
+
+
+class TestHeaderAdaptation:
+
+    # The API's limits become the refill rates, capped by the configured ones.
+    def test_rates_follow_api_limits(self):
+        scheduler = LLMScheduler(requests_per_minute=100)
+
+        scheduler.observe({"x-ratelimit-limit-requests": "500", "x-ratelimit-limit-tokens": "40000"})
+
+        assert scheduler.requests.rate_per_minute == 100
+        assert scheduler.tokens.rate_per_minute == 40000
+
+    # A low remaining budget (shared with other clients) makes new calls wait.
+    def test_remaining_budget_lowers_local_budget(self):
+        scheduler = LLMScheduler(tokens_per_minute=6000)
+        assert scheduler.estimated_wait(1000) == 0
+
+        scheduler.observe({"x-ratelimit-remaining-tokens": "0"})
+
+        assert scheduler.estimated_wait(1000) == pytest.approx(10, abs=0.1)
+
+    def test_rate_limit_pauses_until_reset(self):
+        scheduler = LLMScheduler()
+
+        pause = scheduler.record_rate_limited({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"})
+
+        assert pause == 360
+        assert scheduler.estimated_wait(1) == pytest.approx(360, abs=1)
+        assert parse_duration("1h2m3.5s") == 3723.5
+        assert parse_duration("soon") is None
+
+
+class TestRetries:
+
+    # Failures before the first delta are retried transparently.
+    def test_retries_before_first_delta(self):
+        scheduler = LLMScheduler(base_delay=0)
+        client = FlakyClient(scheduler, [httpx.ConnectError("refused"), httpx.ReadTimeout("timeout")])
+
+        deltas = asyncio.run(collect(client))
+
+        assert [delta["content"] for delta in deltas] == ["}"]
+        assert client.attempts == 3
+        assert scheduler.stats.retries == 2
+
+    # Once a delta has reached the caller, the call can't be replayed.
+    def test_no_retry_after_first_delta(self):
+        scheduler = LLMScheduler(base_delay=0)
+        client = FlakyClient(scheduler, [httpx.ReadError("reset")], fail_after_delta=True)
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(collect(client))
+
+        assert error.value.status_code == 503
+        assert client.attempts == 1
+        assert scheduler.stats.retries == 0
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = LLMScheduler(base_delay=0, max_retries=2)
+        client = FlakyClient(scheduler, [httpx.ConnectError("refused")] * 5)
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(collect(client))
+
+        assert error.value.status_code == 503
+        assert client.attempts == 3
+
+    def test_does_not_retry_other_errors(self):
+        scheduler = LLMScheduler(base_delay=0)
+        client = FlakyClient(scheduler, [ValueError("bad request body")])
+
+        with pytest.raises(HTTPException):
+            asyncio.run(collect(client))
+
+        assert client.attempts == 1
+
+
+class UsageClient(LLMClient):
+
+    # Mock-mode client that streams like OpenAI with include_usage: deltas, then the reported usage.
+
+    def __init__(self, scheduler: LLMScheduler, total_tokens: int):
+        super().__init__(api_key="", mock_enabled=True, scheduler=scheduler)
+        self.total_tokens = total_tokens
+
+    async def _open_stream(self, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        yield {"content": "{}", "logprobs": [-0.1]}
+        yield {"usage": self.total_tokens}
+
+
+class TestTokenRefunds:
+
+    def test_refund_is_capped_at_capacity(self):
+        bucket = TokenBucket(rate_per_minute=6000)
+        asyncio.run(bucket.acquire(1000))
+
+        bucket.refund(400)
+        assert bucket._tokens == pytest.approx(5400, abs=1)
+        bucket.refund(10000)
+        assert bucket._tokens == 6000
+
+    # The reservation for max_tokens is refunded down to the usage the API reports.
+    def test_refunds_down_to_reported_usage(self):
+        scheduler = LLMScheduler(tokens_per_minute=60000)
+
+        deltas = asyncio.run(collect(UsageClient(scheduler, total_tokens=120)))
+
+        assert deltas == [{"content": "{}", "logprobs": [-0.1]}]
+        assert scheduler.tokens._tokens == pytest.approx(60000 - 120, abs=5)
+
+    # Without reported usage, the call is charged its prompt estimate and the tokens it streamed.
+    def test_refunds_down_to_streamed_tokens(self):
+        scheduler = LLMScheduler(tokens_per_minute=60000)
+        client = LLMClient(api_key="", mock_enabled=True, scheduler=scheduler)
+
+        deltas = asyncio.run(collect(client))
+
+        used = estimate_tokens(MESSAGES[0]["content"]) + sum(len(delta["logprobs"]) for delta in deltas)
+        assert scheduler.tokens._tokens == pytest.approx(60000 - used, abs=5)
+
+    # Attempts that failed before streaming are refunded too, so retries don't drain the budget.
+    def test_failed_attempts_are_refunded(self):
+        scheduler = LLMScheduler(tokens_per_minute=60000, base_delay=0)
+        client = FlakyClient(scheduler, [httpx.ConnectError("refused"), httpx.ConnectError("refused")])
+
+        asyncio.run(collect(client))
+
+        prompt = estimate_tokens(MESSAGES[0]["content"])
+        assert scheduler.tokens._tokens == pytest.approx(60000 - 3 * prompt - 1, abs=5)
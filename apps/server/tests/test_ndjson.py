@@ -0,0 +1,162 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import pytest
+
+from starlette.requests import ClientDisconnect
+
+from src.utils.ndjson import DuplexStreamingResponse, iter_lines, read_body
+
+
+async def chunked(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def split_lines(*chunks: bytes, max_line_bytes: int = 100) -> List[Tuple[int, Optional[bytes]]]:
+    async def collect():
+        return [line async for line in iter_lines(chunked(*chunks), max_line_bytes)]
+
+    return asyncio.run(collect())
+
+
+class TestIterLines:
+
+    # Lines are reassembled across chunk boundaries; blank lines are skipped but still numbered.
+    def test_lines_across_chunks(self):
+        lines = split_lines(b'{"text": "a"}\n{"te', b'xt": "b"}\n\n  \n{"text"', b': "c"}')
+
+        assert lines == [(1, b'{"text": "a"}'), (2, b'{"text": "b"}'), (5, b'{"text": "c"}')]
+
+    # A multi-byte character split between two chunks comes out whole, since lines are split on bytes.
+    def test_utf8_split_across_chunks(self):
+        text = '{"text": "Énergie ☀ 電力"}'
+        encoded = (text + "\n").encode()
+        cut = encoded.index("☀".encode()) + 1
+        with pytest.raises(UnicodeDecodeError):
+            encoded[:cut].decode()
+
+        lines = split_lines(encoded[:cut], encoded[cut:])
+
+        assert [line.decode() for _, line in lines] == [text]
+
+    # An overlong line is reported as None without being buffered; the lines around it are unaffected.
+    def test_overlong_lines_are_dropped(self):
+        lines = split_lines(b"ok 1\n" + b"x" * 6, b"x" * 6 + b"\nok 3\n" + b"y" * 11, max_line_bytes=10)
+
+        assert lines == [(1, b"ok 1"), (2, None), (3, b"ok 3"), (4, None)]
+
+    def test_line_at_the_limit_is_kept(self):
+        assert split_lines(b"x" * 10 + b"\n", max_line_bytes=10) == [(1, b"x" * 10)]
+        assert split_lines(b"x" * 11 + b"\n", max_line_bytes=10) == [(1, None)]
+
+
+class ScriptedReceive:
+
+    # ASGI receive: returns the queued messages, then blocks until more are queued.
+
+    def __init__(self):
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.calls = 0
+
+    async def __call__(self) -> Dict[str, Any]:
+        self.calls += 1
+        return await self.messages.get()
+
+
+async def run_response(body_done: asyncio.Event, receive: ScriptedReceive, results: List[int],
+                       cancelled: asyncio.Event, count: Optional[int] = None) -> List[Dict[str, Any]]:
+    sent: List[Dict[str, Any]] = []
+
+    async def results_stream():
+        try:
+            for index in range(count if count is not None else 1000):
+                await asyncio.sleep(0.01)
+                results.append(index)
+                yield b"%d\n" % index
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def send(message: Dict[str, Any]) -> None:
+        sent.append(message)
+
+    response = DuplexStreamingResponse(results_stream(), body_done, media_type="application/x-ndjson")
+    await response({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send)
+    return sent
+
+
+class TestDuplexStreamingResponse:
+
+    # While the body is being uploaded, receive belongs to the endpoint.
+    def test_does_not_read_receive_before_body_ends(self):
+        async def scenario():
+            receive, results, cancelled = ScriptedReceive(), [], asyncio.Event()
+            sent = await run_response(asyncio.Event(), receive, results, cancelled, count=3)
+            assert receive.calls == 0
+            assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+            assert results == [0, 1, 2]
+
+        asyncio.run(scenario())
+
+    # A disconnect after the upload cancels the stream instead of letting it run for nobody.
+    def test_disconnect_after_body_cancels_stream(self):
+        async def scenario():
+            body_done, receive, results, cancelled = asyncio.Event(), ScriptedReceive(), [], asyncio.Event()
+            response = asyncio.create_task(run_response(body_done, receive, results, cancelled))
+            await asyncio.sleep(0.05)
+            body_done.set()
+            await asyncio.sleep(0.02)
+            receive.messages.put_nowait({"type": "http.disconnect"})
+
+            sent = await asyncio.wait_for(response, 1)
+            assert cancelled.is_set()
+            assert len(results) < 20
+            assert all(message.get("more_body", True) for message in sent)
+
+        asyncio.run(scenario())
+
+    # Cancelling the response itself (e.g. on server shutdown) still propagates.
+    def test_outer_cancellation_propagates(self):
+        async def scenario():
+            body_done, receive, results, cancelled = asyncio.Event(), ScriptedReceive(), [], asyncio.Event()
+            body_done.set()
+            response = asyncio.create_task(run_response(body_done, receive, results, cancelled))
+            await asyncio.sleep(0.03)
+            response.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await response
+            assert cancelled.is_set()
+
+        asyncio.run(scenario())
+
+
+
+class TestReadBody:
+
+    # The body is done once its last message arrives, before the consumer has read it.
+    def test_done_at_last_message(self):
+        async def scenario():
+            receive, done = ScriptedReceive(), asyncio.Event()
+            for message in ({"body": b"a", "more_body": True}, {"body": b"b", "more_body": False}):
+                receive.messages.put_nowait({"type": "http.request", **message})
+            chunks = read_body(receive, done)
+
+            assert await chunks.__anext__() == b"a"
+            assert not done.is_set()
+            assert await chunks.__anext__() == b"b"
+            assert done.is_set()
+            assert [chunk async for chunk in chunks] == []
+
+        asyncio.run(scenario())
+
+    def test_disconnect_during_upload(self):
+        async def scenario():
+            receive, done = ScriptedReceive(), asyncio.Event()
+            receive.messages.put_nowait({"type": "http.request", "body": b"a", "more_body": True})
+            receive.messages.put_nowait({"type": "http.disconnect"})
+
+            with pytest.raises(ClientDisconnect):
+                [chunk async for chunk in read_body(receive, done)]
+            assert not done.is_set()
+
+        asyncio.run(scenario())
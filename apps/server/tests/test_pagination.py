@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+
+from src.utils.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload: object) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+class TestCursor:
+
+    def test_round_trip(self):
+        created_at = datetime(2026, 10, 17, 9, 30, 0, 123000)
+
+        assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+    # Aware timestamps are stored as naive UTC, like the createdAt column.
+    def test_aware_timestamps_become_naive_utc(self):
+        created_at = datetime(2026, 10, 17, 11, 30, tzinfo=timezone(timedelta(hours=2)))
+
+        assert decode_cursor(encode_cursor(created_at, 7)) == (datetime(2026, 10, 17, 9, 30), 7)
+        assert decode_cursor(encode_cursor("2026-10-17T09:30:00Z", 7)) == (datetime(2026, 10, 17, 9, 30), 7)
+
+    @pytest.mark.parametrize("cursor", [
+        "",
+        "not a cursor!",
+        "ünïcode",
+        "a",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        raw_cursor("just a string"),
+        raw_cursor(["2026-10-17T09:30:00", 1]),
+        raw_cursor(17),
+        raw_cursor(None),
+        raw_cursor({"id": 1}),
+        raw_cursor({"t": "2026-10-17T09:30:00"}),
+        raw_cursor({"t": "yesterday", "id": 1}),
+        raw_cursor({"t": 1760693400, "id": 1}),
+        raw_cursor({"t": None, "id": 1}),
+        raw_cursor({"t": "2026-10-17T09:30:00", "id": "1"}),
+        raw_cursor({"t": "2026-10-17T09:30:00", "id": 1.5}),
+        raw_cursor({"t": "2026-10-17T09:30:00", "id": True}),
+        raw_cursor({"t": "2026-10-17T09:30:00", "id": None}),
+    ])
+    def test_malformed_cursors_are_rejected(self, cursor: str):
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor)
+
+        assert error.value.status_code == 400
+        assert error.value.detail == {"message": "Cursor: is not a valid pagination cursor."}
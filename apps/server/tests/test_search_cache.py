@@ -0,0 +1,57 @@
+import asyncio
+
+from src.services.analysis_service import AnalysisService
+from src.services.llm_client import LLMClient
+from src.services.search_cache import SearchResultCache
+from src.utils.distributions import Distribution
+from testing.fake_prisma import FakePrisma
+
+
+async def no_keywords(text: str):
+    return []
+
+
+def make_worker(prisma: FakePrisma) -> AnalysisService:
+    # One gunicorn worker: its own service and cache in front of the shared database.
+    cache = SearchResultCache(max_entries=8, max_bytes=1024, ttl_seconds=60)
+    return AnalysisService(prisma=prisma, llm_client=LLMClient(api_key="", mock_enabled=True),
+                           keyword_extractor=no_keywords, search_cache=cache)
+
+
+class TestSearchResultCache:
+
+    # An entry is served only at the version it was stored at.
+    def test_entries_are_retired_by_a_new_version(self):
+        cache = SearchResultCache(max_entries=8, max_bytes=1024, ttl_seconds=60)
+        cache.set("energy", b"[]", 3)
+
+        assert cache.get("energy", 3) == b"[]"
+        assert cache.get("energy", 4) is None
+        assert cache.get("energy", 3) is None
+        assert cache.stats()["invalidations"] == 1
+        assert len(cache) == 0
+
+    def test_bodies_over_the_byte_budget_are_not_stored(self):
+        cache = SearchResultCache(max_entries=8, max_bytes=4, ttl_seconds=60)
+        cache.set("energy", b"[1, 2]", 1)
+
+        assert cache.get("energy", 1) is None
+
+
+class TestSharedVersion:
+
+    # A row inserted by another worker retires this worker's cached searches.
+    def test_insert_by_another_worker_invalidates(self):
+        async def scenario():
+            prisma = FakePrisma(Distribution.parse("const:0"))
+            reader, writer = make_worker(prisma), make_worker(prisma)
+            version = await reader.search_version()
+            assert version == 0
+            reader.search_cache.set("energy", b"[]", version)
+            assert reader.search_cache.get("energy", await reader.search_version()) == b"[]"
+
+            await writer.perform_batch_analysis(["Grid storage is expanding."])
+
+            return reader.search_cache.get("energy", await reader.search_version())
+
+        assert asyncio.run(scenario()) is None
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+class Call:
+
+    # A coalescable call that runs until released, counting how often it was started and whether it was cancelled.
+
+    def __init__(self, result: str = "result", error: Exception = None):
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestSingleFlight:
+
+    def test_concurrent_callers_share_one_call(self):
+        async def scenario():
+            flights = SingleFlight()
+            call = Call()
+            callers = [asyncio.create_task(flights.do("key", call)) for _ in range(3)]
+            await settle()
+            call.release.set()
+
+            assert await asyncio.gather(*callers) == ["result"] * 3
+            assert call.started == 1
+            assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 2}
+
+        asyncio.run(scenario())
+
+    # The caller that started the call going away doesn't cancel it for the callers still waiting.
+    def test_leader_cancelled_with_followers(self):
+        async def scenario():
+            flights = SingleFlight()
+            call = Call()
+            leader = asyncio.create_task(flights.do("key", call))
+            await settle()
+            follower = asyncio.create_task(flights.do("key", call))
+            await settle()
+
+            leader.cancel()
+            await settle()
+            assert not call.cancelled
+            assert len(flights) == 1
+
+            call.release.set()
+            assert await follower == "result"
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            assert call.started == 1 and len(flights) == 0
+
+        asyncio.run(scenario())
+
+    # Once the last caller has gone, the call is cancelled and the next caller starts a new one.
+    def test_last_waiter_cancelled(self):
+        async def scenario():
+            flights = SingleFlight()
+            abandoned = Call()
+            callers = [asyncio.create_task(flights.do("key", abandoned)) for _ in range(2)]
+            await settle()
+
+            for caller in callers:
+                caller.cancel()
+            await settle()
+            assert abandoned.cancelled
+            assert len(flights) == 0
+
+            fresh = Call("fresh")
+            fresh.release.set()
+            assert await flights.do("key", fresh) == "fresh"
+            assert fresh.started == 1
+
+        asyncio.run(scenario())
+
+    # Every waiting caller gets the call's exception, and the failure isn't cached.
+    def test_exception_propagates_to_every_caller(self):
+        async def scenario():
+            flights = SingleFlight()
+            call = Call(error=ValueError("llm failed"))
+            callers = [asyncio.create_task(flights.do("key", call)) for _ in range(3)]
+            await settle()
+            call.release.set()
+
+            results = await asyncio.gather(*callers, return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+            assert len(flights) == 0
+
+            retry = Call("recovered")
+            retry.release.set()
+            assert await flights.do("key", retry) == "recovered"
+
+        asyncio.run(scenario())
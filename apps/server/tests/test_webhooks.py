@@ -0,0 +1,92 @@
+import asyncio
+import socket
+import pytest
+
+from src.utils.webhooks import WebhookTargetError, parse_allowed_hosts, pinned_request, resolve_webhook_target
+
+
+def resolve(url: str, allowed_hosts=frozenset()):
+    return asyncio.run(resolve_webhook_target(url, allowed_hosts))
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    # Host name -> addresses returned by the resolver.
+    answers = {}
+
+    async def getaddrinfo(self, host, port, **kwargs):
+        if host not in answers:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))
+                for address in answers[host]]
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", getaddrinfo)
+    return answers
+
+
+class TestWebhookTargets:
+
+    @pytest.mark.parametrize("url", [
+        "https://127.0.0.1/hook",
+        "https://10.1.2.3/hook",
+        "https://192.168.0.10:8443/hook",
+        "https://172.16.0.1/hook",
+        "https://169.254.169.254/latest/meta-data",
+        "https://100.64.0.1/hook",
+        "https://0.0.0.0/hook",
+        "https://224.0.0.1/hook",
+        "https://[::1]/hook",
+        "https://[fe80::1]/hook",
+        "https://[fd00::1]/hook",
+        "https://[::ffff:127.0.0.1]/hook",
+    ])
+    def test_rejects_private_addresses(self, url: str):
+        with pytest.raises(WebhookTargetError):
+            resolve(url)
+
+    def test_rejects_plain_http(self):
+        with pytest.raises(WebhookTargetError, match="https"):
+            resolve("http://93.184.215.14/hook")
+
+    def test_accepts_public_address(self):
+        url, address = resolve("https://93.184.215.14:8443/hook")
+        assert address == "93.184.215.14"
+        assert url.port == 8443
+
+    # A host name is accepted only when every address it resolves to is public.
+    def test_checks_every_resolved_address(self, dns):
+        dns["hooks.example.com"] = ["93.184.215.14"]
+        dns["mixed.example.com"] = ["93.184.215.14", "10.0.0.5"]
+        dns["internal.example.com"] = ["169.254.169.254"]
+
+        assert resolve("https://hooks.example.com/hook")[1] == "93.184.215.14"
+        with pytest.raises(WebhookTargetError):
+            resolve("https://mixed.example.com/hook")
+        with pytest.raises(WebhookTargetError):
+            resolve("https://internal.example.com/hook")
+        with pytest.raises(WebhookTargetError, match="resolved"):
+            resolve("https://unknown.example.com/hook")
+
+    # With an allowlist, only its hosts are accepted, and they may be internal.
+    def test_allowlist(self, dns):
+        dns["hooks.internal"] = ["10.0.0.5"]
+        dns["hooks.example.com"] = ["93.184.215.14"]
+        allowed = parse_allowed_hosts(" Hooks.Internal. , ")
+
+        assert allowed == {"hooks.internal"}
+        assert resolve("https://hooks.internal/hook", allowed)[1] == "10.0.0.5"
+        with pytest.raises(WebhookTargetError, match="not allowed"):
+            resolve("https://hooks.example.com/hook", allowed)
+        with pytest.raises(WebhookTargetError, match="https"):
+            resolve("http://hooks.internal/hook", allowed)
+
+    # The request goes to the checked address, with the original host in the Host header and TLS server name.
+    def test_pinned_request(self, dns):
+        dns["hooks.example.com"] = ["2606:2800:220:1::1"]
+        url, address = resolve("https://hooks.example.com:8443/a/b?c=1")
+
+        request_url, headers, extensions = pinned_request(url, address)
+
+        assert request_url == "https://[2606:2800:220:1::1]:8443/a/b?c=1"
+        assert headers == {"Host": "hooks.example.com:8443"}
+        assert extensions == {"sni_hostname": "hooks.example.com"}
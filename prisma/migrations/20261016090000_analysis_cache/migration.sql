@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE "AnalysisCacheEntry" (
+    "key" TEXT NOT NULL,
+    "summary" TEXT NOT NULL,
+    "title" TEXT,
+    "topics" TEXT[],
+    "sentiment" TEXT NOT NULL,
+    "keywords" TEXT[],
+    "confidence_score" DOUBLE PRECISION,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "AnalysisCacheEntry_pkey" PRIMARY KEY ("key")
+);
@@ -0,0 +1,28 @@
+-- Trigram matching lets GIN indexes serve ILIKE '%term%' searches
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+
+-- array_to_string is only STABLE, which Postgres rejects in index expressions and generated
+-- columns. The result only depends on the input array, so an IMMUTABLE wrapper is safe.
+CREATE OR REPLACE FUNCTION analysis_array_to_text(text[]) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT array_to_string($1, ' ') $$;
+
+-- AlterTable: weighted full-text document for ranked search
+ALTER TABLE "Analysis" ADD COLUMN "search_vector" tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce("title", '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(analysis_array_to_text("topics"), '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(analysis_array_to_text("keywords"), '')), 'B') ||
+    setweight(to_tsvector('english', "summary"), 'C')
+) STORED;
+
+-- CreateIndex
+CREATE INDEX "Analysis_summary_trgm_idx" ON "Analysis" USING GIN ("summary" gin_trgm_ops);
+
+-- CreateIndex
+CREATE INDEX "Analysis_title_trgm_idx" ON "Analysis" USING GIN ("title" gin_trgm_ops);
+
+-- CreateIndex: normalized search text over the topic and keyword arrays
+CREATE INDEX "Analysis_tags_trgm_idx" ON "Analysis" USING GIN ((analysis_array_to_text("topics" || "keywords")) gin_trgm_ops);
+
+-- CreateIndex
+CREATE INDEX "Analysis_search_vector_idx" ON "Analysis" USING GIN ("search_vector");
@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Analysis_createdAt_id_idx" ON "Analysis"("createdAt" DESC, "id" DESC);
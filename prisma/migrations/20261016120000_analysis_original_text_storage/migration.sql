@@ -0,0 +1,12 @@
+-- Keep the source documents out of the main heap so list scans don't read them.
+-- Once a row exceeds ~2KB Postgres shrinks it, but by default it compresses the largest values
+-- first, and a compressed document that fits back under 2KB stays inline and is dragged through
+-- every page of "Analysis". EXTERNAL storage never compresses original_text, so it is moved to the
+-- TOAST table instead, and the columns list views and search read (summary, search_vector,
+-- search_tags) stay inline and uncompressed. The table keeps the default tuple target; rows below
+-- ~2KB are unaffected. Documents are stored uncompressed, which takes more space in TOAST.
+-- Only values written after this migration use the new layout; VACUUM FULL alone keeps existing
+-- compressed documents inline. To move them, during a maintenance window run
+--   UPDATE "Analysis" SET original_text = original_text || '' WHERE pg_column_compression(original_text) IS NOT NULL;
+--   VACUUM FULL "Analysis";
+ALTER TABLE "Analysis" ALTER COLUMN "original_text" SET STORAGE EXTERNAL;
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "Analysis" ADD COLUMN     "chunk_count" INTEGER NOT NULL DEFAULT 1;
+
+-- AlterTable
+ALTER TABLE "AnalysisCacheEntry" ADD COLUMN     "chunk_count" INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,23 @@
+-- CreateEnum
+CREATE TYPE "AnalysisJobStatus" AS ENUM ('pending', 'running', 'succeeded', 'failed');
+
+-- CreateTable
+CREATE TABLE "AnalysisJob" (
+    "id" TEXT NOT NULL,
+    "status" "AnalysisJobStatus" NOT NULL DEFAULT 'pending',
+    "text" TEXT NOT NULL,
+    "bypass_cache" BOOLEAN NOT NULL DEFAULT false,
+    "webhook_url" TEXT,
+    "analysis_id" INTEGER,
+    "error" TEXT,
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+    "startedAt" TIMESTAMP(3),
+    "finishedAt" TIMESTAMP(3),
+
+    CONSTRAINT "AnalysisJob_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "AnalysisJob_status_createdAt_idx" ON "AnalysisJob"("status", "createdAt");
@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "AnalysisCacheEntry_createdAt_idx" ON "AnalysisCacheEntry"("createdAt");
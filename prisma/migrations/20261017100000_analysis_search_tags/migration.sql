@@ -0,0 +1,20 @@
+-- The trigram index over topics and keywords was an expression index, which schema.prisma cannot
+-- describe, so `prisma migrate dev` reported drift and offered to drop it. The joined text is now a
+-- generated column, and the index is a plain column index that the schema declares.
+--
+-- Adding a stored generated column rewrites the table under an ACCESS EXCLUSIVE lock. Run this
+-- migration in a maintenance window on large tables.
+--
+-- Prisma does not model generated columns: schema.prisma declares "search_tags" as an optional
+-- text column with @ignore, which matches the database and keeps it out of the client, so the client
+-- never writes it. `migrate diff` compares neither the generation expressions (of this column and
+-- "search_vector") nor the analysis_array_to_text function.
+
+-- AlterTable
+ALTER TABLE "Analysis" ADD COLUMN "search_tags" TEXT GENERATED ALWAYS AS (analysis_array_to_text("topics" || "keywords")) STORED;
+
+-- DropIndex
+DROP INDEX "Analysis_tags_trgm_idx";
+
+-- CreateIndex
+CREATE INDEX "Analysis_search_tags_trgm_idx" ON "Analysis" USING GIN ("search_tags" gin_trgm_ops);